@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
+# Read-heavy endpoints use the async views when served over ASGI
+os.environ.setdefault('LITTLELEMON_ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittleLemonAPI.instrumentation.QueryMetricsMiddleware',
+    'LittleLemonAPI.routers.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,9 +85,52 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed test database so concurrency tests can use real per-thread connections
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# LITTLELEMON_DB_PROFILE=production: WAL journal, relaxed fsync, larger page cache and mmap,
+# persistent connections, and BEGIN IMMEDIATE so writers queue on the busy timeout instead
+# of failing when a read transaction tries to upgrade to a write.
+DATABASE_PROFILE = os.environ.get('LITTLELEMON_DB_PROFILE', 'development')
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-65536;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA busy_timeout=20000;'
+    ),
+}
+if DATABASE_PROFILE == 'production':
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    # Django recommends non-persistent connections under ASGI, where each request context opens its own
+    DATABASES['default']['CONN_MAX_AGE'] = 0 if os.environ.get('LITTLELEMON_ASYNC_READ_VIEWS') == '1' else 600
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Attempts made by LittleLemonAPI.database.retry_on_busy before a write answers 503
+DATABASE_BUSY_RETRIES = 3
+
+# Catalog, order and reporting GETs read from this alias when it is configured.
+# LITTLELEMON_REPLICA names a second SQLite file that `manage.py replicate_sqlite` keeps in sync.
+READ_REPLICA_ALIAS = 'replica'
+# How long a writer keeps reading from the primary; longer than the replication lag
+REPLICA_STICKY_SECONDS = 5
+if os.environ.get('LITTLELEMON_REPLICA'):
+    DATABASES[READ_REPLICA_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['LITTLELEMON_REPLICA'],
+        'OPTIONS': {'init_command': 'PRAGMA query_only=ON;'},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['LittleLemonAPI.routers.PrimaryReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -127,15 +173,29 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-REST_FRAMEWORK = {
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+# JSON comes first so clients sending */* or no Accept header get it. The browsable API and
+# XML are for poking at the API by hand and are only offered in the debug profile.
+API_RENDERER_CLASSES = [
+    'LittleLemonAPI.renderers.FastJSONRenderer',
+    'LittleLemonAPI.renderers.MessagePackRenderer',
+]
+if DEBUG:
+    API_RENDERER_CLASSES += [
         'rest_framework.renderers.BrowsableAPIRenderer',
-        'rest_framework_xml.renderers.XMLRenderer', 
+        'rest_framework_xml.renderers.XMLRenderer',
+    ]
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'LittleLemonAPI.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
@@ -145,8 +205,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'LittleLemonAPI.throttling.SharedAnonRateThrottle',
+        'LittleLemonAPI.throttling.SharedUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '10/minute',
@@ -157,3 +217,47 @@ REST_FRAMEWORK = {
 DJOSER = {
     "USER_ID_FIELD": "username"
 }
+
+# Maximum number of cached menu/category responses kept per worker
+CATALOG_CACHE_SIZE = 1024
+
+# In-process token authentication cache; token deletions and deactivations reach every worker
+# through versions in THROTTLE_DATABASE, and entries expire anyway after the TTL
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60
+
+# Order status push (/api/orders/events). The in-process broker only reaches clients
+# connected to the same ASGI worker.
+ORDER_EVENTS_BROKER = 'LittleLemonAPI.events.InProcessBroker'
+ORDER_EVENTS_KEEPALIVE = 15
+
+# Serve menu, cart and order reads, registration and login from native async views (LittleLemon/asgi.py turns this on)
+ASYNC_READ_VIEWS = os.environ.get('LITTLELEMON_ASYNC_READ_VIEWS') == '1'
+
+# Per-request SQL count/time response headers (X-DB-Query-Count, ...)
+QUERY_METRICS_HEADERS = DEBUG
+
+# Token buckets behind the throttles and other state shared by every worker process on this host,
+# such as read-your-writes pins (see shared_state.py)
+THROTTLE_DATABASE = os.environ.get('LITTLELEMON_THROTTLE_DB', str(BASE_DIR / 'throttle.sqlite3'))
+
+# New orders go to the delivery crew member with the fewest undelivered orders (see dispatch.py).
+# Each worker keeps its own counts and re-reads them from the database this often.
+DISPATCH_AUTO_ASSIGN = True
+DISPATCH_RESYNC_SECONDS = 60
+
+# Background jobs queued by the order views and run by `manage.py run_jobs` (see jobs.py).
+# Failed jobs are retried after JOBS_RETRY_DELAY seconds, doubling up to JOBS_RETRY_MAX_DELAY;
+# a job still running after JOBS_LOCK_TIMEOUT seconds is assumed lost with its worker.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 3600
+JOBS_LOCK_TIMEOUT = 300
+
+# Registration and login hash passwords on a bounded thread pool per process (see hashing.py).
+# Requests beyond PASSWORD_HASHING_WORKERS running and PASSWORD_HASHING_QUEUE waiting get a 503;
+# a hash takes about half a second, so a deep queue only turns refusals into client timeouts.
+# The hashing threads run at this niceness so menu and order requests keep the CPU.
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASHING_QUEUE = 2 * PASSWORD_HASHING_WORKERS
+PASSWORD_HASHING_NICE = 10
@@ -0,0 +1,187 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .jobs import ORDER_DELETED, ORDER_PLACED, enqueue, on
+from .models import Order, OrderItem, DailySales, DailyCategorySales, DailyMenuItemSales, Job
+
+
+GROUP_BY_ITEM = 'item'
+GROUP_BY_CATEGORY = 'category'
+TIME_BUCKETS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+GROUP_BY_CHOICES = [GROUP_BY_ITEM, GROUP_BY_CATEGORY, *TIME_BUCKETS]
+
+CENT = Decimal('0.01')
+
+
+# INSERT ... ON CONFLICT DO UPDATE adding onto the existing counters (SQLite >= 3.24 and PostgreSQL)
+def _increment(model, key_fields, rows):
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    key_columns = [model._meta.get_field(name).column for name in key_fields]
+    columns = key_columns + ['orders', 'units', 'revenue']
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(rows))
+    updates = ', '.join(f'{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}' for column in columns[len(key_columns):])
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) VALUES {placeholders} "
+        f"ON CONFLICT ({', '.join(quote(column) for column in key_columns)}) DO UPDATE SET {updates}"
+    )
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+# Deletions only ever touch existing rows; a negative INSERT would trip the positive-value checks
+def _decrement(model, key_fields, rows):
+    for row in rows:
+        keys = dict(zip(key_fields, row))
+        orders, units, revenue = row[len(key_fields):]
+        model.objects.filter(**keys).update(orders=F('orders') - orders, units=F('units') - units, revenue=F('revenue') - revenue)
+
+
+# What one order adds to the daily rollups, in a JSON-safe shape so it can ride in a job payload.
+# order_items must have menu_item loaded.
+def order_sales(order, order_items):
+    lines = defaultdict(lambda: [0, Decimal(0)])
+    for order_item in order_items:
+        line = lines[(order_item.menu_item_id, order_item.menu_item.category_id)]
+        line[0] += order_item.quantity
+        line[1] += order_item.line_total
+    return {
+        'date': timezone.localdate(order.created_at).isoformat(),
+        'lines': [[menu_item_id, category_id, units, str(revenue)] for (menu_item_id, category_id), (units, revenue) in lines.items()],
+    }
+
+
+# Fold one order's sales into the daily rollups, or take them back out when the order is deleted.
+# Removing only makes sense once the sales are in: remove_sales below waits for record_sales.
+def apply_order_sales(sales, remove=False):
+    day = date.fromisoformat(sales['date'])
+    items = defaultdict(lambda: [0, Decimal(0)])
+    categories = defaultdict(lambda: [0, Decimal(0)])
+    for menu_item_id, category_id, units, revenue in sales['lines']:
+        for bucket in (items[menu_item_id], categories[category_id]):
+            bucket[0] += units
+            bucket[1] += Decimal(revenue)
+
+    units = sum(count for count, _ in items.values())
+    revenue = sum((amount for _, amount in items.values()), Decimal(0))
+    apply = _decrement if remove else _increment
+    apply(DailySales, ['date'], [(day, 1, units, revenue)])
+    apply(DailyCategorySales, ['date', 'category_id'], [
+        (day, category_id, 1, count, amount) for category_id, (count, amount) in categories.items()
+    ])
+    apply(DailyMenuItemSales, ['date', 'menu_item_id'], [
+        (day, menu_item_id, 1, count, amount) for menu_item_id, (count, amount) in items.items()
+    ])
+
+
+# Rollups are kept off the checkout path: the order views emit the sales and the job worker applies them
+@on(ORDER_PLACED)
+def record_sales(sales, **payload):
+    apply_order_sales(sales)
+
+
+# Workers run jobs in parallel and retry failures later, so an order's removal can come up before
+# its recording has run. Subtracting first would undercount, or trip the positive-value checks.
+@on(ORDER_DELETED)
+def remove_sales(sales, order_id, **payload):
+    recording = Job.objects.filter(name=record_sales.job_name, payload__order_id=order_id)
+    # A recording that gave up never counted the order; it goes with the order
+    if recording.filter(status=Job.FAILED).delete()[0]:
+        return
+    if recording.exists():
+        enqueue(remove_sales, delay=settings.JOBS_RETRY_DELAY, sales=sales, order_id=order_id, **payload)
+        return
+    apply_order_sales(sales, remove=True)
+
+
+# Recompute the rollups from orders with grouped aggregation in the database
+@transaction.atomic
+def rebuild_sales_rollups(batch_size=5000):
+    # The rebuild counts every order, including those whose rollup jobs haven't run yet. Deleting
+    # the jobs first also takes the write lock, and a worker mid-job loses its lock and rolls back.
+    Job.objects.filter(name__in=[record_sales.job_name, remove_sales.job_name]).delete()
+    for model in (DailySales, DailyCategorySales, DailyMenuItemSales):
+        model.objects.all().delete()
+
+    daily = (
+        Order.objects.annotate(day=TruncDate('created_at')).values('day')
+        .annotate(order_count=Count('id'), unit_count=Sum('item_count'), amount=Sum('total'))
+    )
+    DailySales.objects.bulk_create(
+        (DailySales(date=row['day'], orders=row['order_count'], units=row['unit_count'] or 0, revenue=row['amount'] or 0)
+         for row in daily.iterator()),
+        batch_size=batch_size,
+    )
+
+    lines = OrderItem.objects.filter(order__isnull=False).annotate(day=TruncDate('order__created_at'))
+    per_category = (
+        lines.values('day', category=F('menu_item__category_id'))
+        .annotate(order_count=Count('order_id', distinct=True), unit_count=Sum('quantity'), amount=Sum('line_total'))
+    )
+    DailyCategorySales.objects.bulk_create(
+        (DailyCategorySales(date=row['day'], category_id=row['category'], orders=row['order_count'], units=row['unit_count'], revenue=row['amount'])
+         for row in per_category.iterator()),
+        batch_size=batch_size,
+    )
+    per_item = (
+        lines.values('day', 'menu_item_id')
+        .annotate(order_count=Count('order_id', distinct=True), unit_count=Sum('quantity'), amount=Sum('line_total'))
+    )
+    DailyMenuItemSales.objects.bulk_create(
+        (DailyMenuItemSales(date=row['day'], menu_item_id=row['menu_item_id'], orders=row['order_count'], units=row['unit_count'], revenue=row['amount'])
+         for row in per_item.iterator()),
+        batch_size=batch_size,
+    )
+
+
+def _totals(queryset):
+    return queryset.annotate(order_count=Sum('orders'), unit_count=Sum('units'), amount=Sum('revenue'))
+
+
+def _row(row, **extra):
+    return {
+        **extra,
+        'orders': row['order_count'],
+        'units': row['unit_count'],
+        'revenue': str(Decimal(row['amount'] or 0).quantize(CENT)),
+    }
+
+
+# Revenue, units and orders grouped by menu item, category or time bucket, read from the rollups
+def sales_report(group_by, start=None, end=None):
+    dates = {}
+    if start is not None:
+        dates['date__gte'] = start
+    if end is not None:
+        dates['date__lte'] = end
+
+    if group_by == GROUP_BY_ITEM:
+        rows = _totals(
+            DailyMenuItemSales.objects.filter(**dates).values('menu_item_id', title=F('menu_item__title'))
+        ).order_by('-amount', 'menu_item_id')
+        return [_row(row, id=row['menu_item_id'], title=row['title']) for row in rows]
+
+    if group_by == GROUP_BY_CATEGORY:
+        rows = _totals(
+            DailyCategorySales.objects.filter(**dates).values('category_id', title=F('category__title'))
+        ).order_by('-amount', 'category_id')
+        return [_row(row, id=row['category_id'], title=row['title']) for row in rows]
+
+    trunc = TIME_BUCKETS[group_by]
+    period = trunc('date') if trunc is not None else F('date')
+    rows = _totals(DailySales.objects.filter(**dates).values(period=period)).order_by('period')
+    return [_row(row, period=row['period'].isoformat()) for row in rows]
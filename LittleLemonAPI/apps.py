@@ -1,6 +1,53 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, post_migrate, pre_delete, m2m_changed
 
 
 class LittlelemonapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'LittleLemonAPI'
+
+    def ready(self):
+        from django.contrib.auth.models import User, Group
+        from rest_framework.authtoken.models import Token
+        from . import analytics  # registers the sales rollup jobs
+        from . import authentication
+        from .cache import bump_catalog_version
+        from .conditional import menu_item_deleting
+        from . import dispatch
+        from .instrumentation import install_query_recorder
+        from .models import MenuItem, Category
+        from .roles import groups_changed, invalidate_all_roles, user_created_or_deleted
+        from .search import install_search_index
+
+        # Any write to the catalog invalidates every cached menu response
+        for model in (MenuItem, Category):
+            post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog-save-{model.__name__}')
+            post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog-delete-{model.__name__}')
+        # ...and the carts and orders its deletes cascade into
+        pre_delete.connect(menu_item_deleting, sender=MenuItem, dispatch_uid='menu-item-delete-cascade')
+
+        # Group membership changes invalidate cached roles, whichever side they come from
+        m2m_changed.connect(groups_changed, sender=User.groups.through, dispatch_uid='roles-groups-changed')
+        post_save.connect(invalidate_all_roles, sender=Group, dispatch_uid='roles-group-save')
+        post_delete.connect(invalidate_all_roles, sender=Group, dispatch_uid='roles-group-delete')
+        post_save.connect(user_created_or_deleted, sender=User, dispatch_uid='roles-user-save')
+        post_delete.connect(user_created_or_deleted, sender=User, dispatch_uid='roles-user-delete')
+
+        # Cached token authentications carry the user, so they go when the token or the user's access does
+        post_delete.connect(authentication.token_deleted, sender=Token, dispatch_uid='auth-token-delete')
+        post_save.connect(authentication.user_saved, sender=User, dispatch_uid='auth-user-save')
+
+        # The dispatcher reloads couriers after crew changes. New users count too: SQLite may
+        # reuse a deleted courier's id.
+        m2m_changed.connect(dispatch.dispatcher.invalidate, sender=User.groups.through, dispatch_uid='dispatch-groups-changed')
+        post_save.connect(dispatch.dispatcher.invalidate, sender=Group, dispatch_uid='dispatch-group-save')
+        post_delete.connect(dispatch.dispatcher.invalidate, sender=Group, dispatch_uid='dispatch-group-delete')
+        post_save.connect(dispatch.user_saved, sender=User, dispatch_uid='dispatch-user-save')
+        post_delete.connect(dispatch.dispatcher.invalidate, sender=User, dispatch_uid='dispatch-user-delete')
+
+        # Per-request query counts (QueryMetricsMiddleware) on every connection, in every thread
+        connection_created.connect(install_query_recorder, dispatch_uid='metrics-install-recorder')
+
+        # The FTS5 menu search index and its sync triggers live outside the migration graph
+        post_migrate.connect(install_search_index, sender=self, dispatch_uid='search-install-index')
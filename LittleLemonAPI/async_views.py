@@ -0,0 +1,198 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+
+from .cache import CatalogCacheMixin, catalog_cache, _detach
+from .conditional import add_validators, cart_read_collections, collection_state, conditional_get, customer_orders_collection, evaluate, order_read_collections
+from .fast_serializers import menu_item_values, cart_item_values, order_values
+from .hashing import aauthenticate_user, ahash_password, shed_when_saturated
+from .instrumentation import QueryMetricsMixin
+from .models import MenuItem, CartMenuItem, Order, OrderItem
+from .pagination import AsyncPageNumberPagination, OrderCursorPagination
+from .roles import aget_roles, MANAGER, DELIVERY_CREW
+from .routers import ReplicaReadMixin
+from .serializers import MenuItemSerializer, OrderItemSerializer
+from .throttling import SharedAnonRateThrottle, SharedUserRateThrottle
+from . import views
+
+
+# GenericAPIView with an async dispatch. Authentication, permissions and throttles are DRF's
+# own sync checks run off the event loop; handlers are coroutines that use the async ORM.
+class AsyncAPIView(QueryMetricsMixin, generics.GenericAPIView):
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, request.method.lower(), None)
+            if handler is None or request.method.lower() not in self.http_method_names:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+# Serve GET/HEAD from the async view and everything else from the existing sync viewset
+def read_async(async_view, sync_view):
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    # Routed like the sync viewset, so QueryMetricsMiddleware names its actions
+    view.cls = sync_view.cls
+    view.actions = sync_view.actions
+    return csrf_exempt(view)
+
+
+# /api/menu-items, /api/menu-items/{menuItem}
+class MenuItemsAsyncView(ReplicaReadMixin, CatalogCacheMixin, AsyncAPIView):
+    throttle_classes = [SharedAnonRateThrottle, SharedUserRateThrottle]
+    permission_classes = [AllowAny]
+    queryset = MenuItem.objects.select_related('category')
+    serializer_class = MenuItemSerializer
+    pagination_class = AsyncPageNumberPagination
+    ordering_fields = views.MenuItemsViewSet.ordering_fields
+    filter_backends = views.MenuItemsViewSet.filter_backends
+    search_fields = views.MenuItemsViewSet.search_fields
+    # Shares cached pages and query metrics with the sync viewset
+    catalog_cache_name = 'MenuItemsViewSet'
+    metrics_name = 'MenuItemsViewSet'
+    replica_pins = views.MenuItemsViewSet.replica_pins
+    live_inventory = views.MenuItemsViewSet.live_inventory
+
+    async def get(self, request, pk=None):
+        self.action = 'list' if pk is None else 'retrieve'
+        etag, modified, key, inventory, response = await sync_to_async(self._catalog_lookup)(request)
+        if response is not None:
+            return add_validators(response, etag, modified, private=False)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if pk is None:
+            page = await self.paginator.apaginate_queryset(menu_item_values.values(queryset), request, view=self)
+            response = self.get_paginated_response(await menu_item_values.ato_representation(page))
+        else:
+            try:
+                instance = await queryset.aget(pk=pk)
+            except MenuItem.DoesNotExist:
+                raise Http404(f'No {MenuItem._meta.object_name} matches the given query.')
+            response = Response(self.get_serializer(instance).data, status=status.HTTP_200_OK)
+
+        catalog_cache.set(key, (_detach(response.data), inventory))
+        return add_validators(response, etag, modified, private=False)
+
+
+# /api/cart/menu-items
+class CartMenuItemsAsyncView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    metrics_name = 'CartMenuItemsViewSet'
+
+    @conditional_get(cart_read_collections)
+    async def get(self, request):
+        self.action = 'list'
+        cart_items = [item async for item in cart_item_values.values(CartMenuItem.objects.filter(user=request.user))]
+        return Response(await cart_item_values.ato_representation(cart_items), status=status.HTTP_200_OK)
+
+
+# /api/orders, /api/orders/{orderId}
+class OrderAsyncView(ReplicaReadMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
+    # Like the sync viewset, which has no filter backends: ?ordering= and ?search= are ignored
+    filter_backends = []
+    metrics_name = 'OrderViewSet'
+
+    async def get(self, request, pk=None):
+        self.action = 'list' if pk is None else 'retrieve'
+        if pk is not None:
+            return await self.retrieve(request, pk)
+        return await self.list(request)
+
+    @conditional_get(order_read_collections)
+    async def list(self, request):
+        user = request.user
+        roles = await aget_roles(user)
+        if MANAGER in roles:
+            orders = Order.objects.all()
+        elif DELIVERY_CREW in roles:
+            orders = Order.objects.filter(delivery_crew=user)
+        else:
+            orders = Order.objects.filter(user=user)
+
+        page = await self.paginator.apaginate_queryset(order_values.values(orders), request, view=self)
+        return self.paginator.get_paginated_response(await order_values.ato_representation(page))
+
+    async def retrieve(self, request, pk):
+        try:
+            order = await Order.objects.aget(pk=pk)
+        except Order.DoesNotExist:
+            return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if order.user_id != request.user.pk and MANAGER not in await aget_roles(request.user):
+            return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
+
+        state, last_modified = await sync_to_async(collection_state)([customer_orders_collection(order.user_id)])
+        etag, last_modified, response = evaluate(request, state, last_modified)
+        if response is None:
+            items = [item async for item in OrderItem.objects.filter(order_id=order.pk)]
+            serializer = OrderItemSerializer(items, many=True)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
+
+
+# /api/users: views.users with the database work on the async ORM and the hashing on the hashing pool
+class UsersAsyncView(AsyncAPIView):
+    metrics_name = 'users'
+
+    @shed_when_saturated
+    async def post(self, request):
+        username = request.data.get('username')
+        email = request.data.get('email')
+        password = request.data.get('password')
+
+        if not all([username, email, password]):
+            return Response({"error": "Username, email, and password are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if await User.objects.filter(username=username).aexists():
+            return Response({"error": "Username already exists."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if await User.objects.filter(email=email).aexists():
+            return Response({"error": "Email already exists."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = User(username=User.normalize_username(username), email=User.objects.normalize_email(email), password=await ahash_password(password))
+        await user.asave()
+        return Response({"detail": "User created successfully."}, status=status.HTTP_201_CREATED)
+
+
+# /token/login: views.tokens, likewise
+class TokensAsyncView(AsyncAPIView):
+    metrics_name = 'tokens'
+
+    @shed_when_saturated
+    async def post(self, request):
+        username = request.data.get('username')
+        password = request.data.get('password')
+
+        if not all([username, password]):
+            return Response({"error": "Username, and password are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await aauthenticate_user(username, password, request._request)
+        if user is None:
+            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        token, created = await Token.objects.aget_or_create(user=user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
@@ -0,0 +1,71 @@
+import copy
+import hashlib
+import logging
+import sqlite3
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import LRUCache
+from .shared_state import bump_versions, shared_values
+
+
+logger = logging.getLogger(__name__)
+
+token_cache = LRUCache(
+    getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60),
+)
+
+
+# Per-token version counter in the host's shared state file, named by a digest so keys stay out of it
+def _version_key(key):
+    return f'auth-token:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}'
+
+
+# None when the shared state file can't be read
+def _token_version(key):
+    version_key = _version_key(key)
+    try:
+        return shared_values.get_many([version_key]).get(version_key, 0)
+    except sqlite3.Error:
+        logger.exception('Could not read the token version, authenticating from the database')
+        return None
+
+
+# TokenAuthentication that remembers token key -> (user, token) in a bounded TTL/LRU cache, so
+# authenticated requests skip the token/user join. Entries carry the token's version, which is
+# bumped when the token is deleted or its user deactivated or given a new password, so every
+# worker drops the entry on its next request. Roles are not kept here; get_roles has its own cache.
+class CachedTokenAuthentication(TokenAuthentication):
+    model = Token
+
+    def authenticate_credentials(self, key):
+        version = _token_version(key)
+        entry = token_cache.get(key) if version is not None else None
+        if entry is None or entry[2] != version:
+            user, token = super().authenticate_credentials(key)
+            entry = (user, token, version)
+            if version is not None:
+                token_cache.set(key, entry)
+        user, token, _ = entry
+        # Every request gets its own copy so per-request state never leaks between threads
+        return (copy.copy(user), token)
+
+
+def forget_users(*user_ids):
+    keys = Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True)
+    bump_versions(*[_version_key(key) for key in keys])
+
+
+def token_deleted(sender, instance, **kwargs):
+    bump_versions(_version_key(instance.key))
+
+
+# Only deactivation and password changes matter to cached authentications. Saves that name
+# other fields, such as last_login, skip the token lookup; a plain save() may have changed anything.
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not {'is_active', 'password'} & set(update_fields)):
+        return
+    forget_users(instance.pk)
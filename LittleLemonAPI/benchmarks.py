@@ -0,0 +1,151 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.db import connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+# Helpers shared by the bench_* management commands.
+# Benchmarks run against a throwaway test database, never against db.sqlite3.
+
+@contextmanager
+def isolated_database(alias='default', verbosity=0):
+    # Same environment as the test runner: testserver host allowed, DEBUG off, locmem email
+    setup_test_environment(debug=False)
+    connection = connections[alias]
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        teardown_test_environment()
+
+
+# Temporarily override class attributes, e.g. a view's authentication or throttle classes
+@contextmanager
+def patched(target, **attrs):
+    saved = {name: target.__dict__[name] for name in attrs if name in target.__dict__}
+    for name, value in attrs.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name in attrs:
+            if name in saved:
+                setattr(target, name, saved[name])
+            else:
+                delattr(target, name)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    # samples are in seconds, the summary is in milliseconds
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def measure(fn, iterations, warmup=10):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+DISH_WORDS = ['Spicy', 'Smoked', 'Grilled', 'Crispy', 'Roasted', 'Garlic', 'Lemon', 'Chicken', 'Salmon', 'Tofu',
+              'Lamb', 'Mushroom', 'Prawn', 'Risotto', 'Salad', 'Flatbread', 'Pasta', 'Bowl', 'Curry', 'Soup']
+
+
+# Bulk fixture generator for benchmarks: staff and customers with API tokens, a catalog,
+# open carts and a history of orders. Everything goes in with bulk_create and no password
+# hashing, so even the large profiles seed in seconds.
+def seed_dataset(rng, managers=2, delivery_crew=10, customers=200, categories=8, menu_items=500,
+                 orders=5000, open_carts=20, days=90):
+    from .analytics import rebuild_sales_rollups
+    from .models import Category, MenuItem, CartMenuItem, Order, OrderItem
+    from .roles import MANAGER, DELIVERY_CREW
+
+    unusable = make_password(None)
+    def create_users(prefix, count):
+        return User.objects.bulk_create(
+            User(username=f'{prefix}{n}', email=f'{prefix}{n}@example.com', password=unusable) for n in range(count)
+        )
+    staff = {MANAGER: create_users('manager', managers), DELIVERY_CREW: create_users('crew', delivery_crew)}
+    customer_users = create_users('customer', customers)
+    memberships = []
+    for name, users in staff.items():
+        group, created = Group.objects.get_or_create(name=name)
+        memberships.extend(User.groups.through(user_id=user.pk, group_id=group.pk) for user in users)
+    User.groups.through.objects.bulk_create(memberships)
+    tokens = Token.objects.bulk_create(
+        Token(key=Token.generate_key(), user=user) for users in (*staff.values(), customer_users) for user in users
+    )
+
+    category_rows = Category.objects.bulk_create(
+        Category(slug=f'category-{n}', title=f'Category {n}') for n in range(categories)
+    )
+    items = MenuItem.objects.bulk_create(
+        MenuItem(
+            title=f'{rng.choice(DISH_WORDS)} {rng.choice(DISH_WORDS)} {n}',
+            price=Decimal(rng.randint(300, 3000)) / 100, inventory=30000, category=rng.choice(category_rows),
+        )
+        for n in range(menu_items)
+    )
+    CartMenuItem.objects.bulk_create(
+        CartMenuItem(user=user, menu_item=item, quantity=rng.randint(1, 3))
+        for user in rng.sample(customer_users, min(open_carts, len(customer_users)))
+        for item in rng.sample(items, 3)
+    )
+
+    now = timezone.now()
+    crew = staff[DELIVERY_CREW]
+    for start in range(0, orders, 5000):
+        history = []
+        for _ in range(start, min(start + 5000, orders)):
+            lines = []
+            for item in rng.sample(items, rng.randint(1, 4)):
+                quantity = rng.randint(1, 3)
+                lines.append(OrderItem(menu_item=item, quantity=quantity, unit_price=item.price, line_total=item.price * quantity))
+            delivered = rng.random() < 0.9
+            order = Order(
+                user=rng.choice(customer_users), delivery_crew=rng.choice(crew) if crew and delivered else None,
+                status=delivered, created_at=now - timedelta(seconds=rng.randint(0, days * 86400)),
+                total=sum(line.line_total for line in lines), item_count=sum(line.quantity for line in lines),
+            )
+            history.append((order, lines))
+        Order.objects.bulk_create(order for order, lines in history)
+        order_items = []
+        for order, lines in history:
+            for line in lines:
+                line.order = order
+                order_items.append(line)
+        OrderItem.objects.bulk_create(order_items)
+    rebuild_sales_rollups()
+
+    return SimpleNamespace(
+        managers=staff[MANAGER], delivery_crew=crew, customers=customer_users, menu_items=items,
+        categories=category_rows, tokens={token.user_id: token.key for token in tokens},
+    )
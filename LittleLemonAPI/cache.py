@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .conditional import CATALOG_COLLECTION, INVENTORY_COLLECTION, add_validators, collection_state, evaluate, touch
+from .models import MenuItem
+from .routers import CATALOG, pin_to_primary
+
+
+# Bounded LRU map with hit/miss counters and an optional per-entry TTL, safe to share between request threads
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+catalog_cache = LRUCache(getattr(settings, 'CATALOG_CACHE_SIZE', 1024))
+
+
+# A new catalog version in the database, which every worker process reads, so each one stops
+# using its cached pages. Call it inside the write's transaction where there is one.
+def bump_catalog_version(**kwargs):
+    # Catalog reads stay on the primary until the replica has the change as well
+    pin_to_primary(CATALOG)
+    touch(CATALOG_COLLECTION)
+
+
+# Plain copies so cached payloads don't pin serializers and model instances in memory
+def _detach(data):
+    if isinstance(data, dict):
+        return {key: _detach(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_detach(value) for value in data]
+    return data
+
+
+# Current stock for the menu items in a payload (a page, a list or one item), from one query
+def _with_inventory(data):
+    if isinstance(data, dict) and 'results' in data:
+        items = data['results']
+    else:
+        items = data if isinstance(data, list) else [data]
+    stock = dict(MenuItem.objects.filter(pk__in=[item['id'] for item in items]).values_list('id', 'inventory'))
+    for item in items:
+        item['inventory'] = stock.get(item['id'], item['inventory'])
+    return data
+
+
+# Read-through cache for list/retrieve on catalog viewsets, answering conditional GETs as well.
+# Entries are keyed by the catalog's version row, one primary key lookup per request. The row is
+# shared by every worker process, so a write anywhere retires every worker's cached pages; they
+# are never served again and simply age out of the LRU. The version is read before the page, so
+# an entry is never older than the version it is filed under.
+# Stock has a version row of its own that checkouts bump. Entries remember the stock version they
+# were built at and are refreshed with current stock, one query, when it has moved on.
+class CatalogCacheMixin:
+    # Views that serve the same payloads (e.g. the async menu view) share entries by using the same name
+    catalog_cache_name = None
+    # Payloads are menu items, whose inventory checkouts change
+    live_inventory = False
+
+    def _catalog_collections(self):
+        return [CATALOG_COLLECTION, INVENTORY_COLLECTION] if self.live_inventory else [CATALOG_COLLECTION]
+
+    def _catalog_cache_key(self, request, state):
+        catalog_state, _, inventory_state = state.partition(',')
+        # Sorted by stock, a page's items change with it, so its entries can't outlive a checkout
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '')
+        version = state if 'inventory' in ordering else catalog_state
+        params = tuple((name, tuple(values)) for name, values in sorted(request.query_params.lists()))
+        # The host is part of the key because pagination links are absolute URLs
+        return (version, self.catalog_cache_name or type(self).__name__, self.action, request.get_host(), tuple(sorted(self.kwargs.items())), params)
+
+    # (etag, last modified, cache key, stock version, response); the response is a 304, a cache hit or None
+    def _catalog_lookup(self, request):
+        state, last_modified = collection_state(self._catalog_collections())
+        etag, modified, response = evaluate(request, state, last_modified)
+        key, inventory = self._catalog_cache_key(request, state), state.partition(',')[2]
+        if response is None:
+            entry = catalog_cache.get(key)
+            if entry is not None:
+                data, cached_inventory = entry
+                if cached_inventory != inventory:
+                    data = _with_inventory(_detach(data))
+                    catalog_cache.set(key, (data, inventory))
+                response = Response(data, status=status.HTTP_200_OK)
+        return etag, modified, key, inventory, response
+
+    def _cached(self, request, handler, *args, **kwargs):
+        etag, modified, key, inventory, response = self._catalog_lookup(request)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                catalog_cache.set(key, (_detach(response.data), inventory))
+        return add_validators(response, etag, modified, private=False)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from .models import CartMenuItem, CollectionVersion, Order
+from .roles import is_manager, is_delivery_crew
+
+
+# Conditional GET (ETag / Last-Modified / 304) for collection endpoints.
+# Every write to a collection gives it a new random version in CollectionVersion, so a
+# response's validators come from one primary key lookup instead of the query behind it.
+CATALOG_COLLECTION = 'catalog'
+# Menu item stock, which every checkout changes; kept apart so checkouts leave the rest of the catalog cached
+INVENTORY_COLLECTION = 'inventory'
+ALL_ORDERS = 'orders'
+
+
+def cart_collection(user_id):
+    return f'cart:{user_id}'
+
+
+def customer_orders_collection(user_id):
+    return f'orders:user:{user_id}'
+
+
+# Every order list an order shows up in: all orders (managers), its customer's and its couriers'
+def order_collections(user_id, *crew_ids):
+    return [ALL_ORDERS, customer_orders_collection(user_id)] + [f'orders:crew:{crew_id}' for crew_id in crew_ids if crew_id is not None]
+
+
+# What GET /api/cart/menu-items is built from
+def cart_read_collections(view, request, *args, **kwargs):
+    return [cart_collection(request.user.pk)]
+
+
+# What GET /api/orders is built from, following the role checks in OrderViewSet.list.
+# A single order is validated against its customer's collection once the caller is allowed to see it.
+def order_read_collections(view, request, **kwargs):
+    user = request.user
+    if is_manager(user):
+        return [ALL_ORDERS]
+    if is_delivery_crew(user):
+        return [f'orders:crew:{user.pk}']
+    # Other users only ever read their own orders
+    return [customer_orders_collection(user.pk)]
+
+
+# Called from every write path, inside the write's transaction where there is one
+def touch(*collections):
+    now = timezone.now()
+    CollectionVersion.objects.bulk_create(
+        [CollectionVersion(key=key, version=uuid.uuid4(), changed_at=now) for key in dict.fromkeys(collections)],
+        update_conflicts=True, unique_fields=['key'], update_fields=['version', 'changed_at'],
+    )
+
+
+# pre_delete receiver for MenuItem: the delete cascades to cart lines and order items, so the
+# carts and orders holding the item change with it. Read before the cascade removes the rows.
+def menu_item_deleting(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    cart_users = CartMenuItem.objects.using(using).filter(menu_item=instance).values_list('user_id', flat=True)
+    orders = Order.objects.using(using).filter(items__menu_item=instance).values_list('user_id', 'delivery_crew_id').distinct()
+    touch(
+        *[cart_collection(user_id) for user_id in cart_users],
+        *[collection for user_id, crew_id in orders for collection in order_collections(user_id, crew_id)],
+    )
+
+
+# (state, last modified) of some collections. Collections nobody has written to since
+# versioning started have no row and a fixed state until their first write.
+def collection_state(collections):
+    rows = {key: (version, changed_at) for key, version, changed_at in
+            CollectionVersion.objects.filter(key__in=collections).values_list('key', 'version', 'changed_at')}
+    state = ','.join(f"{key}={rows[key][0].hex if key in rows else '-'}" for key in collections)
+    return state, max((changed_at for version, changed_at in rows.values()), default=None)
+
+
+# Returns (etag, last_modified timestamp, 304 response or None)
+def evaluate(request, state, last_modified):
+    # The same data renders differently per URL, host (absolute pagination links) and format
+    material = '\n'.join([state, request.get_full_path(), request.get_host(), request.accepted_media_type or ''])
+    etag = quote_etag(hashlib.blake2b(material.encode(), digest_size=16).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def add_validators(response, etag, last_modified, private=True):
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Clients may keep the body but have to revalidate it before every use
+        patch_cache_control(response, no_cache=True, **({'private': True} if private else {}))
+    return response
+
+
+# Decorator for GET handlers on viewsets and AsyncAPIViews. collections(view, request, *args, **kwargs)
+# names the collections the response is built from; it runs after authentication and permissions.
+def conditional_get(collections, private=True):
+    def prepare(view, request, args, kwargs):
+        return evaluate(request, *collection_state(collections(view, request, *args, **kwargs)))
+
+    def decorator(handler):
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def wrapper(view, request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await handler(view, request, *args, **kwargs)
+                etag, last_modified, response = await sync_to_async(prepare)(view, request, args, kwargs)
+                if response is None:
+                    response = await handler(view, request, *args, **kwargs)
+                return add_validators(response, etag, last_modified, private)
+        else:
+            @functools.wraps(handler)
+            def wrapper(view, request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return handler(view, request, *args, **kwargs)
+                etag, last_modified, response = prepare(view, request, args, kwargs)
+                if response is None:
+                    response = handler(view, request, *args, **kwargs)
+                return add_validators(response, etag, last_modified, private)
+        return wrapper
+    return decorator
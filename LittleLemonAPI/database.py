@@ -0,0 +1,42 @@
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections, DEFAULT_DB_ALIAS
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def is_busy_error(exc):
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+# Run a whole transaction again when SQLite reports the database as locked. Only the
+# outermost call retries: inside an atomic block the enclosing transaction is already
+# broken, so the error is passed up to whoever owns it.
+def run_with_retry(fn, *args, attempts=None, backoff=0.05, using=DEFAULT_DB_ALIAS, **kwargs):
+    attempts = attempts or settings.DATABASE_BUSY_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_busy_error(exc) or attempt == attempts or connections[using].in_atomic_block:
+                raise
+            # Jittered exponential backoff so retrying writers don't collide again
+            time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+
+# View decorator for write endpoints: retries on lock errors, then answers 503 with Retry-After
+def retry_on_busy(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return run_with_retry(view, *args, **kwargs)
+        except OperationalError as exc:
+            if not is_busy_error(exc):
+                raise
+            return Response({"error": "The database is busy, please retry."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+    return wrapper
@@ -0,0 +1,147 @@
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+
+from .conditional import order_collections, touch
+from .events import publish_order_change
+from .models import Order
+from .roles import DELIVERY_CREW, is_delivery_crew
+
+
+OPEN = 0
+
+
+def is_open(status):
+    return int(status) == OPEN
+
+
+# Couriers in a min-heap keyed on how many undelivered orders they hold, so picking the
+# least busy one is O(log n) instead of counting every courier's orders per checkout.
+# Counts are loaded from the database on first use and kept current by the order views.
+# Each worker process has its own copy and only sees its own assignments, so the heap is
+# re-synced from the database every DISPATCH_RESYNC_SECONDS to fold in the others' work.
+class Dispatcher:
+    def __init__(self, resync_seconds=None):
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._open = {}
+        # (open orders, courier id); entries whose count no longer matches _open are stale and skipped
+        self._heap = []
+        self._loaded_at = None
+
+    def _load(self):
+        # Read from the primary: a lagging replica would hand out couriers by old counts
+        rows = (
+            User.objects.using(DEFAULT_DB_ALIAS).filter(groups__name=DELIVERY_CREW, is_active=True)
+            .annotate(open_orders=Count('deliveries', filter=Q(deliveries__status=OPEN)))
+            .values_list('pk', 'open_orders')
+        )
+        self._open = dict(rows)
+        self._heap = [(count, courier_id) for courier_id, count in self._open.items()]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or (
+            self.resync_seconds is not None and time.monotonic() - self._loaded_at > self.resync_seconds
+        ):
+            self._load()
+
+    # Next courier for a new order, counted as holding it from now on; None when there are no couriers
+    def assign(self):
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap:
+                count, courier_id = self._heap[0]
+                if self._open.get(courier_id) != count:
+                    heapq.heappop(self._heap)
+                    continue
+                self._open[courier_id] = count + 1
+                heapq.heapreplace(self._heap, (count + 1, courier_id))
+                return courier_id
+            return None
+
+    # Take back an assignment whose order was never saved
+    def release(self, courier_id):
+        self.order_changed(courier_id, True, None, False)
+
+    # An order changed hands or status; open orders are what couriers are balanced on
+    def order_changed(self, previous_crew_id, was_open, crew_id, now_open):
+        before = previous_crew_id if was_open else None
+        after = crew_id if now_open else None
+        if before == after:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                # Nothing to adjust; the first assignment loads current counts
+                return
+            for courier_id, delta in ((before, -1), (after, 1)):
+                if courier_id in self._open:
+                    self._open[courier_id] = max(0, self._open[courier_id] + delta)
+                    heapq.heappush(self._heap, (self._open[courier_id], courier_id))
+            # Drop stale entries once they outnumber live ones
+            if len(self._heap) > 2 * len(self._open) + 64:
+                self._heap = [(count, courier_id) for courier_id, count in self._open.items()]
+                heapq.heapify(self._heap)
+
+    # Deactivated couriers stop getting orders and reactivated ones start again
+    def user_changed(self, user):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            tracked = user.pk in self._open
+        if tracked != (user.is_active and is_delivery_crew(user)):
+            self.invalidate()
+
+    # Couriers joined or left the crew: rebuild on next use
+    def invalidate(self, **kwargs):
+        with self._lock:
+            self._loaded_at = None
+
+    def open_orders(self):
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._open)
+
+
+dispatcher = Dispatcher(resync_seconds=getattr(settings, 'DISPATCH_RESYNC_SECONDS', 60))
+
+
+def user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        dispatcher.invalidate()
+    elif update_fields is None or 'is_active' in update_fields:
+        dispatcher.user_changed(instance)
+
+
+# Hand every undelivered order without a courier to the least busy ones, e.g. after
+# couriers join or when auto-assignment was off. Returns the number of orders assigned.
+def dispatch_unassigned(batch_size=500):
+    assigned = 0
+    while True:
+        orders = list(
+            Order.objects.using(DEFAULT_DB_ALIAS).filter(status=OPEN, delivery_crew__isnull=True)
+            .order_by('pk').values_list('pk', 'user_id')[:batch_size]
+        )
+        if not orders:
+            return assigned
+        by_courier, no_couriers = {}, False
+        for order_id, user_id in orders:
+            courier_id = dispatcher.assign()
+            if courier_id is None:
+                no_couriers = True
+                break
+            by_courier.setdefault(courier_id, []).append((order_id, user_id))
+        for courier_id, batch in by_courier.items():
+            Order.objects.filter(pk__in=[order_id for order_id, user_id in batch]).update(delivery_crew_id=courier_id)
+            touch(*[collection for order_id, user_id in batch for collection in order_collections(user_id, courier_id)])
+            for order_id, user_id in batch:
+                publish_order_change(order_id, user_id, courier_id, OPEN)
+            assigned += len(batch)
+        if no_couriers:
+            return assigned
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# Fan-out of order change events to async subscribers living on an event loop.
+# Publishing is thread-safe, so sync views running in worker threads can feed ASGI streams.
+class InProcessBroker:
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue_size))
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = [subscription for channel in channels for subscription in self._subscribers.get(channel, ())]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop is already closed; its stream will unsubscribe itself
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+# Slow consumers lose the oldest events rather than growing memory without bound
+def _offer(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'ORDER_EVENTS_BROKER', 'LittleLemonAPI.events.InProcessBroker'))()
+    return _broker
+
+
+def order_channel(user_id):
+    return f'user:{user_id}'
+
+
+# Notify the customer, the assigned crew member and any crew member the order was taken from.
+# Events go out only once the surrounding transaction commits.
+def publish_order_change(order_id, user_id, delivery_crew_id, status, previous_crew_id=None, deleted=False):
+    event = {
+        'event': 'deleted' if deleted else 'updated',
+        'id': order_id,
+        'status': status,
+        'delivery_crew': delivery_crew_id,
+    }
+    recipients = {user_id, delivery_crew_id, previous_crew_id} - {None}
+    channels = [order_channel(recipient) for recipient in recipients]
+    transaction.on_commit(lambda: get_broker().publish(channels, event))
@@ -0,0 +1,82 @@
+import csv
+import json
+from itertools import groupby, islice
+
+from asgiref.sync import sync_to_async
+from django.db import router
+
+from .models import Order
+
+
+COLUMNS = [
+    'order_id', 'created_at', 'user_id', 'delivery_crew_id', 'status', 'total', 'item_count',
+    'item_id', 'menu_item_id', 'quantity', 'unit_price', 'line_total',
+]
+ORDER_COLUMNS = COLUMNS[:7]
+ITEM_COLUMNS = COLUMNS[7:]
+
+_LOOKUPS = [
+    'id', 'created_at', 'user_id', 'delivery_crew_id', 'status', 'total', 'item_count',
+    'items__id', 'items__menu_item_id', 'items__quantity', 'items__unit_price', 'items__line_total',
+]
+
+
+# Orders left-joined with their items, read from a server-side cursor in chunks. An order
+# without items is one row with empty item columns. Rows come out grouped by order so
+# NDJSON can fold them back together while streaming.
+def order_rows(status=None, delivery_crew=None, start=None, end=None, chunk_size=2000):
+    # The database is chosen now: the rows are read after the view has returned
+    rows = Order.objects.using(router.db_for_read(Order))
+    if status is not None:
+        rows = rows.filter(status=status)
+    if delivery_crew is not None:
+        rows = rows.filter(delivery_crew_id=delivery_crew)
+    if start is not None:
+        rows = rows.filter(created_at__date__gte=start)
+    if end is not None:
+        rows = rows.filter(created_at__date__lte=end)
+    return rows.order_by('id', 'items__id').values_list(*_LOOKUPS).iterator(chunk_size=chunk_size)
+
+
+def _plain(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+# csv.writer wants a file; this one hands each formatted line straight back
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([_plain(value) for value in row])
+
+
+def ndjson_stream(rows):
+    for _, lines in groupby(rows, key=lambda row: row[0]):
+        lines = list(lines)
+        order = dict(zip(ORDER_COLUMNS, map(_plain, lines[0][:len(ORDER_COLUMNS)])))
+        order['items'] = [
+            dict(zip(ITEM_COLUMNS, map(_plain, line[len(ORDER_COLUMNS):]))) for line in lines if line[len(ORDER_COLUMNS)] is not None
+        ]
+        yield json.dumps(order) + '\n'
+
+
+# Under ASGI Django drains a sync iterator into a list before sending any of it. This hands
+# the stream over `chunk_size` lines at a time instead, each batch read on the thread that
+# owns the request's database connection.
+async def aiterate(lines, chunk_size=500):
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, chunk_size)), thread_sensitive=True)
+    try:
+        while batch := await next_batch():
+            yield batch
+    finally:
+        # A client that goes away mid-export must not leave the cursor open
+        await sync_to_async(lines.close, thread_sensitive=True)()
@@ -0,0 +1,136 @@
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .serializers import MenuItemSerializer, CartMenuItemSerializer, OrderSerializer
+
+
+# Fields whose to_representation() returns database values unchanged
+PASSTHROUGH_FIELDS = {
+    serializers.IntegerField, serializers.BigIntegerField, serializers.CharField,
+    serializers.SlugField, serializers.EmailField, serializers.ChoiceField,
+}
+
+
+# Read-only twin of a ModelSerializer that builds the same output from .values() rows instead
+# of model instances. The serializer's fields are compiled once into (output key, column, mapper)
+# entries: plain columns are copied, everything else goes through the DRF field's own
+# to_representation(), so rendered JSON is byte-for-byte what the serializer produces.
+# Supports model fields, primary-key relations, nested forward relations and nested reverse
+# foreign keys (fetched with one extra query per list); anything else is rejected up front.
+class ValuesSerializer:
+    def __init__(self, serializer_class, prefix=''):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.prefix = prefix
+
+    # One (output key, column, mapper, related) entry per readable field, in the serializer's order.
+    # related is a ValuesSerializer for nested objects (column is its primary key) and for nested
+    # lists (column is our primary key, rows come from a separate query).
+    @cached_property
+    def plan(self):
+        fields, columns, children = [], [], []
+        pk_column = self.prefix + self.model._meta.pk.attname
+        for field in self.serializer_class()._readable_fields:
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name} has no single column to read.')
+            model_field = self.model._meta.get_field(field.source)
+            if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+                if not model_field.one_to_many:
+                    raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name} is not a reverse foreign key.')
+                related = self._related(field, type(field.child))
+                children.append((field.field_name, model_field.field.attname, related))
+                fields.append((field.field_name, pk_column, None, related))
+            elif isinstance(field, serializers.ModelSerializer):
+                if not (model_field.many_to_one or model_field.one_to_one) or model_field.auto_created:
+                    raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name} is not a forward relation.')
+                related = self._related(field, type(field), prefix=f'{self.prefix}{model_field.name}__')
+                columns += related.plan['columns']
+                fields.append((field.field_name, related.plan['pk'], None, related))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                columns.append(self.prefix + model_field.attname)
+                fields.append((field.field_name, self.prefix + model_field.attname, None, None))
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name}: only primary key relations are supported.')
+            else:
+                mapper = None if type(field) in PASSTHROUGH_FIELDS else field.to_representation
+                columns.append(self.prefix + model_field.attname)
+                fields.append((field.field_name, self.prefix + model_field.attname, mapper, None))
+        columns = list(dict.fromkeys([pk_column] + columns))
+        return {'pk': pk_column, 'columns': columns, 'fields': fields, 'children': children}
+
+    def _related(self, field, serializer_class, prefix=''):
+        related = ValuesSerializer(serializer_class, prefix)
+        if related.plan['children']:
+            raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name}: nested lists only go one level deep.')
+        return related
+
+    def values(self, queryset):
+        return queryset.values(*self.plan['columns'])
+
+    # Rows from values(); same shape as serializer(instances, many=True).data
+    def to_representation(self, rows):
+        rows = list(rows)
+        children = {
+            name: self._group(related, fk, list(self._child_rows(related, fk, rows)))
+            for name, fk, related in self.plan['children']
+        }
+        return [self._row(row, children) for row in rows]
+
+    async def ato_representation(self, rows):
+        rows = list(rows)
+        children = {
+            name: self._group(related, fk, [child async for child in self._child_rows(related, fk, rows)])
+            for name, fk, related in self.plan['children']
+        }
+        return [self._row(row, children) for row in rows]
+
+    def data(self, queryset):
+        return self.to_representation(self.values(queryset))
+
+    def _child_rows(self, related, fk, rows):
+        # In primary key order, as a prefetch_related() without ordering returns them on SQLite
+        queryset = related.model._default_manager.filter(**{f'{fk}__in': [row[self.plan['pk']] for row in rows]})
+        return queryset.order_by(*(related.model._meta.ordering or ['pk'])).values(fk, *related.plan['columns'])
+
+    def _group(self, related, fk, child_rows):
+        grouped = defaultdict(list)
+        for child in child_rows:
+            grouped[child[fk]].append(related._row(child))
+        return grouped
+
+    def _row(self, row, children=None):
+        data = {}
+        for name, column, mapper, related in self.plan['fields']:
+            value = row[column]
+            if related is not None:
+                # Nested objects come from prefixed columns of this row, nested lists from the child query
+                if related.prefix:
+                    data[name] = None if value is None else related._row(row)
+                else:
+                    data[name] = children[name].get(value, [])
+            elif mapper is None or value is None:
+                data[name] = value
+            else:
+                data[name] = mapper(value)
+        return data
+
+
+menu_item_values = ValuesSerializer(MenuItemSerializer)
+cart_item_values = ValuesSerializer(CartMenuItemSerializer)
+order_values = ValuesSerializer(OrderSerializer)
+
+
+# ListModelMixin.list on values() rows; filtering, ordering and pagination are unchanged
+class ValuesListMixin:
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.to_representation(page))
+        return Response(self.values_serializer.to_representation(queryset))
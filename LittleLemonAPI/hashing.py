@@ -0,0 +1,159 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# How authenticate() masks the password in the credentials it hands to user_login_failed
+_MASKED = '*' * 20
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+# Password hashing (PBKDF2 at Django's default cost, about half a second of CPU per hash) runs here instead
+# of on request threads or the event loop. hashlib releases the GIL while hashing, so a thread pool
+# hashes in parallel. At most `workers` hashes run and `queue_size` more wait; anything beyond that
+# is refused at once so a login burst can't take every request thread with it.
+class HashingPool:
+    def __init__(self, workers, queue_size, nice=0):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.nice = nice
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolFull()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._slots.release())
+        return future
+
+    # Blocks the calling thread until the hash is done
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    # Leaves the event loop (and the thread behind sync_to_async) free while hashing
+    async def acall(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hashing', initializer=self._lower_priority)
+            return self._executor
+
+    # Hashing threads yield the CPU to request threads when cores are short (Linux niceness is per thread)
+    def _lower_priority(self):
+        if self.nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+            except (AttributeError, OSError):
+                pass
+
+
+hashing_pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE, settings.PASSWORD_HASHING_NICE)
+
+
+# (valid, new hash when the stored one uses outdated hasher settings)
+def _verify(password, encoded):
+    rehashed = []
+    valid = check_password(password, encoded, setter=lambda raw_password: rehashed.append(make_password(raw_password)))
+    return valid, rehashed[0] if rehashed else None
+
+
+def hash_password(password):
+    return hashing_pool.call(make_password, password)
+
+
+async def ahash_password(password):
+    return await hashing_pool.acall(make_password, password)
+
+
+# What django.contrib.auth.authenticate does for ModelBackend, with the hashing on the pool.
+# Unknown usernames are hashed too, so they take as long as wrong passwords.
+def _check(username, password):
+    user = User._default_manager.filter(**{User.USERNAME_FIELD: username}).first()
+    if user is None:
+        hashing_pool.call(make_password, password)
+        return None
+    valid, rehashed = hashing_pool.call(_verify, password, user.password)
+    if valid and rehashed:
+        # Same password under new hasher settings, so no save signals: nothing cached depends on the hash
+        User._default_manager.filter(pk=user.pk).update(password=rehashed)
+        user.password = rehashed
+    return user if valid and user.is_active else None
+
+
+async def _acheck(username, password):
+    user = await User._default_manager.filter(**{User.USERNAME_FIELD: username}).afirst()
+    if user is None:
+        await hashing_pool.acall(make_password, password)
+        return None
+    valid, rehashed = await hashing_pool.acall(_verify, password, user.password)
+    if valid and rehashed:
+        await User._default_manager.filter(pk=user.pk).aupdate(password=rehashed)
+        user.password = rehashed
+    return user if valid and user.is_active else None
+
+
+# Same signal and arguments as authenticate() sends, so lockout and audit receivers keep working
+def _failed_login_signal(username, request):
+    return {'sender': auth.__name__, 'credentials': {'username': username, 'password': _MASKED}, 'request': request}
+
+
+def authenticate_user(username, password, request=None):
+    user = _check(username, password)
+    if user is None:
+        user_login_failed.send(**_failed_login_signal(username, request))
+    return user
+
+
+async def aauthenticate_user(username, password, request=None):
+    user = await _acheck(username, password)
+    if user is None:
+        await user_login_failed.asend(**_failed_login_signal(username, request))
+    return user
+
+
+def _saturated():
+    return Response({"error": "Too many sign-ins in progress, please retry."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+
+# View decorator for endpoints that hash passwords: a full pool answers 503 with Retry-After
+def shed_when_saturated(view):
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await view(*args, **kwargs)
+            except HashingPoolFull:
+                return _saturated()
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            except HashingPoolFull:
+                return _saturated()
+    return wrapper
@@ -0,0 +1,187 @@
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+# Per-request SQL accounting. Every database connection carries an execute wrapper that counts
+# queries for the request being served, and QueryMetricsMiddleware files the numbers under the
+# endpoint that served it, e.g. "MenuItemsViewSet.list", "OrderViewSet.update" or "managers"
+# for function views.
+
+class QueryCollector:
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+        self.statements = [] if keep_sql else None
+
+    # connection.execute_wrapper() hook
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
+            if self.statements is not None:
+                self.statements.append(sql)
+
+
+# In-memory aggregate per endpoint, shared by all request threads of this process
+class QueryMetrics:
+    def __init__(self):
+        self.observers = []
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, collector, elapsed):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0, 'max_db_time': 0.0,
+                'response_time': 0.0, 'slowest_query_time': 0.0, 'slowest_query': None,
+            })
+            stats['requests'] += 1
+            stats['queries'] += collector.count
+            stats['max_queries'] = max(stats['max_queries'], collector.count)
+            stats['db_time'] += collector.duration
+            stats['max_db_time'] = max(stats['max_db_time'], collector.duration)
+            stats['response_time'] += elapsed
+            if collector.slowest_sql is not None and collector.slowest >= stats['slowest_query_time']:
+                stats['slowest_query_time'] = collector.slowest
+                stats['slowest_query'] = collector.slowest_sql
+        for observer in list(self.observers):
+            observer(endpoint, collector)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {name: dict(stats) for name, stats in self._endpoints.items()}
+        report = {}
+        for name, stats in sorted(endpoints.items()):
+            requests = stats['requests']
+            report[name] = {
+                'requests': requests,
+                'avg_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['db_time'] / requests * 1000, 3),
+                'max_db_ms': round(stats['max_db_time'] * 1000, 3),
+                'avg_response_ms': round(stats['response_time'] / requests * 1000, 3),
+                'slowest_query_ms': round(stats['slowest_query_time'] * 1000, 3),
+                'slowest_query': stats['slowest_query'],
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_metrics = QueryMetrics()
+
+
+def endpoint_name(view, action=None):
+    name = view if isinstance(view, str) else getattr(view, '__name__', type(view).__name__)
+    return f'{name}.{action}' if action else name
+
+
+# The collector of the request being served. ORM calls run on the request thread under WSGI and
+# on asgiref's sync thread under ASGI; the context variable follows the request to either.
+_current_collector = contextvars.ContextVar('littlelemon_query_collector', default=None)
+
+
+def _record(execute, sql, params, many, context):
+    collector = _current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+# connection_created receiver; also called for connections opened before it was connected
+def install_query_recorder(connection=None, **kwargs):
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+def _install_all():
+    for connection in connections.all():
+        install_query_recorder(connection)
+
+
+class QueryMetricsMiddleware:
+    # Under ASGI this runs on the event loop: a sync middleware would hold asgiref's single
+    # sync thread for the whole request and serialize every request behind it.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._installed = False
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _install_all()
+        collector, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        return self._finish(request, response, collector, start)
+
+    async def __acall__(self, request):
+        if not self._installed:
+            # Connections the sync thread opened before this middleware existed
+            await sync_to_async(_install_all)()
+            self._installed = True
+        collector, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        return self._finish(request, response, collector, start)
+
+    def _start(self):
+        collector = QueryCollector(keep_sql=bool(query_metrics.observers))
+        return collector, _current_collector.set(collector), time.perf_counter()
+
+    def _finish(self, request, response, collector, start):
+        elapsed = time.perf_counter() - start
+        endpoint = getattr(request, 'query_endpoint', None) or 'unresolved'
+        query_metrics.record(endpoint, collector, elapsed)
+        if getattr(settings, 'QUERY_METRICS_HEADERS', settings.DEBUG):
+            response['X-Endpoint'] = endpoint
+            response['X-DB-Query-Count'] = str(collector.count)
+            response['X-DB-Query-Time-Ms'] = f'{collector.duration * 1000:.3f}'
+            response['X-DB-Slowest-Query-Ms'] = f'{collector.slowest * 1000:.3f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF's as_view() leaves the view class and, for viewsets, the method -> action map on the function
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            request.query_endpoint = endpoint_name(view_func)
+        else:
+            actions = getattr(view_func, 'actions', None) or {}
+            request.query_endpoint = endpoint_name(view_class, actions.get(request.method.lower()))
+
+
+# For DRF views whose action is only known once the handler has run (the async read views
+# behind read_async, or any view routed through a wrapper function). metrics_name lets a
+# view report under another view's name, so both serve one set of metrics and budgets.
+class QueryMetricsMixin:
+    metrics_name = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        action = getattr(self, 'action', None) or request.method.lower()
+        request._request.query_endpoint = endpoint_name(self.metrics_name or type(self), action)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,200 @@
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Hooks emitted by the order views; handlers subscribe with @on(...), e.g. the sales rollups in analytics.py.
+# Payloads are plain JSON: ids and values captured when the event happened.
+ORDER_PLACED = 'order_placed'
+ORDER_STATUS_CHANGED = 'order_status_changed'
+ORDER_DELETED = 'order_deleted'
+
+_handlers = {}
+_subscribers = defaultdict(list)
+
+
+class LockLost(Exception):
+    pass
+
+
+# Registers a function as a job under its dotted path. The function gets the payload as keyword arguments.
+def job(func=None, *, max_attempts=None):
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        func.job_name = name
+        func.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        _handlers[name] = func
+        return func
+    return register if func is None else register(func)
+
+
+# Registers a function as a job and runs it once for every emit(hook, ...)
+def on(hook, **options):
+    def register(func):
+        func = job(func, **options)
+        _subscribers[hook].append(func)
+        return func
+    return register
+
+
+def _job(func, payload, run_at=None):
+    return Job(name=func.job_name, payload=payload, max_attempts=func.max_attempts, run_at=run_at or timezone.now())
+
+
+# Queue a job. Call it inside the transaction that makes the work necessary: the job row commits
+# or rolls back with it, and workers can't pick it up before the data it refers to is visible.
+def enqueue(func, delay=None, **payload):
+    run_at = timezone.now() + timedelta(seconds=delay) if delay else None
+    instance = _job(func, payload, run_at)
+    instance.save()
+    return instance
+
+
+# One job per subscribed handler and payload, in a single INSERT. Hooks nobody listens to cost nothing.
+def emit(hook, *payloads):
+    jobs = [_job(func, payload) for payload in payloads for func in _subscribers[hook]]
+    if jobs:
+        Job.objects.bulk_create(jobs)
+    return len(jobs)
+
+
+def retry_delay(attempts):
+    delay = min(settings.JOBS_RETRY_MAX_DELAY, settings.JOBS_RETRY_DELAY * 2 ** max(0, attempts - 1))
+    # Jitter spreads out retries of jobs that failed together, e.g. while the database was busy
+    return delay * random.uniform(0.5, 1.0)
+
+
+# Lock up to `limit` due jobs for one worker. Jobs still marked running after JOBS_LOCK_TIMEOUT
+# belonged to a worker that died and are taken over. The UPDATE re-checks the due condition,
+# so concurrent workers never lock the same job; the token tells which rows this call got.
+def claim(worker_id, limit):
+    now = timezone.now()
+    due = Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT))
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    candidates = Job.objects.filter(due).order_by('run_at', 'pk').values('pk')[:limit]
+    claimed = Job.objects.filter(due, pk__in=candidates).update(
+        status=Job.RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING).order_by('run_at', 'pk'))
+
+
+# Run one claimed job. The handler's writes and the job's deletion commit together, so a job
+# whose database work committed is never run again; a handler that raises is rolled back and
+# retried with exponential backoff until max_attempts, then left as failed.
+def run_job(job):
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No job handler named {job.name!r}.')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Worker lost while running the last attempt.')
+        with transaction.atomic():
+            handler(**job.payload)
+            deleted, _ = Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+            if not deleted:
+                # Our lock expired and another worker took the job over; its run counts
+                raise LockLost()
+    except LockLost:
+        logger.warning('Lost the lock on job %s (%s), rolled back', job.pk, job.name)
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        final = handler is None or job.attempts >= job.max_attempts
+        logger.log(logging.ERROR if final else logging.WARNING, 'Job %s (%s) failed, attempt %s of %s',
+                   job.pk, job.name, job.attempts, job.max_attempts, exc_info=True)
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=Job.FAILED if final else Job.QUEUED,
+            run_at=timezone.now() + timedelta(seconds=0 if final else retry_delay(job.attempts)),
+            locked_by='', locked_at=None, last_error=error,
+        )
+        return False
+    return True
+
+
+# Run everything that is due in the calling thread and connection; returns (succeeded, failed).
+# For `run_jobs --once` style batch runs and tests.
+def run_pending(worker_id='inline', batch_size=100):
+    succeeded = failed = 0
+    while True:
+        jobs = claim(worker_id, batch_size)
+        if not jobs:
+            return succeeded, failed
+        for job in jobs:
+            if run_job(job):
+                succeeded += 1
+            else:
+                failed += 1
+
+
+# Polls the queue and runs jobs on a thread pool. Each pool thread uses its own database connection.
+class Worker:
+    def __init__(self, concurrency=4, poll_interval=1.0, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.succeeded = 0
+        self.failed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    # once=True returns as soon as nothing is due and nothing is running
+    def run(self, once=False):
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job') as pool:
+            while not self._stopping.is_set():
+                jobs = []
+                if len(running) < self.concurrency:
+                    try:
+                        jobs = claim(self.name, self.concurrency - len(running))
+                    except DatabaseError:
+                        logger.exception('Could not claim jobs, retrying in %ss', self.poll_interval)
+                running.update(pool.submit(self._run, job) for job in jobs)
+                if not running:
+                    if once and not jobs:
+                        break
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                # Poll again right away while there is capacity and work, otherwise wait for a slot
+                done, running = wait(running, timeout=0 if jobs and len(running) < self.concurrency else self.poll_interval,
+                                     return_when=FIRST_COMPLETED)
+                self._collect(done)
+            # Stopping: let running jobs finish, they would otherwise sit locked until JOBS_LOCK_TIMEOUT
+            self._collect(wait(running).done)
+
+    def _collect(self, futures):
+        for future in futures:
+            if future.result():
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+    def _run(self, job):
+        close_old_connections()
+        try:
+            return run_job(job)
+        except DatabaseError:
+            # Could not even record the failure; the lock expires and another attempt picks it up
+            logger.exception('Job %s (%s) could not be finished', job.pk, job.name)
+            return False
+        finally:
+            close_old_connections()
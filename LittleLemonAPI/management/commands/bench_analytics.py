@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+from LittleLemonAPI.analytics import rebuild_sales_rollups, sales_report
+from LittleLemonAPI.benchmarks import isolated_database
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+
+
+# The same questions answered straight from the order tables, for comparison
+LIVE_QUERIES = {
+    'item': lambda: OrderItem.objects.values('menu_item_id', title=F('menu_item__title')).annotate(
+        orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum('line_total')),
+    'category': lambda: OrderItem.objects.values(category=F('menu_item__category_id')).annotate(
+        orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum('line_total')),
+    'day': lambda: Order.objects.values(period=TruncDate('created_at')).annotate(
+        orders=Count('id'), units=Sum('item_count'), revenue=Sum('total')),
+    'month': lambda: Order.objects.values(period=TruncMonth('created_at')).annotate(
+        orders=Count('id'), units=Sum('item_count'), revenue=Sum('total')),
+}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic year of orders and time the analytics rollups against live aggregation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000, help='Number of order items to generate.')
+        parser.add_argument('--menu-items', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            started = time.perf_counter()
+            self.seed(options['items'], options['menu_items'], random.Random(options['seed']))
+            self.stdout.write(f"seeded {options['items']:,} order items in {time.perf_counter() - started:.1f} s")
+
+            started = time.perf_counter()
+            rebuild_sales_rollups()
+            self.stdout.write(f'rebuilt rollups in {time.perf_counter() - started:.1f} s')
+
+            self.stdout.write(f"{'group_by':<10}{'rollup ms':>12}{'live ms':>12}")
+            for group_by, live in LIVE_QUERIES.items():
+                rollup_ms = timed(lambda: sales_report(group_by), options['repeat'])
+                live_ms = timed(lambda: list(live()), options['repeat'])
+                self.stdout.write(f'{group_by:<10}{rollup_ms:>12.2f}{live_ms:>12.2f}')
+
+    def seed(self, item_count, menu_item_count, rng, batch_size=20_000):
+        user = User.objects.create_user('bench')
+        categories = Category.objects.bulk_create(Category(slug=f'category-{n}', title=f'Category {n}') for n in range(12))
+        menu_items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Item {n}', price=Decimal(rng.randint(300, 3000)) / 100, inventory=1000, category=rng.choice(categories))
+            for n in range(menu_item_count)
+        )
+        year_start = datetime.now(dt_timezone.utc) - timedelta(days=365)
+
+        remaining = item_count
+        while remaining > 0:
+            # About three lines per order, spread evenly over the last year
+            lines_per_order = [rng.randint(1, 5) for _ in range(max(1, min(remaining, batch_size) // 3))]
+            lines_per_order[-1] += max(0, min(remaining, batch_size) - sum(lines_per_order))
+            orders = []
+            order_lines = []
+            for line_count in lines_per_order:
+                lines = []
+                for menu_item in rng.sample(menu_items, min(line_count, len(menu_items))):
+                    quantity = rng.randint(1, 3)
+                    lines.append(OrderItem(menu_item=menu_item, quantity=quantity, unit_price=menu_item.price, line_total=menu_item.price * quantity))
+                orders.append(Order(
+                    user=user, status=1,
+                    created_at=year_start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+                    total=sum(line.line_total for line in lines), item_count=sum(line.quantity for line in lines),
+                ))
+                order_lines.append(lines)
+            Order.objects.bulk_create(orders)
+            items = []
+            for order, lines in zip(orders, order_lines):
+                for line in lines:
+                    line.order = order
+                    items.append(line)
+            OrderItem.objects.bulk_create(items)
+            remaining -= len(items)
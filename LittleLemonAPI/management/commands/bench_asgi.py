@@ -0,0 +1,129 @@
+import asyncio
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from LittleLemonAPI import async_views, views
+from LittleLemonAPI.benchmarks import isolated_database, patched, summarize
+from LittleLemonAPI.cache import catalog_cache
+from LittleLemonAPI.models import Category, MenuItem, CartMenuItem, Order, OrderItem
+
+
+ENDPOINTS = ['/api/menu-items', '/api/menu-items/1', '/api/cart/menu-items', '/api/orders', '/api/orders/1']
+
+THROTTLED_VIEWS = [
+    views.MenuItemsViewSet, views.CartMenuItemsViewSet, views.OrderViewSet,
+    async_views.MenuItemsAsyncView, async_views.CartMenuItemsAsyncView, async_views.OrderAsyncView,
+]
+
+
+# Only the benchmarked routes, wired the way LittleLemonAPI.urls wires them for each server
+def urlconf(asynchronous):
+    menu_items = views.MenuItemsViewSet.as_view({'get': 'list'})
+    menu_item = views.MenuItemsViewSet.as_view({'get': 'retrieve'})
+    cart = views.CartMenuItemsViewSet.as_view({'get': 'list'})
+    orders = views.OrderViewSet.as_view({'get': 'list'})
+    order = views.OrderViewSet.as_view({'get': 'retrieve'})
+    if asynchronous:
+        menu_items = async_views.read_async(async_views.MenuItemsAsyncView.as_view(), menu_items)
+        menu_item = async_views.read_async(async_views.MenuItemsAsyncView.as_view(), menu_item)
+        cart = async_views.read_async(async_views.CartMenuItemsAsyncView.as_view(), cart)
+        orders = async_views.read_async(async_views.OrderAsyncView.as_view(), orders)
+        order = async_views.read_async(async_views.OrderAsyncView.as_view(), order)
+    module = types.ModuleType('bench_asgi_urls')
+    module.urlpatterns = [
+        path('api/menu-items', menu_items),
+        path('api/menu-items/<int:pk>', menu_item),
+        path('api/cart/menu-items', cart),
+        path('api/orders', orders),
+        path('api/orders/<int:pk>', order),
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec and latency of the read endpoints under WSGI (sync views) and ASGI (async views).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and server.')
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--cache', action='store_true', help='Keep the catalog cache on (off by default to measure the ORM path).')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            token = self.seed()
+            headers = {'Authorization': f'Token {token}'}
+            throttles = [patched(view, throttle_classes=[]) for view in THROTTLED_VIEWS]
+            for throttle in throttles:
+                throttle.__enter__()
+            try:
+                self.stdout.write(f"{'endpoint':<24}{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+                for endpoint in ENDPOINTS:
+                    for server in ('wsgi', 'asgi'):
+                        with override_settings(ROOT_URLCONF=urlconf(server == 'asgi')):
+                            if server == 'wsgi':
+                                rps, stats = self.run_wsgi(endpoint, headers, options)
+                            else:
+                                rps, stats = asyncio.run(self.run_asgi(endpoint, headers, options))
+                        self.stdout.write(f"{endpoint:<24}{server:<8}{rps:>10.0f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+            finally:
+                for throttle in reversed(throttles):
+                    throttle.__exit__(None, None, None)
+
+    def request(self, options):
+        if not options['cache']:
+            catalog_cache.clear()
+
+    def run_wsgi(self, endpoint, headers, options):
+        # A thread per in-flight request, like a threaded WSGI worker
+        def call(client):
+            self.request(options)
+            start = time.perf_counter()
+            response = client.get(endpoint, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        clients = [Client() for _ in range(options['concurrency'])]
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            started = time.perf_counter()
+            samples = list(pool.map(lambda n: call(clients[n % len(clients)]), range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        return options['requests'] / elapsed, summarize(samples)
+
+    async def run_asgi(self, endpoint, headers, options):
+        # Every in-flight request is a task on one event loop
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with semaphore:
+                self.request(options)
+                start = time.perf_counter()
+                response = await client.get(endpoint, headers=headers)
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - start
+
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return options['requests'] / elapsed, summarize(samples)
+
+    def seed(self):
+        manager = User.objects.create_user('bench')
+        category = Category.objects.create(slug='mains', title='Mains')
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Item {n}', price=10 + n % 20, inventory=100, category=category) for n in range(200)
+        )
+        CartMenuItem.objects.bulk_create(CartMenuItem(user=manager, menu_item=item, quantity=1) for item in items[:10])
+        orders = Order.objects.bulk_create(Order(user=manager) for _ in range(200))
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=items[(order.pk + n) % len(items)], quantity=1) for order in orders for n in range(3)
+        )
+        return Token.objects.create(user=manager).key
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from LittleLemonAPI.authentication import CachedTokenAuthentication, token_cache
+from LittleLemonAPI.benchmarks import isolated_database, measure, patched
+from LittleLemonAPI.models import Category, MenuItem, CartMenuItem, Order, OrderItem
+from LittleLemonAPI.views import CartMenuItemsViewSet, OrderViewSet
+
+
+ENDPOINTS = [
+    ('/api/cart/menu-items', CartMenuItemsViewSet),
+    ('/api/orders', OrderViewSet),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency of TokenAuthentication and CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with isolated_database():
+            client = self.seed()
+            for path, view in ENDPOINTS:
+                results = {}
+                for label, auth_class in (('token', TokenAuthentication), ('cached', CachedTokenAuthentication)):
+                    token_cache.clear()
+                    # Throttling is disabled so the quota doesn't end the run early
+                    with patched(view, authentication_classes=[auth_class], throttle_classes=[]):
+                        results[label] = measure(lambda: client.get(path), iterations)
+                saved = results['token']['mean_ms'] - results['cached']['mean_ms']
+                self.stdout.write(f'{path}')
+                for label, stats in results.items():
+                    self.stdout.write(f"  {label:<7} mean {stats['mean_ms']:.3f} ms  p50 {stats['p50_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms")
+                self.stdout.write(f'  saved   {saved:.3f} ms per request ({saved / results["token"]["mean_ms"]:.1%})')
+
+    def seed(self):
+        user = User.objects.create_user('bench', password='bench')
+        token = Token.objects.create(user=user)
+        category = Category.objects.create(slug='mains', title='Mains')
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Item {n}', price=10, inventory=100, category=category) for n in range(10)
+        )
+        CartMenuItem.objects.bulk_create(CartMenuItem(user=user, menu_item=item, quantity=1) for item in items[:5])
+        for _ in range(3):
+            order = Order.objects.create(user=user)
+            OrderItem.objects.bulk_create(OrderItem(order=order, menu_item=item, quantity=2) for item in items[:3])
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
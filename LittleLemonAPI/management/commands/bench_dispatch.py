@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from LittleLemonAPI.benchmarks import isolated_database, summarize
+from LittleLemonAPI.dispatch import OPEN, Dispatcher
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.roles import DELIVERY_CREW
+
+
+# What a per-request implementation would do: count every courier's open orders
+def least_busy_by_query():
+    return (
+        User.objects.filter(groups__name=DELIVERY_CREW, is_active=True)
+        .annotate(open_orders=Count('deliveries', filter=Q(deliveries__status=OPEN)))
+        .order_by('open_orders', 'pk').values_list('pk', flat=True).first()
+    )
+
+
+class Command(BaseCommand):
+    help = 'Simulate a stream of new and delivered orders and compare courier selection by COUNT query with the dispatch heap.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--couriers', type=int, default=300)
+        parser.add_argument('--orders', type=int, default=10_000, help='Orders in the history before the simulation.')
+        parser.add_argument('--events', type=int, default=3000)
+        parser.add_argument('--deliver-share', type=float, default=0.45, help='Share of events that deliver an open order.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            customers, couriers = self.seed(random.Random(options['seed']), options)
+            self.stdout.write(f"{'strategy':<10}{'assigned':>10}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}{'total s':>9}{'open min/max':>14}{'stdev':>7}")
+            for label in ('query', 'heap'):
+                # Same starting point and event stream for both; each run is rolled back afterwards
+                with transaction.atomic():
+                    self.simulate(label, random.Random(options['seed'] + 1), customers, couriers, options)
+                    transaction.set_rollback(True)
+
+    def simulate(self, label, rng, customers, couriers, options):
+        heap = Dispatcher()
+        choose = heap.assign if label == 'heap' else least_busy_by_query
+        open_orders = list(Order.objects.filter(status=OPEN).values_list('pk', 'delivery_crew_id'))
+        samples = []
+        started = time.perf_counter()
+        for _ in range(options['events']):
+            if open_orders and rng.random() < options['deliver_share']:
+                order_id, courier_id = open_orders.pop(rng.randrange(len(open_orders)))
+                Order.objects.filter(pk=order_id).update(status=1)
+                heap.order_changed(courier_id, True, courier_id, False)
+                continue
+            began = time.perf_counter()
+            courier_id = choose()
+            samples.append(time.perf_counter() - began)
+            order = Order.objects.create(user_id=rng.choice(customers), delivery_crew_id=courier_id)
+            open_orders.append((order.pk, courier_id))
+        elapsed = time.perf_counter() - started
+
+        counts = dict.fromkeys(couriers, 0)
+        counts.update(Order.objects.filter(status=OPEN).values_list('delivery_crew_id').annotate(n=Count('id')).values_list('delivery_crew_id', 'n'))
+        loads = [counts[courier_id] for courier_id in couriers]
+        if label == 'heap' and heap.open_orders() != counts:
+            self.stderr.write('heap counts drifted from the database')
+        stats = summarize(samples)
+        self.stdout.write(
+            f"{label:<10}{len(samples):>10}{stats['p50_ms'] * 1000:>9.1f}{stats['p95_ms'] * 1000:>9.1f}{stats['p99_ms'] * 1000:>9.1f}"
+            f"{elapsed:>9.2f}{f'{min(loads)}/{max(loads)}':>14}{statistics.pstdev(loads):>7.2f}"
+        )
+
+    def seed(self, rng, options):
+        crew = Group.objects.create(name=DELIVERY_CREW)
+        couriers = User.objects.bulk_create(User(username=f'courier{n}') for n in range(options['couriers']))
+        crew.user_set.add(*couriers)
+        customers = User.objects.bulk_create(User(username=f'customer{n}') for n in range(1000))
+        # An uneven history: most orders delivered, the open ones piled on a few couriers
+        busy = couriers[:max(1, len(couriers) // 10)]
+        Order.objects.bulk_create(
+            (
+                Order(user=rng.choice(customers), delivery_crew=rng.choice(busy if rng.random() < 0.5 else couriers),
+                      status=0 if rng.random() < 0.1 else 1, total=0, item_count=0)
+                for _ in range(options['orders'])
+            ),
+            batch_size=5000,
+        )
+        return [customer.pk for customer in customers], [courier.pk for courier in couriers]
@@ -0,0 +1,81 @@
+import random
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from LittleLemonAPI import jobs, views
+from LittleLemonAPI.benchmarks import isolated_database, patched, seed_dataset, summarize
+from LittleLemonAPI.jobs import ORDER_PLACED, Worker, job
+from LittleLemonAPI.models import CartMenuItem, Job
+from LittleLemonAPI.throttling import SharedRateThrottleMixin
+
+
+# Stands in for follow-up work that talks to another service, e.g. sending a receipt
+def slow_side_effect(seconds):
+    @job
+    def send_receipt(**payload):
+        time.sleep(seconds)
+    return send_receipt
+
+
+# What checkout did before the job queue: every hook handler runs inside the request
+def run_inline(hook, *payloads):
+    for payload in payloads:
+        for handler in jobs._subscribers[hook]:
+            handler(**payload)
+
+
+class Command(BaseCommand):
+    help = 'Time checkout with its follow-up work (sales rollups, a simulated receipt) run inline and queued, then drain the queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=300)
+        parser.add_argument('--side-effect-ms', type=float, default=20.0, help='Simulated latency of one receipt.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Worker threads draining the queue.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            rng = random.Random(options['seed'])
+            dataset = seed_dataset(rng, customers=50, orders=2000, open_carts=0)
+            receipt = slow_side_effect(options['side_effect_ms'] / 1000)
+            subscribers = {ORDER_PLACED: [*jobs._subscribers[ORDER_PLACED], receipt]}
+
+            allow = lambda self, request, view: True
+            with patched(SharedRateThrottleMixin, allow_request=allow), mock.patch.dict(jobs._subscribers, subscribers):
+                self.stdout.write(f"{'checkout':<10}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+                with patched(views, emit=run_inline):
+                    self.report('inline', self.checkouts(rng, dataset, options['checkouts']))
+                self.report('queued', self.checkouts(rng, dataset, options['checkouts']))
+
+                queued = Job.objects.count()
+                worker = Worker(concurrency=options['concurrency'], poll_interval=0.01)
+                started = time.perf_counter()
+                worker.run(once=True)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'worker: {worker.succeeded}/{queued} jobs with {worker.concurrency} threads in {elapsed:.2f} s '
+                    f'({worker.succeeded / elapsed:.0f} jobs/s), {worker.failed} failed'
+                )
+
+    def checkouts(self, rng, dataset, count):
+        client = APIClient()
+        samples = []
+        for _ in range(count):
+            customer = rng.choice(dataset.customers)
+            CartMenuItem.objects.bulk_create(
+                CartMenuItem(user=customer, menu_item=item, quantity=rng.randint(1, 3)) for item in rng.sample(dataset.menu_items, 3)
+            )
+            client.force_authenticate(customer)
+            started = time.perf_counter()
+            response = client.post('/api/orders')
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                raise RuntimeError(f'checkout failed with {response.status_code}: {response.content[:200]}')
+        return samples
+
+    def report(self, label, samples):
+        stats = summarize(samples)
+        self.stdout.write(f"{label:<10}{stats['count']:>7}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
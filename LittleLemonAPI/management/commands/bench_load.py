@@ -0,0 +1,225 @@
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+import warnings
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import UnorderedObjectListWarning
+from django.test import Client
+from django.utils import timezone
+from rest_framework.throttling import SimpleRateThrottle
+
+from LittleLemonAPI.benchmarks import DISH_WORDS, isolated_database, patched, seed_dataset, summarize
+from LittleLemonAPI.throttling import SharedRateThrottleMixin
+
+
+PROFILES = {
+    'small': dict(customers=50, delivery_crew=4, menu_items=100, orders=1000),
+    'default': dict(customers=200, delivery_crew=10, menu_items=500, orders=5000),
+    'large': dict(customers=2000, delivery_crew=50, menu_items=5000, orders=100_000),
+}
+
+# Share of sessions per scenario
+SCENARIOS = [('browse', 0.55), ('order', 0.25), ('dispatch', 0.12), ('deliver', 0.08)]
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+# Replays customer, manager and delivery-crew sessions against the full WSGI stack
+# (middleware, token auth, caches) and records latency per endpoint.
+class LoadRun:
+    def __init__(self, dataset, rng_seed):
+        self.dataset = dataset
+        self.seed = rng_seed
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        # Orders move checkout -> dispatch -> deliver through these queues
+        self.placed = deque()
+        self.dispatched = defaultdict(deque)
+
+    def call(self, client, user, method, path, label, data=None):
+        headers = {'Authorization': f'Token {self.dataset.tokens[user.pk]}'}
+        start = time.perf_counter()
+        if data is None:
+            response = getattr(client, method)(path, headers=headers)
+        else:
+            response = getattr(client, method)(path, data, content_type='application/json', headers=headers)
+        elapsed = time.perf_counter() - start
+        label = f'{method.upper()} {label}'
+        with self.lock:
+            self.samples[label].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[label] += 1
+        return response
+
+    def run_sessions(self, count, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(self.session, range(count)))
+        return time.perf_counter() - started
+
+    def session(self, number):
+        rng = random.Random(self.seed * 1_000_003 + number)
+        client = Client()
+        scenario = rng.choices([name for name, weight in SCENARIOS], [weight for name, weight in SCENARIOS])[0]
+        getattr(self, scenario)(client, rng)
+
+    def browse(self, client, rng):
+        customer = rng.choice(self.dataset.customers)
+        item = rng.choice(self.dataset.menu_items)
+        self.call(client, customer, 'get', '/api/categories', '/api/categories')
+        self.call(client, customer, 'get', f'/api/menu-items?page={rng.randint(1, 20)}', '/api/menu-items')
+        self.call(client, customer, 'get', f'/api/menu-items?search={rng.choice(DISH_WORDS).lower()}', '/api/menu-items?search=')
+        self.call(client, customer, 'get', f'/api/menu-items/{item.pk}', '/api/menu-items/{id}')
+
+    def order(self, client, rng):
+        customer = rng.choice(self.dataset.customers)
+        for item in rng.sample(self.dataset.menu_items, rng.randint(1, 4)):
+            self.call(client, customer, 'post', '/api/cart/menu-items', '/api/cart/menu-items',
+                      {'menu_item_id': item.pk, 'quantity': rng.randint(1, 3)})
+        self.call(client, customer, 'get', '/api/cart/menu-items', '/api/cart/menu-items')
+        response = self.call(client, customer, 'post', '/api/orders', '/api/orders')
+        if response.status_code == 201:
+            self.placed.append(response.json()['id'])
+        self.call(client, customer, 'get', '/api/orders', '/api/orders')
+
+    def dispatch(self, client, rng):
+        manager = rng.choice(self.dataset.managers)
+        self.call(client, manager, 'get', '/api/orders', '/api/orders')
+        try:
+            order_id = self.placed.popleft()
+        except IndexError:
+            return
+        crew = rng.choice(self.dataset.delivery_crew)
+        response = self.call(client, manager, 'patch', f'/api/orders/{order_id}', '/api/orders/{id}', {'delivery_crew': crew.pk})
+        if response.status_code == 200:
+            self.dispatched[crew.pk].append(order_id)
+
+    def deliver(self, client, rng):
+        crew = rng.choice(self.dataset.delivery_crew)
+        self.call(client, crew, 'get', '/api/orders', '/api/orders')
+        try:
+            order_id = self.dispatched[crew.pk].popleft()
+        except IndexError:
+            return
+        self.call(client, crew, 'patch', f'/api/orders/{order_id}', '/api/orders/{id}', {'status': 1})
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Seed a realistic dataset, replay mixed API sessions in-process and compare latency with a stored baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, default='default', help='Dataset size.')
+        parser.add_argument('--sessions', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50, help='Sessions run before measuring.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads, like a threaded WSGI server.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Results JSON to compare against.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed p50 and p95 slowdown before flagging (0.25 = 25%%).')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore slowdowns whose p95 moved less than this.')
+
+    def handle(self, *args, **options):
+        warnings.simplefilter('ignore', UnorderedObjectListWarning)
+        with isolated_database():
+            started = time.perf_counter()
+            dataset = seed_dataset(random.Random(options['seed']), **PROFILES[options['profile']])
+            self.stdout.write(f"seeded the {options['profile']} dataset in {time.perf_counter() - started:.1f} s")
+
+            # Rate limits would turn a load test into a throttling test
+            allow = lambda self, request, view: True
+            with patched(SimpleRateThrottle, allow_request=allow), patched(SharedRateThrottleMixin, allow_request=allow):
+                LoadRun(dataset, options['seed'] + 1).run_sessions(options['warmup'], options['concurrency'])
+                run = LoadRun(dataset, options['seed'])
+                elapsed = run.run_sessions(options['sessions'], options['concurrency'])
+
+        results = self.results(run, elapsed, options)
+        self.report(results)
+        if options['output']:
+            self.write(options['output'], results)
+        if options['save_baseline']:
+            self.write(options['baseline'], results)
+            return
+
+        baseline_path = Path(options['baseline'])
+        if not baseline_path.exists():
+            self.stdout.write(f'no baseline at {baseline_path}; run with --save-baseline to create one')
+            return
+        regressions = self.compare(json.loads(baseline_path.read_text()), results, options)
+        if regressions:
+            raise CommandError(f'{len(regressions)} endpoint(s) slower than the baseline: {", ".join(regressions)}')
+
+    def results(self, run, elapsed, options):
+        total = sum(len(samples) for samples in run.samples.values())
+        endpoints = {}
+        for label, samples in sorted(run.samples.items()):
+            endpoints[label] = {**summarize(samples), 'rps': len(samples) / elapsed, 'errors': run.errors[label]}
+        return {
+            'meta': {
+                'created_at': timezone.now().isoformat(), 'revision': git_revision(),
+                'python': platform.python_version(), 'django': django.get_version(), 'sqlite': sqlite3.sqlite_version,
+                **{name: options[name] for name in ('profile', 'sessions', 'concurrency', 'seed')},
+            },
+            'total': {'requests': total, 'seconds': elapsed, 'rps': total / elapsed, 'errors': sum(run.errors.values())},
+            'endpoints': endpoints,
+        }
+
+    def report(self, results):
+        self.stdout.write(f"{'endpoint':<32}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for label, stats in results['endpoints'].items():
+            self.stdout.write(
+                f"{label:<32}{stats['count']:>7}{stats['rps']:>9.1f}{stats['p50_ms']:>9.2f}"
+                f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['errors']:>8}"
+            )
+        total = results['total']
+        self.stdout.write(f"{total['requests']} requests in {total['seconds']:.1f} s, {total['rps']:.1f} req/s, {total['errors']} errors")
+
+    def compare(self, baseline, results, options):
+        # Lock waits make write tails noisy, so an endpoint is flagged only when its median
+        # and its p95 both moved past the threshold
+        regressions = []
+        self.stdout.write(f"\nagainst baseline {baseline['meta'].get('revision')} ({baseline['meta'].get('created_at')})")
+        self.stdout.write(f"{'endpoint':<32}{'base p50':>10}{'p50':>10}{'change':>9}{'base p95':>10}{'p95':>10}{'change':>9}")
+        for label, stats in results['endpoints'].items():
+            base = baseline['endpoints'].get(label)
+            if base is None:
+                self.stdout.write(f"{label:<32}{'-':>10}{stats['p50_ms']:>10.2f}{'new':>9}{'-':>10}{stats['p95_ms']:>10.2f}{'new':>9}")
+                continue
+            changes = {key: (stats[key] - base[key]) / base[key] if base[key] else 0.0 for key in ('p50_ms', 'p95_ms')}
+            regressed = (
+                all(change > options['threshold'] for change in changes.values())
+                and stats['p95_ms'] - base['p95_ms'] > options['min_delta_ms']
+            )
+            self.stdout.write(
+                f"{label:<32}{base['p50_ms']:>10.2f}{stats['p50_ms']:>10.2f}{changes['p50_ms']:>+9.0%}"
+                f"{base['p95_ms']:>10.2f}{stats['p95_ms']:>10.2f}{changes['p95_ms']:>+9.0%}"
+                + ('  REGRESSION' if regressed else '')
+            )
+            if regressed:
+                regressions.append(label)
+        return regressions
+
+    def write(self, path, results):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + '\n')
+        self.stdout.write(f'wrote {path}')
@@ -0,0 +1,107 @@
+import asyncio
+import time
+import types
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import path
+
+from LittleLemonAPI import async_views, hashing, views
+from LittleLemonAPI.benchmarks import isolated_database, patched, summarize
+from LittleLemonAPI.cache import catalog_cache
+from LittleLemonAPI.hashing import HashingPool
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.throttling import SharedRateThrottleMixin
+
+
+# What login did before the hashing pool: hash on whichever thread runs the view
+class InlinePool:
+    rejected = 0
+
+    def call(self, fn, *args):
+        return fn(*args)
+
+
+def urlconf(login):
+    module = types.ModuleType('bench_login_storm_urls')
+    module.urlpatterns = [
+        path('api/menu-items', async_views.read_async(async_views.MenuItemsAsyncView.as_view(), views.MenuItemsViewSet.as_view({'get': 'list'}))),
+        path('token/login', login),
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = 'Measure menu latency under ASGI while a login storm runs, with inline hashing and with the hashing pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10.0, help='Length of each run.')
+        parser.add_argument('--menu-concurrency', type=int, default=8)
+        parser.add_argument('--login-concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, help='Hashing pool threads (default: PASSWORD_HASHING_WORKERS).')
+        parser.add_argument('--queue', type=int, help='Hashing pool queue (default: PASSWORD_HASHING_QUEUE).')
+        parser.add_argument('--nice', type=int, help='Hashing thread niceness (default: PASSWORD_HASHING_NICE).')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.PASSWORD_HASHING_WORKERS
+        queue = settings.PASSWORD_HASHING_QUEUE if options['queue'] is None else options['queue']
+        nice = settings.PASSWORD_HASHING_NICE if options['nice'] is None else options['nice']
+        with isolated_database():
+            self.seed()
+            allow = lambda self, request, view: True
+            runs = [
+                ('no logins', None, hashing.hashing_pool, 0),
+                ('inline', views.tokens, InlinePool(), options['login_concurrency']),
+                ('pool', async_views.TokensAsyncView.as_view(), HashingPool(workers, queue, nice), options['login_concurrency']),
+            ]
+            self.stdout.write(f'hashing pool: {workers} workers, queue {queue}, nice {nice}')
+            self.stdout.write(
+                f"{'logins':<11}{'menu req':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                f"{'login ok':>10}{'503':>6}{'login p50 ms':>14}"
+            )
+            for label, login, pool, login_concurrency in runs:
+                with patched(SharedRateThrottleMixin, allow_request=allow), patched(hashing, hashing_pool=pool), \
+                        override_settings(ROOT_URLCONF=urlconf(login or views.tokens)):
+                    menu, logins = asyncio.run(self.run(options['seconds'], options['menu_concurrency'], login_concurrency))
+                stats = summarize(menu)
+                accepted = [elapsed for code, elapsed in logins if code == 200]
+                self.stdout.write(
+                    f"{label:<11}{stats['count']:>9}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                    f"{len(accepted):>10}{sum(code == 503 for code, _ in logins):>6}{summarize(accepted)['p50_ms']:>14.1f}"
+                )
+
+    async def run(self, seconds, menu_concurrency, login_concurrency):
+        client = AsyncClient()
+        deadline = time.perf_counter() + seconds
+        menu, logins = [], []
+
+        async def browse():
+            while time.perf_counter() < deadline:
+                # Uncached, so every menu request goes through the ORM
+                catalog_cache.clear()
+                started = time.perf_counter()
+                response = await client.get('/api/menu-items')
+                assert response.status_code == 200, response.status_code
+                menu.append(time.perf_counter() - started)
+
+        async def log_in():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post('/token/login', {'username': 'storm', 'password': 'shift-change'}, content_type='application/json')
+                assert response.status_code in (200, 503), response.status_code
+                logins.append((response.status_code, time.perf_counter() - started))
+                if response.status_code == 503:
+                    await asyncio.sleep(int(response['Retry-After']))
+
+        await asyncio.gather(*[browse() for _ in range(menu_concurrency)], *[log_in() for _ in range(login_concurrency)])
+        return menu, logins
+
+    def seed(self):
+        User.objects.create_user('storm', password='shift-change')
+        category = Category.objects.create(slug='mains', title='Mains')
+        MenuItem.objects.bulk_create(
+            MenuItem(title=f'Item {n}', price=10 + n % 20, inventory=100, category=category) for n in range(200)
+        )
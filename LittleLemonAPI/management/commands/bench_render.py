@@ -0,0 +1,74 @@
+import gzip
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from rest_framework_xml.renderers import XMLRenderer
+
+from LittleLemonAPI.benchmarks import DISH_WORDS, isolated_database, measure
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.renderers import FastJSONRenderer, MessagePackRenderer
+from LittleLemonAPI.serializers import MenuItemSerializer, OrderSerializer
+
+
+RENDERERS = [('drf json', JSONRenderer), ('fast json', FastJSONRenderer), ('msgpack', MessagePackRenderer), ('xml', XMLRenderer)]
+
+
+class Command(BaseCommand):
+    help = 'Measure render time and payload size per renderer for large order and menu item responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--menu-items', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with isolated_database():
+            self.seed(rng, options['orders'], options['menu_items'])
+            # Serialize once; only the renderers are being compared
+            payloads = {
+                'orders': OrderSerializer(
+                    Order.objects.prefetch_related(Prefetch('items', OrderItem.objects.order_by('pk'))).order_by('pk'), many=True
+                ).data,
+                'menu items': MenuItemSerializer(MenuItem.objects.select_related('category').order_by('pk'), many=True).data,
+            }
+
+        self.stdout.write(f"{'payload':<12}{'renderer':<11}{'p50 ms':>9}{'p95 ms':>9}{'bytes':>11}{'gzip bytes':>12}{'vs drf':>8}")
+        for name, data in payloads.items():
+            baseline = None
+            for label, renderer_class in RENDERERS:
+                renderer = renderer_class()
+                content = renderer.render(data)
+                # XMLRenderer returns text; Django encodes it on the way out
+                content = content.encode() if isinstance(content, str) else content
+                stats = measure(lambda: renderer.render(data), options['iterations'], warmup=2)
+                baseline = baseline or stats['p50_ms']
+                self.stdout.write(
+                    f"{name:<12}{label:<11}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                    f"{len(content):>11,}{len(gzip.compress(content)):>12,}{baseline / stats['p50_ms']:>7.1f}x"
+                )
+
+    def seed(self, rng, order_count, item_count):
+        customers = User.objects.bulk_create(User(username=f'customer{n}') for n in range(50))
+        categories = Category.objects.bulk_create(Category(slug=f'category-{n}', title=f'Category {n}') for n in range(10))
+        items = MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f'{rng.choice(DISH_WORDS)} {rng.choice(DISH_WORDS)} {n}', price=Decimal(rng.randint(300, 3000)) / 100,
+                inventory=rng.randint(0, 500), category=rng.choice(categories),
+            )
+            for n in range(item_count)
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=rng.choice(customers), status=rng.random() < 0.5, total=0, item_count=0) for _ in range(order_count)
+        )
+        lines = []
+        for order in orders:
+            for item in rng.sample(items, rng.randint(1, 5)):
+                quantity = rng.randint(1, 3)
+                lines.append(OrderItem(order=order, menu_item=item, quantity=quantity, unit_price=item.price, line_total=item.price * quantity))
+        OrderItem.objects.bulk_create(lines, batch_size=5000)
@@ -0,0 +1,67 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from LittleLemonAPI.benchmarks import isolated_database, measure
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.search import MenuItemSearchFilter
+from LittleLemonAPI.views import MenuItemsViewSet
+
+
+ADJECTIVES = ['Spicy', 'Smoked', 'Grilled', 'Crispy', 'Roasted', 'Braised', 'Creamy', 'Tangy', 'Garlic', 'Herbed', 'Lemon', 'Truffle']
+DISHES = ['Chicken', 'Salmon', 'Tofu', 'Lamb', 'Mushroom', 'Prawn', 'Beef', 'Aubergine', 'Halloumi', 'Duck', 'Pork', 'Squid']
+STYLES = ['Risotto', 'Skewers', 'Salad', 'Flatbread', 'Tagine', 'Pasta', 'Bowl', 'Wrap', 'Stew', 'Burger', 'Curry', 'Soup']
+CATEGORIES = ['Starters', 'Mains', 'Desserts', 'Drinks', 'Sides', 'Specials', 'Vegan', 'Kids', 'Brunch', 'Grill']
+
+# Common word, rare word, two-word, prefix and category-title searches
+SEARCHES = ['pasta', 'halloumi tagine', 'smoked salmon', 'aub', 'vegan', 'zzz']
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's LIKE search with the FTS5 menu search on a large synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            started = time.perf_counter()
+            self.seed(options['items'], random.Random(options['seed']))
+            self.stdout.write(f"seeded {options['items']:,} menu items in {time.perf_counter() - started:.1f} s")
+
+            view = MenuItemsViewSet()
+            factory = APIRequestFactory()
+            queryset = MenuItem.objects.all()
+            self.stdout.write(f"{'search':<18}{'hits':>8}{'like p50 ms':>14}{'fts p50 ms':>13}{'speedup':>9}")
+            for term in SEARCHES:
+                request = Request(factory.get('/api/menu-items', {'search': term}))
+                results = {}
+                for label, backend in (('like', SearchFilter()), ('fts', MenuItemSearchFilter())):
+                    # What the list view does per request: count the matches and fetch the first page
+                    def run():
+                        filtered = backend.filter_queryset(request, queryset, view)
+                        return filtered.count(), list(filtered[:3])
+                    results[label] = measure(run, options['iterations'], warmup=3)
+                hits = MenuItemSearchFilter().filter_queryset(request, queryset, view).count()
+                like_ms, fts_ms = results['like']['p50_ms'], results['fts']['p50_ms']
+                self.stdout.write(f'{term:<18}{hits:>8}{like_ms:>14.2f}{fts_ms:>13.2f}{like_ms / fts_ms:>8.1f}x')
+
+    def seed(self, item_count, rng, batch_size=10_000):
+        categories = Category.objects.bulk_create(
+            Category(slug=title.lower(), title=title) for title in CATEGORIES
+        )
+        for start in range(0, item_count, batch_size):
+            MenuItem.objects.bulk_create(
+                MenuItem(
+                    title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {rng.choice(STYLES)} {n}',
+                    price=Decimal(rng.randint(300, 3000)) / 100, inventory=100, category=rng.choice(categories),
+                )
+                for n in range(start, min(start + batch_size, item_count))
+            )
@@ -0,0 +1,105 @@
+import multiprocessing
+import sqlite3
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from LittleLemonAPI.benchmarks import isolated_database, summarize
+from LittleLemonAPI.database import is_busy_error, run_with_retry
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+
+
+# The development profile is Django's default: rollback journal, DEFERRED transactions,
+# 5 s busy timeout, a new connection per request and no retries.
+PROFILES = {
+    'development': {'OPTIONS': {}, 'persistent': False, 'retry': False},
+    'production': {'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS, 'persistent': True, 'retry': True},
+}
+
+
+# A checkout-shaped write: read the lines, insert the order and its items, decrement stock
+def checkout(user_id, item_ids):
+    with transaction.atomic():
+        items = list(MenuItem.objects.filter(pk__in=item_ids))
+        order = Order.objects.create(user_id=user_id, total=sum(item.price for item in items), item_count=len(items))
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=item, quantity=1, unit_price=item.price, line_total=item.price) for item in items
+        )
+        MenuItem.objects.filter(pk__in=item_ids).update(inventory=F('inventory') - 1)
+
+
+def worker(profile_name, user_id, item_ids, writes, start, results):
+    profile = PROFILES[profile_name]
+    connection.settings_dict['OPTIONS'] = profile['OPTIONS']
+    samples, failures = [], 0
+    start.wait()
+    for n in range(writes):
+        lines = [item_ids[(n + offset) % len(item_ids)] for offset in range(3)]
+        began = time.perf_counter()
+        try:
+            if profile['retry']:
+                run_with_retry(checkout, user_id, lines, attempts=5)
+            else:
+                checkout(user_id, lines)
+            samples.append(time.perf_counter() - began)
+        except OperationalError as exc:
+            if not is_busy_error(exc):
+                raise
+            failures += 1
+        if not profile['persistent']:
+            connection.close()
+    connection.close()
+    results.put((samples, failures))
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent checkout throughput from several processes under the development and production SQLite profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Checkouts per process.')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        with isolated_database() as db:
+            users = User.objects.bulk_create(User(username=f'writer{n}') for n in range(options['processes']))
+            category = Category.objects.create(slug='mains', title='Mains')
+            items = MenuItem.objects.bulk_create(
+                MenuItem(title=f'Item {n}', price=10, inventory=30000, category=category) for n in range(50)
+            )
+            item_ids = [item.pk for item in items]
+            path = db.settings_dict['NAME']
+
+            self.stdout.write(f"{'profile':<13}{'writes/s':>10}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+            for profile_name in PROFILES:
+                db.close()
+                # WAL persists in the file, so each run sets its own journal mode first
+                with sqlite3.connect(path) as raw:
+                    raw.execute('PRAGMA journal_mode=%s' % ('WAL' if profile_name == 'production' else 'DELETE'))
+                raw.close()
+
+                start, results = context.Event(), context.Queue()
+                processes = [
+                    context.Process(target=worker, args=(profile_name, user.pk, item_ids, options['writes'], start, results))
+                    for user in users
+                ]
+                for process in processes:
+                    process.start()
+                began = time.perf_counter()
+                start.set()
+                outcomes = [results.get() for _ in processes]
+                elapsed = time.perf_counter() - began
+                for process in processes:
+                    process.join()
+
+                samples = [sample for worker_samples, failures in outcomes for sample in worker_samples]
+                failed = sum(failures for worker_samples, failures in outcomes)
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{profile_name:<13}{len(samples) / elapsed:>10.1f}{failed:>8}"
+                    f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                )
@@ -0,0 +1,80 @@
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+
+from LittleLemonAPI.benchmarks import patched, summarize
+from LittleLemonAPI.throttling import BucketStore, SharedUserRateThrottle
+
+
+def request_for(user_id):
+    return SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=user_id))
+
+
+def hammer(throttle_class, store_path, rate, attempts, start, results):
+    rates = {'user': rate}
+    with patched(throttle_class, THROTTLE_RATES=rates), patched(SharedUserRateThrottle, store=BucketStore(store_path)):
+        start.wait()
+        allowed = sum(throttle_class().allow_request(request_for(1), None) for _ in range(attempts))
+    results.put(allowed)
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's per-process cache throttle with the shared token-bucket throttle: cost per check and global limits across processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=5000, help='Checks timed per throttle.')
+        parser.add_argument('--rate', default='1000/min', help='Rate for the timing run; DRF keeps one history entry per allowed request.')
+        parser.add_argument('--processes', type=int, default=4, help='Workers sharing one user for the limit check.')
+        parser.add_argument('--limit', type=int, default=100, help='Requests per minute allowed in the limit check.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / 'throttle.sqlite3')
+            self.timing(path, options)
+            self.limits(path, options)
+
+    def timing(self, path, options):
+        self.stdout.write(f"{'throttle':<26}{'calls':>7}{'allowed':>9}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}")
+        store = BucketStore(path)
+        for throttle_class in (UserRateThrottle, SharedUserRateThrottle):
+            cache.clear()
+            samples, allowed = [], 0
+            with patched(throttle_class, THROTTLE_RATES={'user': options['rate']}), patched(SharedUserRateThrottle, store=store):
+                for n in range(options['calls']):
+                    # A fresh throttle per request, as DRF does; spread over a few users
+                    request = request_for(n % 10)
+                    began = time.perf_counter()
+                    allowed += throttle_class().allow_request(request, None)
+                    samples.append(time.perf_counter() - began)
+            stats = summarize(samples)
+            self.stdout.write(
+                f"{throttle_class.__name__:<26}{len(samples):>7}{allowed:>9}"
+                f"{stats['p50_ms'] * 1000:>9.1f}{stats['p95_ms'] * 1000:>9.1f}{stats['p99_ms'] * 1000:>9.1f}"
+            )
+
+    def limits(self, path, options):
+        context = multiprocessing.get_context('fork')
+        rate = f"{options['limit']}/min"
+        attempts = options['limit'] * 2
+        self.stdout.write(f"\n{options['processes']} processes x {attempts} requests from one user at {rate}")
+        for throttle_class in (UserRateThrottle, SharedUserRateThrottle):
+            cache.clear()
+            BucketStore(path).clear()
+            start, results = context.Event(), context.Queue()
+            processes = [
+                context.Process(target=hammer, args=(throttle_class, path, rate, attempts, start, results))
+                for _ in range(options['processes'])
+            ]
+            for process in processes:
+                process.start()
+            start.set()
+            allowed = sum(results.get() for _ in processes)
+            for process in processes:
+                process.join()
+            self.stdout.write(f"{throttle_class.__name__:<26}allowed {allowed:>5} (limit {options['limit']})")
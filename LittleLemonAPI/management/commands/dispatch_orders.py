@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.dispatch import dispatch_unassigned, dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Assign every undelivered order without a courier to the least busy delivery crew members.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        assigned = dispatch_unassigned(batch_size=options['batch_size'])
+        counts = list(dispatcher.open_orders().values())
+        if not counts:
+            self.stdout.write(self.style.WARNING(f'Assigned {assigned} orders: there are no delivery crew members.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Assigned {assigned} orders to {len(counts)} couriers, now holding {min(counts)}-{max(counts)} open orders each.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.analytics import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from orders and order items.'
+
+    def handle(self, *args, **options):
+        rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS('Sales rollups rebuilt.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.replication import replicate
+from LittleLemonAPI.routers import replica_alias
+
+
+class Command(BaseCommand):
+    help = 'Keep the LITTLELEMON_REPLICA SQLite file in sync with the primary database (local replication stand-in).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between copies; the replica lags by up to this much.')
+        parser.add_argument('--once', action='store_true', help='Copy once and exit.')
+
+    def handle(self, *args, **options):
+        if replica_alias() is None:
+            raise CommandError(f'No {settings.READ_REPLICA_ALIAS!r} database configured; set LITTLELEMON_REPLICA to a file path.')
+        while True:
+            elapsed = replicate()
+            if options['verbosity'] > 1 or options['once']:
+                self.stdout.write(f'replicated in {elapsed * 1000:.1f} ms')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (sales rollups and other order follow-up work) on a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at the same time.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls of an empty queue.')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due instead of polling forever.')
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        # Finish the running jobs on Ctrl-C / SIGTERM instead of leaving them locked
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: worker.stop())
+        self.stdout.write(f'Worker {worker.name} running {worker.concurrency} jobs at a time.')
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {worker.succeeded} jobs, {worker.failed} failed or were retried.'))
@@ -0,0 +1,60 @@
+from django.db import transaction
+
+from .cache import bump_catalog_version
+from .models import Category, MenuItem
+from .serializers import MenuItemImportRowSerializer
+
+
+MAX_IMPORT_ROWS = 10000
+
+
+# Validate rows, resolve/create their categories by slug in one pass and upsert menu items by title.
+# Bad rows are reported and skipped; the rest of the batch still goes in.
+def import_menu_rows(rows, batch_size=1000):
+    errors = []
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = MenuItemImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'errors': serializer.errors})
+        elif serializer.validated_data['title'] in valid:
+            errors.append({'row': index, 'errors': {'title': ['Duplicate title in this import.']}})
+        else:
+            valid[serializer.validated_data['title']] = serializer.validated_data
+
+    summary = {'created': 0, 'updated': 0, 'categories_created': 0, 'errors': errors}
+    if not valid:
+        return summary
+
+    with transaction.atomic():
+        slugs = {row['category'] for row in valid.values()}
+        categories = {}
+        for category in Category.objects.filter(slug__in=slugs).order_by('id'):
+            categories.setdefault(category.slug, category)
+        missing = []
+        for row in valid.values():
+            slug = row['category']
+            if slug not in categories:
+                categories[slug] = Category(slug=slug, title=row.get('category_title') or slug.replace('-', ' ').title())
+                missing.append(categories[slug])
+        Category.objects.bulk_create(missing, batch_size=batch_size)
+        if missing and missing[0].pk is None:
+            # Backends that can't return ids from bulk inserts
+            categories.update((category.slug, category) for category in Category.objects.filter(slug__in=[c.slug for c in missing]))
+
+        existing = set(MenuItem.objects.filter(title__in=valid).values_list('title', flat=True))
+        MenuItem.objects.bulk_create(
+            [
+                MenuItem(title=title, price=row['price'], inventory=row['inventory'], category=categories[row['category']])
+                for title, row in valid.items()
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['title'],
+            update_fields=['price', 'inventory', 'category'],
+        )
+        # bulk_create sends no signals, so invalidate the menu caches once for the whole batch
+        bump_catalog_version()
+
+    summary.update(created=len(valid) - len(existing), updated=len(existing), categories_created=len(missing))
+    return summary
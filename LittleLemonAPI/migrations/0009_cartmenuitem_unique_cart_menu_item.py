@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_duplicate_cart_lines(apps, schema_editor):
+    # Earlier versions created one row per add; fold them into a single row per (user, menu_item)
+    CartMenuItem = apps.get_model('LittleLemonAPI', 'CartMenuItem')
+    duplicates = (
+        CartMenuItem.objects.values('user_id', 'menu_item_id')
+        .annotate(rows=models.Count('id'), total=models.Sum('quantity'), keep=models.Min('id'))
+        .filter(rows__gt=1)
+    )
+    for line in duplicates:
+        CartMenuItem.objects.filter(pk=line['keep']).update(quantity=line['total'])
+        CartMenuItem.objects.filter(user_id=line['user_id'], menu_item_id=line['menu_item_id']).exclude(pk=line['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0008_remove_orderitem_user_orderitem_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartmenuitem',
+            constraint=models.UniqueConstraint(fields=('user', 'menu_item'), name='unique_cart_menu_item'),
+        ),
+    ]
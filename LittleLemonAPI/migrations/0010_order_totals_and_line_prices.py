@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+# Existing rows predate price snapshots, so the best available price is the current menu price
+def backfill_prices(apps, schema_editor):
+    OrderItem = apps.get_model('LittleLemonAPI', 'OrderItem')
+    Order = apps.get_model('LittleLemonAPI', 'Order')
+
+    last_id = 0
+    while True:
+        batch = list(OrderItem.objects.filter(pk__gt=last_id).select_related('menu_item').order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        for item in batch:
+            item.unit_price = item.menu_item.price
+            item.line_total = item.menu_item.price * item.quantity
+        OrderItem.objects.bulk_update(batch, ['unit_price', 'line_total'])
+        last_id = batch[-1].pk
+
+    last_id = 0
+    while True:
+        batch = list(Order.objects.filter(pk__gt=last_id).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        totals = {
+            row['order_id']: row
+            for row in OrderItem.objects.filter(order_id__in=[order.pk for order in batch])
+            .values('order_id')
+            .annotate(total=models.Sum('line_total'), item_count=models.Sum('quantity'))
+        }
+        for order in batch:
+            row = totals.get(order.pk)
+            order.total = row['total'] if row else 0
+            order.item_count = row['item_count'] if row else 0
+        Order.objects.bulk_update(batch, ['total', 'item_count'])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0009_cartmenuitem_unique_cart_menu_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
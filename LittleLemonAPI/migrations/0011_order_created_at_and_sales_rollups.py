@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+# Existing orders get the migration time as created_at, so their sales land on that day
+def build_rollups(apps, schema_editor):
+    Order = apps.get_model('LittleLemonAPI', 'Order')
+    OrderItem = apps.get_model('LittleLemonAPI', 'OrderItem')
+    DailySales = apps.get_model('LittleLemonAPI', 'DailySales')
+    DailyCategorySales = apps.get_model('LittleLemonAPI', 'DailyCategorySales')
+    DailyMenuItemSales = apps.get_model('LittleLemonAPI', 'DailyMenuItemSales')
+
+    daily = (
+        Order.objects.annotate(day=TruncDate('created_at')).values('day')
+        .annotate(order_count=models.Count('id'), unit_count=models.Sum('item_count'), amount=models.Sum('total'))
+    )
+    DailySales.objects.bulk_create([
+        DailySales(date=row['day'], orders=row['order_count'], units=row['unit_count'] or 0, revenue=row['amount'] or 0)
+        for row in daily
+    ], batch_size=1000)
+
+    lines = OrderItem.objects.filter(order__isnull=False).annotate(day=TruncDate('order__created_at'))
+    totals = dict(order_count=models.Count('order_id', distinct=True), unit_count=models.Sum('quantity'), amount=models.Sum('line_total'))
+    DailyCategorySales.objects.bulk_create([
+        DailyCategorySales(date=row['day'], category_id=row['category'], orders=row['order_count'], units=row['unit_count'], revenue=row['amount'])
+        for row in lines.values('day', category=models.F('menu_item__category_id')).annotate(**totals)
+    ], batch_size=1000)
+    DailyMenuItemSales.objects.bulk_create([
+        DailyMenuItemSales(date=row['day'], menu_item_id=row['menu_item_id'], orders=row['order_count'], units=row['unit_count'], revenue=row['amount'])
+        for row in lines.values('day', 'menu_item_id').annotate(**totals)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0010_order_totals_and_line_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='LittleLemonAPI.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='unique_daily_category_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='LittleLemonAPI.menuitem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'menu_item'), name='unique_daily_menu_item_sales')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
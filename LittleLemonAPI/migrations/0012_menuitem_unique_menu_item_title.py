@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+# Titles become unique; older duplicates keep the first row's title and get their id appended
+def disambiguate_duplicate_titles(apps, schema_editor):
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    duplicates = MenuItem.objects.values('title').annotate(rows=models.Count('id'), keep=models.Min('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        for item in MenuItem.objects.filter(title=duplicate['title']).exclude(pk=duplicate['keep']):
+            item.title = f"{item.title[:240]} #{item.pk}"
+            item.save(update_fields=['title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0011_order_created_at_and_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(disambiguate_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='menuitem',
+            constraint=models.UniqueConstraint(fields=('title',), name='unique_menu_item_title'),
+        ),
+    ]
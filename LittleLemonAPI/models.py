@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 # Create your models here.
@@ -16,6 +17,12 @@ class MenuItem(models.Model):
     inventory = models.SmallIntegerField()
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
 
+    class Meta:
+        constraints = [
+            # Titles identify menu items for bulk imports
+            models.UniqueConstraint(fields=['title'], name='unique_menu_item_title'),
+        ]
+
     def __str__(self)-> str:
         return self.title
     
@@ -25,15 +32,99 @@ class CartMenuItem(models.Model):
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'menu_item'], name='unique_cart_menu_item'),
+        ]
+
     def __str__(self)-> str:
         return self.title
 
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        # Load every order's items in one query so serializing a page is a constant number of queries.
+        # OrderSerializer only reads the user, crew and menu item ids, so nothing is joined.
+        return self.prefetch_related('items')
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     delivery_crew = models.ForeignKey(User, related_name='deliveries', on_delete=models.SET_NULL, null=True, blank=True)
     status = models.IntegerField(choices=[(0, 'Out for delivery'), (1, 'Delivered')], default=0)
+    # Written at checkout so listings and reports never join back to live menu prices
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = OrderQuerySet.as_manager()
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE, null=True, blank=True)
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Price snapshot taken at checkout; later menu price changes don't rewrite history
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+
+# Daily sales rollups, maintained incrementally by jobs queued at checkout (see analytics.py)
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_category_sales'),
+        ]
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='unique_daily_menu_item_sales'),
+        ]
+
+
+# One row per cached collection (the catalog, a user's cart, order lists); the version changes on
+# every write to it so conditional GETs can be answered without querying the collection (see conditional.py)
+class CollectionVersion(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.UUIDField()
+    changed_at = models.DateTimeField()
+
+
+# Background work queued by the views and run by `manage.py run_jobs` (see jobs.py).
+# Finished jobs are deleted; failed ones stay behind with their last error.
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=[(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')], default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at'),
+        ]
@@ -0,0 +1,30 @@
+import csv
+import io
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+# text/csv request bodies become a list of dicts keyed by the header row
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            text = stream.read().decode(encoding)
+            return list(csv.DictReader(io.StringIO(text, newline='')))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError(f'CSV parse error - {exc}')
+
+
+# application/msgpack request bodies from the mobile apps; maps must have string keys like JSON
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
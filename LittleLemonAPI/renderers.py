@@ -0,0 +1,44 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Whatever orjson and msgpack can't encode natively (Decimal, lazy strings, datetimes in
+# DRF's format, ...) goes through DRF's own encoder so every format agrees on the values
+_encode_default = JSONEncoder().default
+
+# DRF escapes these two so the output is also valid JavaScript; orjson writes them raw
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+# Byte-for-byte the output of DRF's compact JSONRenderer, encoded by orjson.
+# Indented output (?indent= / Accept: ...; indent=4) and anything orjson rejects
+# fall back to the stock renderer.
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}) or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80' in content:
+            for raw, escaped in _LINE_SEPARATORS:
+                content = content.replace(raw, escaped)
+        return content
+
+
+# Compact binary responses for the mobile apps: Accept: application/msgpack or ?format=msgpack
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
@@ -0,0 +1,17 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Local stand-in for replication: copies the primary SQLite file into the replica file with
+# SQLite's online backup API, which takes a consistent snapshot while the primary stays writable.
+def replicate(source=None, target=None):
+    source = source or connections.settings[DEFAULT_DB_ALIAS]['NAME']
+    target = target or connections.settings[settings.READ_REPLICA_ALIAS]['NAME']
+    started = time.perf_counter()
+    with closing(sqlite3.connect(source, timeout=30)) as primary, closing(sqlite3.connect(target, timeout=30)) as replica:
+        primary.backup(replica)
+    return time.perf_counter() - started
@@ -0,0 +1,118 @@
+import logging
+import sqlite3
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .shared_state import bump_versions, shared_values
+
+
+logger = logging.getLogger(__name__)
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'DeliveryCrew'
+
+ROLES_VERSION_KEY = 'roles-version'
+ROLES_CACHE_TIMEOUT = getattr(settings, 'ROLES_CACHE_TIMEOUT', 300)
+
+# Attribute used to memoize roles on the user object for the rest of the request
+_REQUEST_ATTR = '_littlelemon_roles'
+
+
+def _user_version_key(user_id):
+    return f'{ROLES_VERSION_KEY}:user:{user_id}'
+
+
+# Roles are cached in each process's Django cache, under a key made of version counters kept in
+# the host's shared state file. A group change on any worker bumps a counter, so every worker
+# stops using what it had cached on its next request. None when the counters can't be read.
+def _roles_key(user_id):
+    try:
+        versions = shared_values.get_many([ROLES_VERSION_KEY, _user_version_key(user_id)])
+    except sqlite3.Error:
+        logger.exception('Could not read role versions, loading roles from the database')
+        return None
+    return f'littlelemon:roles:{versions.get(ROLES_VERSION_KEY, 0)}:{versions.get(_user_version_key(user_id), 0)}:{user_id}'
+
+
+# Names of the groups a user belongs to, loaded at most once per request
+# and shared across requests through Django's cache
+def get_roles(user):
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, _REQUEST_ATTR, None)
+    if roles is None:
+        key = _roles_key(user.pk)
+        roles = cache.get(key) if key is not None else None
+        if roles is None:
+            # Cached for minutes, so never from a lagging replica
+            roles = frozenset(user.groups.using(DEFAULT_DB_ALIAS).values_list('name', flat=True))
+            if key is not None:
+                cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+        setattr(user, _REQUEST_ATTR, roles)
+    return roles
+
+
+# Same as get_roles for async views; only the group query goes through the async ORM
+async def aget_roles(user):
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, _REQUEST_ATTR, None)
+    if roles is None:
+        key = _roles_key(user.pk)
+        roles = cache.get(key) if key is not None else None
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.using(DEFAULT_DB_ALIAS).values_list('name', flat=True)])
+            if key is not None:
+                cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+        setattr(user, _REQUEST_ATTR, roles)
+    return roles
+
+
+def has_role(user, role):
+    return role in get_roles(user)
+
+
+def is_manager(user):
+    return has_role(user, MANAGER)
+
+
+def is_delivery_crew(user):
+    return has_role(user, DELIVERY_CREW)
+
+
+# Drop roles memoized on a user object, e.g. after changing its groups mid-request
+def forget_request_roles(user):
+    user.__dict__.pop(_REQUEST_ATTR, None)
+
+
+def invalidate_user_roles(*user_ids):
+    bump_versions(*[_user_version_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all_roles(**kwargs):
+    bump_versions(ROLES_VERSION_KEY)
+
+
+# SQLite may hand a deleted user's id to the next new user, so never let cached roles outlive the row
+def user_created_or_deleted(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_user_roles(instance.pk)
+
+
+# m2m_changed receiver for User.groups, fired by the group endpoints and the admin alike
+def groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove(...) / clear()
+        invalidate_user_roles(instance.pk)
+        forget_request_roles(instance)
+    elif action == 'pre_clear':
+        # group.user_set.clear() does not report which users were affected
+        invalidate_all_roles()
+    elif pk_set:
+        invalidate_user_roles(*pk_set)
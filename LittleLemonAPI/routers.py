@@ -0,0 +1,146 @@
+import contextvars
+import functools
+import logging
+import sqlite3
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .shared_state import shared_values
+
+
+logger = logging.getLogger(__name__)
+
+
+# Primary/replica routing. Writes and ordinary reads use the primary. Views that opt in
+# (ReplicaReadMixin, @read_from_replica) send their GET queries to the replica, unless the
+# requesting user, or something the view depends on such as the catalog, was written to
+# recently: then the view reads its own writes from the primary until the replica has caught up.
+# Pins are kept in the host's shared state file, so a write on one worker process moves reads on
+# every worker to the primary.
+
+_read_alias = contextvars.ContextVar('littlelemon_read_alias', default=None)
+
+CATALOG = 'catalog'
+
+
+def replica_alias():
+    alias = settings.READ_REPLICA_ALIAS
+    if alias not in connections.settings:
+        return None
+    # Under the test runner the replica mirrors the primary's file but not its test
+    # transaction, so it would miss uncommitted rows; read from the primary instead
+    if connections.settings[alias]['NAME'] == connections.settings[DEFAULT_DB_ALIAS]['NAME']:
+        return None
+    return alias
+
+
+def _pin_key(name):
+    return f'primary-pin:{name}'
+
+
+def user_pin(user):
+    return f'user:{user.pk}'
+
+
+# Keep reads that depend on `names` on the primary for REPLICA_STICKY_SECONDS
+def pin_to_primary(*names):
+    if replica_alias() is not None:
+        try:
+            shared_values.set_many({_pin_key(name): 1 for name in names}, settings.REPLICA_STICKY_SECONDS)
+        except sqlite3.Error:
+            logger.exception('Could not pin %s to the primary', ', '.join(names))
+
+
+def is_pinned(*names):
+    try:
+        return bool(shared_values.get_many([_pin_key(name) for name in names]))
+    except sqlite3.Error:
+        # Without the pins there is no telling what the replica has missed; the primary has it all
+        logger.exception('Could not read primary pins, reading from the primary')
+        return True
+
+
+def choose_read_alias(request, pins=()):
+    alias = replica_alias()
+    if alias is None or request.method not in SAFE_METHODS:
+        return None
+    user = getattr(request, 'user', None)
+    names = [*pins, user_pin(user)] if user is not None and user.is_authenticated else list(pins)
+    return None if names and is_pinned(*names) else alias
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema along with its data from the primary
+        return False if db == settings.READ_REPLICA_ALIAS else None
+
+
+# DRF views whose GETs can be served from the replica. replica_pins names the writes,
+# besides the requesting user's own, that should keep the view on the primary.
+class ReplicaReadMixin:
+    replica_pins = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        _read_alias.set(choose_read_alias(request, self.replica_pins))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _read_alias.set(None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+# The same for function views; goes below @api_view/@permission_classes so request.user is known
+def read_from_replica(*pins):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _read_alias.set(choose_read_alias(request, pins))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return wrapper
+    return decorator
+
+
+# Pins a user to the primary after any successful write they make, e.g. a checkout
+class ReadYourWritesMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            self._pin_writer(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # request.user may still be lazy and load the user from the database
+            await sync_to_async(self._pin_writer)(request, response)
+        return response
+
+    def _pin_writer(self, request, response):
+        user = getattr(request, 'user', None)
+        if response.status_code < 400 and user is not None and user.is_authenticated:
+            pin_to_primary(user_pin(user))
@@ -0,0 +1,101 @@
+import re
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import MenuItem
+
+
+# Full-text search over menu items backed by an SQLite FTS5 table.
+# Triggers keep the index in step with MenuItem and Category writes, including
+# bulk_create/upserts and queryset updates that send no signals.
+
+FTS_TABLE = 'LittleLemonAPI_menuitem_fts'
+MENU_ITEM_TABLE = MenuItem._meta.db_table
+CATEGORY_TABLE = MenuItem._meta.get_field('category').related_model._meta.db_table
+
+# bm25 column weights: a hit in the item title counts for more than one in its category title
+TITLE_WEIGHT = 10.0
+CATEGORY_WEIGHT = 1.0
+
+# Ids of the matching items, straight from the index
+_MATCHES = f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s'
+# bm25 for one matching item; FTS5 only ranks inside a MATCH query, looked up here by rowid
+_RANK = f'SELECT bm25("{FTS_TABLE}", %s, %s) FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s AND rowid = "{MENU_ITEM_TABLE}".id'
+
+_CATEGORY_TITLE = f'(SELECT title FROM "{CATEGORY_TABLE}" WHERE id = new.category_id)'
+
+SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+        title, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_insert" AFTER INSERT ON "{MENU_ITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}" (rowid, title, category) VALUES (new.id, new.title, {_CATEGORY_TITLE});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_update" AFTER UPDATE OF id, title, category_id ON "{MENU_ITEM_TABLE}" BEGIN
+        DELETE FROM "{FTS_TABLE}" WHERE rowid = old.id;
+        INSERT INTO "{FTS_TABLE}" (rowid, title, category) VALUES (new.id, new.title, {_CATEGORY_TITLE});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_delete" AFTER DELETE ON "{MENU_ITEM_TABLE}" BEGIN
+        DELETE FROM "{FTS_TABLE}" WHERE rowid = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_category_update" AFTER UPDATE OF title ON "{CATEGORY_TABLE}" BEGIN
+        UPDATE "{FTS_TABLE}" SET category = new.title
+        WHERE rowid IN (SELECT id FROM "{MENU_ITEM_TABLE}" WHERE category_id = new.id);
+    END''',
+]
+
+
+def search_available(connection):
+    return connection.vendor == 'sqlite'
+
+
+def rebuild_search_index(using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, category) '
+            f'SELECT m.id, m.title, c.title FROM "{MENU_ITEM_TABLE}" m JOIN "{CATEGORY_TABLE}" c ON c.id = m.category_id'
+        )
+
+
+# post_migrate receiver. SQLite rebuilds a table (dropping its triggers) for most
+# schema changes, so the index is re-checked after every migrate rather than in a migration.
+def install_search_index(using='default', **kwargs):
+    connection = connections[using]
+    if not search_available(connection) or not router.allow_migrate_model(using, MenuItem):
+        return
+    tables = connection.introspection.table_names()
+    if MENU_ITEM_TABLE not in tables:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%'])
+        complete = FTS_TABLE in tables and cursor.fetchone()[0] == len(SCHEMA) - 1
+        for statement in SCHEMA:
+            cursor.execute(statement)
+    if not complete:
+        rebuild_search_index(using)
+
+
+# "pas mai" -> '"pas"* "mai"*': every word must prefix-match a word in the item or category title
+def match_expression(terms):
+    words = [word for term in terms for word in re.findall(r'\w+', term)]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class MenuItemSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        expression = match_expression(terms)
+        connection = connections[queryset.db]
+        if not expression or queryset.model is not MenuItem or not search_available(connection):
+            # Punctuation-only searches and other databases keep DRF's LIKE search
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = queryset.filter(pk__in=RawSQL(_MATCHES, [expression]))
+        # An explicit ?ordering= wins, otherwise best matches come first (bm25 is lower for better matches)
+        if not queryset.ordered:
+            rank = RawSQL(_RANK, [TITLE_WEIGHT, CATEGORY_WEIGHT, expression])
+            queryset = queryset.alias(search_rank=rank).order_by('search_rank', 'pk')
+        return queryset
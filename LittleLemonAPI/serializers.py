@@ -21,19 +21,43 @@ class MenuItemSerializer(serializers.ModelSerializer):
             'inventory':{'min_value': 0}
         }
 
+class MenuItemImportRowSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=2)
+    inventory = serializers.IntegerField(min_value=0, max_value=32767)
+    category = serializers.SlugField(max_length=50)
+    category_title = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
 class CartMenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartMenuItem
         fields = ['id', 'menu_item', 'quantity', 'user']
 
+class CartBatchOperationSerializer(serializers.Serializer):
+    ADD, SET, REMOVE = 'add', 'set', 'remove'
+
+    menu_item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    action = serializers.ChoiceField(choices=[ADD, SET, REMOVE], default=ADD)
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = ['id', 'menu_item', 'quantity']
+        fields = ['id', 'menu_item', 'quantity', 'unit_price', 'line_total']
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'delivery_crew', 'status', 'items']
\ No newline at end of file
+        fields = ['id', 'user', 'delivery_crew', 'status', 'total', 'item_count', 'items']
+
+class OrderBulkUpdateSerializer(serializers.Serializer):
+    orders = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    delivery_crew = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Order._meta.get_field('status').choices, required=False)
+
+    def validate(self, attrs):
+        if 'delivery_crew' not in attrs and 'status' not in attrs:
+            raise serializers.ValidationError("Provide delivery_crew and/or status.")
+        return attrs
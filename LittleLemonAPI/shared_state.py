@@ -0,0 +1,109 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+# A small SQLite file (THROTTLE_DATABASE) that every worker process on the host opens, for state
+# the processes have to agree on: rate limit buckets, read-your-writes pins, cache versions.
+# Subclasses define their table in SCHEMA; writes are single statements in autocommit mode.
+class HostStore:
+    SCHEMA = None
+    TABLE = None
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path=None):
+        self._path = path
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return self._path or settings.THROTTLE_DATABASE
+
+    def _connection(self):
+        # Connections don't survive fork(), so each process (and thread) opens its own
+        connection = getattr(self._local, 'connection', None)
+        path = self.path
+        if connection is None or self._local.pid != os.getpid() or self._local.path != path:
+            connection = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Counters, not records: losing the last moments of state on power loss is fine
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(self.SCHEMA)
+            self._local.connection, self._local.pid, self._local.path, self._local.calls = connection, os.getpid(), path, 0
+        return connection
+
+    # Rows whose expiry has passed are deleted every PRUNE_EVERY writes per thread
+    def _maybe_prune(self, connection, now):
+        self._local.calls += 1
+        if self._local.calls % self.PRUNE_EVERY == 0:
+            connection.execute(f'DELETE FROM {self.TABLE} WHERE expires < ?', [now])
+
+    def clear(self):
+        self._connection().execute(f'DELETE FROM {self.TABLE}')
+
+
+# Integer values by key, optionally expiring, e.g. primary pins that last a few seconds and
+# version counters that every process checks before trusting what it has cached
+class SharedValues(HostStore):
+    SCHEMA = '''CREATE TABLE IF NOT EXISTS shared_values (
+        key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires REAL
+    ) WITHOUT ROWID'''
+    TABLE = 'shared_values'
+
+    # {key: value} for the keys that are set and not expired
+    def get_many(self, keys, now=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time() if now is None else now
+        rows = self._connection().execute(
+            f"SELECT key, value FROM shared_values WHERE key IN ({', '.join('?' * len(keys))}) AND (expires IS NULL OR expires > ?)",
+            [*keys, now],
+        )
+        return dict(rows.fetchall())
+
+    def set_many(self, values, timeout=None, now=None):
+        now = time.time() if now is None else now
+        expires = now + timeout if timeout is not None else None
+        connection = self._connection()
+        connection.executemany(
+            'INSERT INTO shared_values (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+            [(key, value, expires) for key, value in values.items()],
+        )
+        self._maybe_prune(connection, now)
+
+    # Atomically adds one to a counter that never expires and returns the new value
+    def incr(self, key):
+        # fetchall() finishes the statement, which ends its implicit write transaction
+        rows = self._connection().execute(
+            'INSERT INTO shared_values (key, value, expires) VALUES (?, 1, NULL) '
+            'ON CONFLICT (key) DO UPDATE SET value = value + 1, expires = NULL RETURNING value',
+            [key],
+        ).fetchall()
+        return rows[0][0]
+
+
+shared_values = SharedValues()
+
+
+# Bump version counters now, and again once the enclosing transaction commits: another worker
+# may reload and cache the old rows in between. Failures are logged; cached copies then live out their TTL.
+def bump_versions(*keys):
+    def bump():
+        try:
+            for key in keys:
+                shared_values.incr(key)
+        except sqlite3.Error:
+            logger.exception('Could not bump %s; other workers keep their cached copies until they expire', ', '.join(keys))
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from .instrumentation import query_metrics
+
+
+# TestCase mixin: declare query_budgets = {'OrderViewSet.list': 4, ...} and wrap client calls in
+# assertQueryBudgets(). Any request over its endpoint's budget, or to an endpoint without one,
+# fails the test with the SQL it ran, so N+1 regressions show up before deploy.
+class QueryBudgetMixin:
+    query_budgets = {}
+
+    @contextmanager
+    def assertQueryBudgets(self, budgets=None):
+        budgets = {**self.query_budgets, **(budgets or {})}
+        seen = []
+        observer = lambda endpoint, collector: seen.append((endpoint, collector))
+        query_metrics.observers.append(observer)
+        try:
+            yield seen
+        finally:
+            query_metrics.observers.remove(observer)
+
+        for endpoint, collector in seen:
+            if endpoint not in budgets:
+                self.fail(f'No query budget declared for {endpoint} ({collector.count} queries)')
+            if collector.count > budgets[endpoint]:
+                statements = '\n'.join(f'  {n}. {sql}' for n, sql in enumerate(collector.statements, 1))
+                self.fail(f'{endpoint} ran {collector.count} queries, budget is {budgets[endpoint]}:\n{statements}')
@@ -1,3 +1,1594 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, AsyncClient, AsyncRequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, force_authenticate
+
+from . import async_views, views
+from .analytics import rebuild_sales_rollups, sales_report
+from .authentication import token_cache
+from .cache import LRUCache, catalog_cache
+from .conditional import CATALOG_COLLECTION, order_collections, touch
+from .database import retry_on_busy, run_with_retry
+from .dispatch import Dispatcher, dispatch_unassigned, dispatcher
+from .events import get_broker, order_channel
+from .hashing import HashingPool
+from .fast_serializers import ValuesSerializer, cart_item_values, menu_item_values, order_values
+from .instrumentation import QueryMetricsMiddleware, query_metrics
+from . import hashing, jobs, roles
+from .jobs import ORDER_STATUS_CHANGED, Worker, claim, enqueue, job, run_job, run_pending
+from .menu_import import import_menu_rows
+from .models import Category, MenuItem, CartMenuItem, Order, OrderItem, DailySales, Job
+from .renderers import FastJSONRenderer
+from .serializers import CartMenuItemSerializer, MenuItemSerializer, OrderSerializer
+from .replication import replicate
+from .routers import PrimaryReplicaRouter, is_pinned, pin_to_primary, user_pin
+from .shared_state import SharedValues, shared_values
+from .testing import QueryBudgetMixin
+from .throttling import BucketStore, SharedUserRateThrottle, shared_buckets
+
+
+# The throttle buckets live in a file that every process on the host shares, a dev server
+# included, so the suite counts in a file of its own
+_shared_state_directory = tempfile.TemporaryDirectory()
+_shared_state_settings = override_settings(THROTTLE_DATABASE=str(Path(_shared_state_directory.name) / 'throttle.sqlite3'))
+
+
+def setUpModule():
+    _shared_state_settings.enable()
+
+
+def tearDownModule():
+    _shared_state_settings.disable()
+    _shared_state_directory.cleanup()
+
+
+# Caches and rate limits live outside the test transaction, so each test starts without them
+class LittleLemonTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        shared_buckets.clear()
+        shared_values.clear()
+        catalog_cache.clear()
+        token_cache.clear()
+
+
+class OrderPaginationTests(QueryBudgetMixin, LittleLemonTestCase):
+    # Orders, their items and the collection version behind the ETag, however large the page
+    query_budgets = {'OrderViewSet.list': 4}
+
+    def setUp(self):
+        super().setUp()
+        self.customer = User.objects.create_user('customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.items = [MenuItem.objects.create(title=f'Dish {n}', price=5, inventory=50, category=category) for n in range(3)]
+        self.orders = [self.place_order() for _ in range(7)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def place_order(self):
+        order = Order.objects.create(user=self.customer)
+        OrderItem.objects.bulk_create(OrderItem(order=order, menu_item=item, quantity=1) for item in self.items)
+        return order
+
+    def ids(self, response):
+        return [order['id'] for order in response.data['results']]
+
+    def test_next_and_previous_links_walk_every_order_newest_first(self):
+        first = self.client.get('/api/orders', {'page_size': 3})
+        self.assertIsNone(first.data['previous'])
+        pages, response = [self.ids(first)], first
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(self.ids(response))
+        self.assertEqual(pages, [[order.pk for order in reversed(self.orders)][n:n + 3] for n in (0, 3, 6)])
+
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(self.client.get(second.data['previous'])), pages[0])
+
+    def test_cursor_is_stable_while_orders_are_placed(self):
+        first = self.client.get('/api/orders', {'page_size': 3})
+        # New orders land in front of the cursor and shift no rows between pages
+        newer = [self.place_order() for _ in range(2)]
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(second), [order.pk for order in reversed(self.orders)][3:6])
+        self.assertEqual(self.ids(self.client.get(second.data['previous'])), [order.pk for order in reversed(self.orders)][:3])
+        self.assertEqual(self.ids(self.client.get('/api/orders', {'page_size': 3})), [newer[1].pk, newer[0].pk, self.orders[-1].pk])
+
+    def test_pages_cost_the_same_queries_at_any_size(self):
+        response = self.client.get('/api/orders', {'page_size': 2})
+        with self.assertQueryBudgets():
+            self.client.get('/api/orders', {'page_size': 100})
+            self.client.get(response.data['next'])
+        self.assertEqual(len(self.client.get('/api/orders', {'page_size': 100}).data['results'][0]['items']), 3)
+
+
+class CatalogCacheTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.item = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+        self.client = APIClient()
+
+    def price(self):
+        return self.client.get(f'/api/menu-items/{self.item.pk}').data['price']
+
+    def test_hits_cost_one_version_lookup(self):
+        self.client.get('/api/menu-items')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+        self.assertEqual(catalog_cache.stats()['hits'], 1)
+
+    def test_writes_in_other_workers_retire_cached_pages(self):
+        self.assertEqual(self.price(), '12.00')
+        # Another process's write reaches this one only through the database
+        MenuItem.objects.filter(pk=self.item.pk).update(price=15)
+        self.assertEqual(self.price(), '12.00')
+        touch(CATALOG_COLLECTION)
+        self.assertEqual(self.price(), '15.00')
+
+        self.item.price = 16
+        self.item.save()
+        self.assertEqual(self.price(), '16.00')
+
+    def checkout(self, quantity):
+        customer = User.objects.create_user(f'customer{quantity}')
+        CartMenuItem.objects.create(user=customer, menu_item=self.item, quantity=quantity)
+        client = APIClient()
+        client.force_authenticate(customer)
+        self.assertEqual(client.post('/api/orders').status_code, 201)
+
+    def test_checkouts_keep_cached_pages_with_current_inventory(self):
+        before = self.client.get('/api/menu-items')
+        self.checkout(3)
+        # Still a hit: one query for the versions, one for the stock on the page
+        with self.assertNumQueries(2):
+            after = self.client.get('/api/menu-items')
+        self.assertEqual(after.data['results'][0]['inventory'], 7)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(catalog_cache.stats()['hits'], 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/menu-items').data['results'][0]['inventory'], 7)
+        self.assertEqual(self.client.get(f'/api/menu-items/{self.item.pk}').data['inventory'], 7)
+
+    def test_pages_sorted_by_inventory_follow_checkouts(self):
+        other = MenuItem.objects.create(title='Soup', price=5, inventory=8, category=self.item.category)
+        self.client.get('/api/menu-items?ordering=inventory')
+        self.checkout(3)
+        results = self.client.get('/api/menu-items?ordering=inventory').data['results']
+        self.assertEqual([(item['id'], item['inventory']) for item in results], [(self.item.pk, 7), (other.pk, 8)])
+
+    def test_lru_evicts_the_least_recently_used_entry(self):
+        lru = LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual([lru.get(key) for key in 'abc'], [1, None, 3])
+        self.assertEqual(lru.stats()['evictions'], 1)
+
+    def test_entries_expire_after_their_ttl(self):
+        lru = LRUCache(10, ttl=60)
+        with mock.patch('LittleLemonAPI.cache.time.monotonic', return_value=1000):
+            lru.set('a', 1)
+        with mock.patch('LittleLemonAPI.cache.time.monotonic', return_value=1059):
+            self.assertEqual(lru.get('a'), 1)
+        with mock.patch('LittleLemonAPI.cache.time.monotonic', return_value=1060):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.stats()['size'], 0)
+
+
+class RolesCacheTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.managers = Group.objects.create(name='Manager')
+        self.boss = User.objects.create_user('boss')
+        self.boss.groups.add(self.managers)
+        self.user = User.objects.create_user('user')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def can_manage(self):
+        status_code = self.client.get('/api/groups/manager/users').status_code
+        self.assertIn(status_code, (200, 403))
+        return status_code == 200
+
+    # Runs fn as another worker process would: same database and shared state file, its own cache
+    def in_other_worker(self, fn):
+        with mock.patch('LittleLemonAPI.roles.cache', LocMemCache('other-worker', {})):
+            fn()
+
+    def test_roles_are_cached_between_requests(self):
+        self.assertFalse(self.can_manage())
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.get_roles(User(pk=self.user.pk)), frozenset())
+
+    def test_promotion_applies_on_the_next_request(self):
+        self.assertFalse(self.can_manage())
+        self.in_other_worker(lambda: self.user.groups.add(self.managers))
+        self.assertTrue(self.can_manage())
+
+    def test_revocation_applies_on_the_next_request(self):
+        self.user.groups.add(self.managers)
+        self.assertTrue(self.can_manage())
+        self.in_other_worker(lambda: self.managers.user_set.remove(self.user))
+        self.assertFalse(self.can_manage())
+
+    def test_deleting_a_group_takes_its_role_away(self):
+        self.user.groups.add(self.managers)
+        self.assertTrue(self.can_manage())
+        self.in_other_worker(self.managers.delete)
+        self.assertFalse(self.can_manage())
+
+    def test_unreadable_versions_fall_back_to_the_database(self):
+        with mock.patch.object(shared_values, 'get_many', side_effect=sqlite3.OperationalError('disk I/O error')), \
+                self.assertLogs('LittleLemonAPI.roles', 'ERROR'):
+            self.assertEqual(roles.get_roles(User.objects.get(pk=self.boss.pk)), {'Manager'})
+
+
+class TokenCacheTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self):
+        return self.client.get('/api/users/users/me')
+
+    def test_repeat_requests_skip_the_token_lookup(self):
+        self.assertEqual(self.me().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me().status_code, 200)
+
+    def test_deleted_tokens_are_refused_on_the_next_request(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivated_users_are_refused_on_the_next_request(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.me().status_code, 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.me().status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_group_changes_apply_on_the_next_request(self):
+        self.assertEqual(self.client.get('/api/groups/manager/users').status_code, 403)
+        self.user.groups.add(Group.objects.create(name='Manager'))
+        self.assertEqual(self.client.get('/api/groups/manager/users').status_code, 200)
+
+    def test_revocations_in_other_workers_apply_on_the_next_request(self):
+        self.assertEqual(self.me().status_code, 200)
+        # Another process deletes the token; this one's cache is only reached through shared state
+        with mock.patch('LittleLemonAPI.authentication.token_cache', LRUCache(10)):
+            self.token.delete()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_cache_fill_skips_the_roles_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.me().status_code, 200)
+        self.assertFalse([query for query in queries if 'auth_user_groups' in query['sql']])
+
+    def test_saves_of_other_fields_keep_the_cached_authentication(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me().status_code, 200)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.soup = MenuItem.objects.create(title='Soup', price=5, inventory=3, category=category)
+        self.pasta = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+
+    def test_checkout_decrements_inventory_and_clears_cart(self):
+        CartMenuItem.objects.create(user=self.user, menu_item=self.soup, quantity=2)
+        CartMenuItem.objects.create(user=self.user, menu_item=self.pasta, quantity=4)
+
+        response = self.client.post('/api/orders')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual((response.data['total'], response.data['item_count']), ('58.00', 6))
+        self.assertEqual(
+            sorted((item['unit_price'], item['line_total']) for item in response.data['items']),
+            [('12.00', '48.00'), ('5.00', '10.00')],
+        )
+        self.soup.refresh_from_db()
+        self.pasta.refresh_from_db()
+        self.assertEqual((self.soup.inventory, self.pasta.inventory), (1, 6))
+        self.assertFalse(CartMenuItem.objects.filter(user=self.user).exists())
+
+    def test_cart_is_read_under_the_write_lock(self):
+        CartMenuItem.objects.create(user=self.user, menu_item=self.soup, quantity=1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.post('/api/orders').status_code, 201)
+        statements = [query['sql'] for query in queries]
+        version_write = next(n for n, sql in enumerate(statements) if 'littlelemonapi_collectionversion' in sql.lower() and not sql.startswith('SELECT'))
+        cart_read = next(n for n, sql in enumerate(statements) if sql.startswith('SELECT') and 'littlelemonapi_cartmenuitem' in sql.lower())
+        self.assertLess(version_write, cart_read)
+
+    def test_checkout_rejects_oversell_and_keeps_cart(self):
+        CartMenuItem.objects.create(user=self.user, menu_item=self.soup, quantity=4)
+        CartMenuItem.objects.create(user=self.user, menu_item=self.pasta, quantity=1)
+
+        response = self.client.post('/api/orders')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['items'], [{'menu_item': self.soup.pk, 'requested': 4, 'available': 3}])
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.inventory, 10)
+        self.assertEqual(CartMenuItem.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.items = [MenuItem.objects.create(title=f'Dish {n}', price=8, inventory=50, category=category) for n in range(3)]
+
+    def cart(self):
+        return dict(CartMenuItem.objects.filter(user=self.user).values_list('menu_item_id', 'quantity'))
+
+    def test_repeated_adds_increment_a_single_row(self):
+        for _ in range(2):
+            self.client.post('/api/cart/menu-items', {'menu_item_id': self.items[0].pk, 'quantity': 2}, format='json')
+        self.assertEqual(self.cart(), {self.items[0].pk: 4})
+
+    def test_batch_applies_adds_sets_and_removes(self):
+        first, second, third = self.items
+        CartMenuItem.objects.create(user=self.user, menu_item=first, quantity=1)
+        CartMenuItem.objects.create(user=self.user, menu_item=second, quantity=5)
+
+        response = self.client.post('/api/cart/menu-items/batch', {'operations': [
+            {'menu_item_id': first.pk, 'quantity': 2},
+            {'menu_item_id': second.pk, 'action': 'remove'},
+            {'menu_item_id': third.pk, 'quantity': 3, 'action': 'set'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {first.pk: 3, third.pk: 3})
+
+    def test_batch_with_unknown_item_changes_nothing(self):
+        response = self.client.post('/api/cart/menu-items/batch', [
+            {'menu_item_id': self.items[0].pk},
+            {'menu_item_id': 999},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['menu_item_ids'], [999])
+        self.assertEqual(self.cart(), {})
+
+
+class OrderBulkUpdateTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.courier = User.objects.create_user('courier')
+        self.courier.groups.add(Group.objects.create(name='DeliveryCrew'))
+        customer = User.objects.create_user('customer')
+        self.orders = [Order.objects.create(user=customer) for _ in range(5)]
+        self.client = APIClient()
+
+    def test_manager_assigns_crew_in_constant_queries(self):
+        self.client.force_authenticate(self.manager)
+        ids = [order.pk for order in self.orders] + [999]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/bulk', {'orders': ids, 'delivery_crew': self.courier.pk}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 5)
+        self.assertEqual(response.data['results'][-1], {'id': 999, 'result': 'not_found'})
+        self.assertEqual(Order.objects.filter(delivery_crew=self.courier).count(), 5)
+        # Two of them are the transaction's savepoint and release
+        self.assertLessEqual(len(queries), 8)
+
+    def test_crew_only_delivers_assigned_orders(self):
+        assigned, other = self.orders[0], self.orders[1]
+        Order.objects.filter(pk=assigned.pk).update(delivery_crew=self.courier)
+        self.client.force_authenticate(self.courier)
+
+        response = self.client.patch('/api/orders/bulk', {'orders': [assigned.pk, other.pk], 'status': 1}, format='json')
+
+        self.assertEqual([result['result'] for result in response.data['results']], ['updated', 'forbidden'])
+        self.assertEqual(list(Order.objects.filter(status=1).values_list('id', flat=True)), [assigned.pk])
+
+    def test_crew_cannot_assign_crew(self):
+        self.client.force_authenticate(self.courier)
+        response = self.client.post('/api/orders/bulk', {'orders': [self.orders[0].pk], 'delivery_crew': self.courier.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderEventsTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.courier = User.objects.create_user('courier')
+        self.courier.groups.add(Group.objects.create(name='DeliveryCrew'))
+        self.customer = User.objects.create_user('customer')
+        self.order = Order.objects.create(user=self.customer)
+
+    async def test_assignment_is_pushed_to_customer_and_crew(self):
+        broker = get_broker()
+        customer = broker.subscribe(order_channel(self.customer.pk))
+        courier = broker.subscribe(order_channel(self.courier.pk))
+        try:
+            def assign():
+                client = APIClient()
+                client.force_authenticate(self.manager)
+                with self.captureOnCommitCallbacks(execute=True):
+                    client.patch(f'/api/orders/{self.order.pk}', {'delivery_crew': self.courier.pk}, format='json')
+
+            await sync_to_async(assign)()
+            expected = {'event': 'updated', 'id': self.order.pk, 'status': 0, 'delivery_crew': self.courier.pk}
+            self.assertEqual(await asyncio.wait_for(customer[1].get(), 1), expected)
+            self.assertEqual(await asyncio.wait_for(courier[1].get(), 1), expected)
+        finally:
+            broker.unsubscribe(order_channel(self.customer.pk), customer)
+            broker.unsubscribe(order_channel(self.courier.pk), courier)
+
+    async def test_stream_delivers_events_over_asgi(self):
+        token = await Token.objects.acreate(user=self.customer)
+        response = await AsyncClient().get('/api/orders/events', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        event = {'event': 'updated', 'id': self.order.pk, 'status': 1, 'delivery_crew': None}
+        get_broker().publish([order_channel(self.customer.pk)], event)
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertEqual(json.loads(chunk.decode().split('data: ')[1]), event)
+        await chunks.aclose()
+
+    async def test_stream_requires_authentication(self):
+        response = await AsyncClient().get('/api/orders/events')
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncReadViewTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.customer = User.objects.create_user('customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        items = [MenuItem.objects.create(title=f'Dish {n}', price=5 + n, inventory=n, category=category) for n in range(7)]
+        CartMenuItem.objects.create(user=self.customer, menu_item=items[0], quantity=2)
+        for n in range(5):
+            order = Order.objects.create(user=self.customer)
+            OrderItem.objects.create(order=order, menu_item=items[n], quantity=1)
+        self.order = order
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+
+    async def call_async(self, view, path, user=None, params=None, **kwargs):
+        request = self.factory.get(path, params or {})
+        if user is not None:
+            force_authenticate(request, user)
+        return await view.as_view()(request, **kwargs)
+
+    def call_sync(self, path, user=None, params=None):
+        self.client.force_authenticate(user)
+        return self.client.get(path, params or {})
+
+    async def assert_same(self, view, path, user=None, params=None, **kwargs):
+        catalog_cache.clear()
+        expected = await sync_to_async(self.call_sync)(path, user, params)
+        catalog_cache.clear()
+        actual = await self.call_async(view, path, user, params, **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(json.loads(json.dumps(actual.data)), json.loads(json.dumps(expected.data)))
+
+    async def test_menu_items_match_sync_viewset(self):
+        view = async_views.MenuItemsAsyncView
+        await self.assert_same(view, '/api/menu-items')
+        await self.assert_same(view, '/api/menu-items', params={'page': 2, 'ordering': '-price', 'search': 'Dish'})
+        await self.assert_same(view, '/api/menu-items', params={'page': 9})
+        item = await MenuItem.objects.afirst()
+        await self.assert_same(view, f'/api/menu-items/{item.pk}', pk=item.pk)
+        await self.assert_same(view, '/api/menu-items/999', pk=999)
+
+    async def test_cart_and_orders_match_sync_viewsets(self):
+        await self.assert_same(async_views.CartMenuItemsAsyncView, '/api/cart/menu-items', self.customer)
+        await self.assert_same(async_views.OrderAsyncView, '/api/orders', self.customer, {'page_size': 2})
+        await self.assert_same(async_views.OrderAsyncView, '/api/orders', self.manager)
+        await self.assert_same(async_views.OrderAsyncView, f'/api/orders/{self.order.pk}', self.customer, pk=self.order.pk)
+
+    async def test_orders_ignore_ordering_and_search_like_the_sync_viewset(self):
+        await self.assert_same(async_views.OrderAsyncView, '/api/orders', self.manager, {'ordering': 'status'})
+        await self.assert_same(async_views.OrderAsyncView, '/api/orders', self.customer, {'search': 'Dish', 'ordering': '-id'})
+
+    async def test_orders_require_authentication(self):
+        response = await self.call_async(async_views.OrderAsyncView, '/api/orders')
+        self.assertEqual(response.status_code, 401)
+
+
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.customer = User.objects.create_user('customer')
+        mains = Category.objects.create(slug='mains', title='Mains')
+        drinks = Category.objects.create(slug='drinks', title='Drinks')
+        self.pasta = MenuItem.objects.create(title='Pasta', price=12, inventory=100, category=mains)
+        self.soup = MenuItem.objects.create(title='Soup', price=6, inventory=100, category=mains)
+        self.lemonade = MenuItem.objects.create(title='Lemonade', price=3, inventory=100, category=drinks)
+        self.client = APIClient()
+
+    def checkout(self, *lines):
+        self.client.force_authenticate(self.customer)
+        for item, quantity in lines:
+            CartMenuItem.objects.create(user=self.customer, menu_item=item, quantity=quantity)
+        self.assertEqual(self.client.post('/api/orders').status_code, 201)
+
+    def report(self, group_by):
+        run_pending()
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/analytics/sales', {'group_by': group_by})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_checkout_maintains_rollups(self):
+        self.checkout((self.pasta, 2), (self.soup, 1), (self.lemonade, 2))
+        self.checkout((self.pasta, 1))
+
+        self.assertEqual(self.report('item'), [
+            {'id': self.pasta.pk, 'title': 'Pasta', 'orders': 2, 'units': 3, 'revenue': '36.00'},
+            {'id': self.soup.pk, 'title': 'Soup', 'orders': 1, 'units': 1, 'revenue': '6.00'},
+            {'id': self.lemonade.pk, 'title': 'Lemonade', 'orders': 1, 'units': 2, 'revenue': '6.00'},
+        ])
+        self.assertEqual([(row['title'], row['orders'], row['revenue']) for row in self.report('category')], [
+            ('Mains', 2, '42.00'), ('Drinks', 1, '6.00'),
+        ])
+        [day] = self.report('day')
+        self.assertEqual((day['orders'], day['units'], day['revenue']), (2, 6, '48.00'))
+
+    def test_rebuild_matches_incremental_rollups_after_delete(self):
+        self.checkout((self.pasta, 2), (self.lemonade, 1))
+        self.checkout((self.soup, 3))
+        self.client.force_authenticate(self.manager)
+        self.client.delete(f'/api/orders/{Order.objects.order_by("id").first().pk}')
+        run_pending()
+
+        incremental = {group_by: sales_report(group_by) for group_by in ('item', 'category', 'day')}
+        rebuild_sales_rollups()
+        rebuilt = {group_by: sales_report(group_by) for group_by in ('item', 'category', 'day')}
+        self.assertEqual([row for row in incremental['item'] if row['units']], rebuilt['item'])
+        self.assertEqual([row for row in incremental['category'] if row['units']], rebuilt['category'])
+        self.assertEqual(incremental['day'], rebuilt['day'])
+
+    def test_removal_waits_for_the_recording(self):
+        self.checkout((self.pasta, 2))
+        self.client.force_authenticate(self.manager)
+        self.client.delete(f'/api/orders/{Order.objects.get().pk}')
+
+        # A worker picks up the removal before the recording, e.g. while the recording is being retried
+        record, remove = claim('test', 10)
+        self.assertTrue(run_job(remove))
+        self.assertTrue(run_job(record))
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+
+        self.assertFalse(Job.objects.exists())
+        [day] = sales_report('day')
+        self.assertEqual((day['orders'], day['units'], day['revenue']), (0, 0, '0.00'))
+
+    def test_removal_drops_a_recording_that_gave_up(self):
+        self.checkout((self.pasta, 2))
+        Job.objects.update(status=Job.FAILED)
+        self.client.force_authenticate(self.manager)
+        self.client.delete(f'/api/orders/{Order.objects.get().pk}')
+        run_pending()
+
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(sales_report('day'), [])
+
+    def test_customers_cannot_read_analytics(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/analytics/sales').status_code, 403)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        customer = User.objects.create_user('customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        pasta = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+        soup = MenuItem.objects.create(title='Soup', price=5, inventory=10, category=category)
+        self.first = Order.objects.create(user=customer, total=29, item_count=3)
+        OrderItem.objects.create(order=self.first, menu_item=pasta, quantity=2, unit_price=12, line_total=24)
+        OrderItem.objects.create(order=self.first, menu_item=soup, quantity=1, unit_price=5, line_total=5)
+        self.second = Order.objects.create(user=customer, status=1, total=5, item_count=1)
+        OrderItem.objects.create(order=self.second, menu_item=soup, quantity=1, unit_price=5, line_total=5)
+        self.empty = Order.objects.create(user=customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_csv_has_one_row_per_order_item(self):
+        response = self.client.get('/api/orders/export')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['order_id', 'created_at', 'user_id'])
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(self.first.pk)] * 2 + [str(self.second.pk), str(self.empty.pk)])
+        # An order without items keeps its row, with the item columns empty
+        self.assertEqual(lines[-1].split(',')[7:], [''] * 5)
+
+    def test_ndjson_includes_orders_without_items(self):
+        response = self.client.get('/api/orders/export', {'output': 'ndjson'})
+
+        orders = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(order['order_id'], len(order['items'])) for order in orders], [(self.first.pk, 2), (self.second.pk, 1), (self.empty.pk, 0)])
+
+    async def test_asgi_export_streams_in_chunks(self):
+        request = AsyncRequestFactory().get('/api/orders/export', {'output': 'ndjson'})
+        force_authenticate(request, self.manager)
+        response = await sync_to_async(views.export_orders)(request)
+
+        # An async iterator, so Django sends batches as they are read instead of buffering the export
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual([json.loads(line)['order_id'] for line in lines], [self.first.pk, self.second.pk, self.empty.pk])
+
+    def test_ndjson_groups_items_and_filters_by_status(self):
+        response = self.client.get('/api/orders/export', {'output': 'ndjson', 'status': 0})
+
+        orders = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([order['order_id'] for order in orders], [self.first.pk, self.empty.pk])
+        self.assertEqual(orders[0]['total'], '29.00')
+        self.assertEqual([(item['quantity'], item['line_total']) for item in orders[0]['items']], [(2, '24.00'), (1, '5.00')])
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(self.client.get('/api/orders/export', {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export', {'output': 'xlsx'}).status_code, 400)
+
+
+class MenuImportTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.mains = Category.objects.create(slug='mains', title='Mains')
+        MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=self.mains)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_json_import_upserts_by_title_and_reports_bad_rows(self):
+        rows = [
+            {'title': 'Pasta', 'price': '13.50', 'inventory': 4, 'category': 'mains'},
+            {'title': 'Tiramisu', 'price': '7.00', 'inventory': 20, 'category': 'desserts', 'category_title': 'Sweets'},
+            {'title': 'Gelato', 'price': '1.00', 'inventory': 5, 'category': 'desserts'},
+            {'title': 'Tiramisu', 'price': '8.00', 'inventory': 1, 'category': 'desserts'},
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/menu-items/import', rows, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['created'], response.data['updated'], response.data['categories_created']), (1, 1, 1)
+        )
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        pasta = MenuItem.objects.get(title='Pasta')
+        self.assertEqual((str(pasta.price), pasta.inventory, pasta.category_id), ('13.50', 4, self.mains.pk))
+        tiramisu = MenuItem.objects.select_related('category').get(title='Tiramisu')
+        self.assertEqual((tiramisu.inventory, tiramisu.category.title), (20, 'Sweets'))
+
+    def test_csv_upload_import(self):
+        body = 'title,price,inventory,category\nSoup,5.00,8,starters\nPasta,11.00,2,mains\n'
+        upload = SimpleUploadedFile('menu.csv', body.encode(), content_type='text/csv')
+
+        response = self.client.post('/api/menu-items/import', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['errors']), (1, 1, []))
+        self.assertEqual(Category.objects.get(slug='starters').title, 'Starters')
+        self.assertEqual(MenuItem.objects.get(title='Pasta').inventory, 2)
+
+    def test_csv_body_import(self):
+        response = self.client.post(
+            '/api/menu-items/import', 'title,price,inventory,category\nSoup,5.00,8,mains\n', content_type='text/csv'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(MenuItem.objects.filter(title='Soup', category=self.mains).exists())
+
+    def test_only_managers_can_import(self):
+        self.client.force_authenticate(User.objects.create_user('customer'))
+        self.assertEqual(self.client.post('/api/menu-items/import', [], format='json').status_code, 403)
+
+
+class MenuSearchTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mains = Category.objects.create(slug='mains', title='Mains')
+        self.pasta_dishes = Category.objects.create(slug='pasta', title='Pasta Dishes')
+        MenuItem.objects.create(title='Pasta Carbonara', price=14, inventory=5, category=self.mains)
+        MenuItem.objects.create(title='Lasagne', price=13, inventory=5, category=self.pasta_dishes)
+        MenuItem.objects.create(title='Crème Brûlée', price=7, inventory=5, category=self.mains)
+        self.client = APIClient()
+
+    def search(self, term, **params):
+        response = self.client.get('/api/menu-items', {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_prefix_matches_rank_titles_above_categories(self):
+        self.assertEqual(self.search('pas'), ['Pasta Carbonara', 'Lasagne'])
+        self.assertEqual(self.search('pasta', ordering='price'), ['Lasagne', 'Pasta Carbonara'])
+        self.assertEqual(self.search('creme brul'), ['Crème Brûlée'])
+        self.assertEqual(self.search('carb mains'), ['Pasta Carbonara'])
+
+    def test_index_follows_writes(self):
+        MenuItem.objects.filter(title='Lasagne').update(title='Ravioli')
+        self.pasta_dishes.title = 'Noodles'
+        self.pasta_dishes.save()
+        MenuItem.objects.get(title='Pasta Carbonara').delete()
+
+        self.assertEqual(self.search('pasta'), [])
+        self.assertEqual(self.search('noodl'), ['Ravioli'])
+
+    def test_bulk_import_is_searchable(self):
+        import_menu_rows([{'title': 'Penne Arrabbiata', 'price': '11.00', 'inventory': 3, 'category': 'pasta'}])
+
+        self.assertEqual(self.search('penne'), ['Penne Arrabbiata'])
+        self.assertEqual(self.search('dishes'), ['Lasagne', 'Penne Arrabbiata'])
+
+
+class QueryBudgetTests(QueryBudgetMixin, LittleLemonTestCase):
+    # Seeded with several rows per relation, so a per-row query anywhere blows these budgets.
+    # Reads include the collection version lookup behind ETag/Last-Modified, writes the version bump.
+    # Under TestCase a write's transaction also shows up as a savepoint and its release.
+    query_budgets = {
+        'CategoriesView.list': 3,
+        'MenuItemsViewSet.list': 3,
+        'MenuItemsViewSet.retrieve': 2,
+        'CartMenuItemsViewSet.list': 2,
+        'CartMenuItemsViewSet.create': 8,
+        'OrderViewSet.list': 4,
+        'OrderViewSet.retrieve': 3,
+        'OrderViewSet.partial_update': 6,
+        'managers': 2,
+        'delivery_crew': 2,
+        'sales_analytics': 1,
+    }
+
+    def setUp(self):
+        super().setUp()
+        query_metrics.reset()
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        crew = Group.objects.create(name='DeliveryCrew')
+        self.customer = User.objects.create_user('customer')
+        for n in range(3):
+            User.objects.create_user(f'driver{n}').groups.add(crew)
+        categories = [Category.objects.create(slug=f'category-{n}', title=f'Category {n}') for n in range(3)]
+        self.items = [MenuItem.objects.create(title=f'Dish {n}', price=5, inventory=50, category=categories[n % 3]) for n in range(6)]
+        for item in self.items[:4]:
+            CartMenuItem.objects.create(user=self.customer, menu_item=item, quantity=1)
+        for _ in range(4):
+            order = Order.objects.create(user=self.customer)
+            for item in self.items[:3]:
+                OrderItem.objects.create(order=order, menu_item=item, quantity=1, unit_price=5, line_total=5)
+        self.order = order
+        self.client = APIClient()
+
+    def test_endpoints_stay_within_budget(self):
+        self.client.force_authenticate(self.customer)
+        with self.assertQueryBudgets() as requests:
+            self.client.get('/api/categories')
+            self.client.get('/api/menu-items')
+            self.client.get(f'/api/menu-items/{self.items[0].pk}')
+            self.client.get('/api/cart/menu-items')
+            self.client.post('/api/cart/menu-items', {'menu_item_id': self.items[5].pk, 'quantity': 2}, format='json')
+            self.client.get('/api/orders')
+            self.client.get(f'/api/orders/{self.order.pk}')
+            self.client.force_authenticate(self.manager)
+            self.client.get('/api/orders')
+            self.client.patch(f'/api/orders/{self.order.pk}', {'status': 1}, format='json')
+            self.client.get('/api/groups/manager/users')
+            self.client.get('/api/groups/delivery-crew/users')
+            self.client.get('/api/analytics/sales')
+
+        self.assertEqual(len(requests), 12)
+
+    def test_over_budget_requests_fail_with_their_sql(self):
+        self.client.force_authenticate(self.customer)
+        with self.assertRaisesMessage(AssertionError, 'OrderViewSet.list ran'):
+            with self.assertQueryBudgets({'OrderViewSet.list': 1}):
+                self.client.get('/api/orders')
+        with self.assertRaisesMessage(AssertionError, 'No query budget declared for unresolved'):
+            with self.assertQueryBudgets():
+                self.client.get('/api/no-such-endpoint')
+
+    @override_settings(QUERY_METRICS_HEADERS=True)
+    def test_headers_and_metrics_endpoint(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get('/api/orders')
+        self.assertEqual(response['X-Endpoint'], 'OrderViewSet.list')
+        self.client.get('/api/orders')
+
+        self.client.force_authenticate(self.manager)
+        report = self.client.get('/api/metrics/queries').data
+        self.assertEqual(report['OrderViewSet.list']['requests'], 2)
+        self.assertEqual(report['OrderViewSet.list']['max_queries'], int(response['X-DB-Query-Count']))
+        self.assertIn('SELECT', report['OrderViewSet.list']['slowest_query'])
+
+    @override_settings(QUERY_METRICS_HEADERS=True)
+    async def test_requests_through_the_asgi_handler_are_measured(self):
+        await sync_to_async(catalog_cache.clear)()
+        response = await AsyncClient().get('/api/menu-items')
+        self.assertEqual(response['X-Endpoint'], 'MenuItemsViewSet.list')
+        self.assertEqual(response['X-DB-Query-Count'], '3')
+
+    @override_settings(QUERY_METRICS_HEADERS=True)
+    async def test_concurrent_async_requests_are_counted_apart(self):
+        async def view(request):
+            for _ in range(int(request.GET['queries'])):
+                await Category.objects.acount()
+                await asyncio.sleep(0)
+            return HttpResponse()
+
+        middleware = QueryMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = AsyncRequestFactory()
+        responses = await asyncio.gather(*(middleware(factory.get('/', {'queries': n})) for n in (1, 4, 2)))
+        self.assertEqual([response['X-DB-Query-Count'] for response in responses], ['1', '4', '2'])
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    # Outside a test transaction, so the retry helpers behave as they do in a request
+    databases = {'default'}
+
+    def test_lock_errors_are_retried(self):
+        calls = []
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        self.assertEqual(run_with_retry(write, attempts=3, backoff=0), 'done')
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+        def write():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+
+        with self.assertRaises(OperationalError):
+            run_with_retry(write, attempts=3, backoff=0)
+        self.assertEqual(len(calls), 1)
+
+    def test_busy_writes_answer_503(self):
+        @retry_on_busy
+        def view(request):
+            raise OperationalError('database is locked')
+
+        with self.settings(DATABASE_BUSY_RETRIES=1):
+            response = view(None)
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+
+    def test_production_options_configure_the_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = ConnectionHandler({'default': {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': Path(directory) / 'prod.sqlite3',
+                'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS,
+            }})
+            production = handler['default']
+            try:
+                with production.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                self.assertEqual(production.transaction_mode, 'IMMEDIATE')
+            finally:
+                production.close()
+
+
+class ReplicaRoutingTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = User.objects.create_user('customer')
+        self.other = User.objects.create_user('other')
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.item = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    # Which alias each read of `model` was routed to while fn ran; the test database doubles
+    # as the replica, so "replica" reads are the ones routed explicitly to 'default'
+    def routed_reads(self, model, fn):
+        routed = []
+        original = PrimaryReplicaRouter.db_for_read
+        def db_for_read(router, read_model, **hints):
+            alias = original(router, read_model, **hints)
+            if read_model is model:
+                routed.append('replica' if alias else 'primary')
+            return alias
+        with mock.patch('LittleLemonAPI.routers.replica_alias', return_value='default'), \
+                mock.patch.object(PrimaryReplicaRouter, 'db_for_read', db_for_read):
+            fn()
+        return set(routed)
+
+    def test_catalog_and_order_reads_use_the_replica(self):
+        self.assertEqual(self.routed_reads(MenuItem, lambda: self.client.get('/api/menu-items')), {'replica'})
+        self.assertEqual(self.routed_reads(Order, lambda: self.client.get('/api/orders')), {'replica'})
+        self.assertEqual(self.routed_reads(CartMenuItem, lambda: self.client.get('/api/cart/menu-items')), {'primary'})
+
+    def test_a_user_who_checked_out_reads_from_the_primary(self):
+        CartMenuItem.objects.create(user=self.customer, menu_item=self.item, quantity=1)
+        def checkout():
+            self.assertEqual(self.client.post('/api/orders').status_code, 201)
+        self.routed_reads(Order, checkout)
+
+        self.assertEqual(self.routed_reads(Order, lambda: self.client.get('/api/orders')), {'primary'})
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.routed_reads(Order, lambda: self.client.get('/api/orders')), {'replica'})
+
+    def test_catalog_writes_keep_catalog_reads_on_the_primary(self):
+        self.item.price = 13
+        self.routed_reads(MenuItem, self.item.save)
+
+        self.assertEqual(self.routed_reads(MenuItem, lambda: self.client.get('/api/menu-items')), {'primary'})
+
+    def test_pins_reach_every_worker_process_and_expire(self):
+        with mock.patch('LittleLemonAPI.routers.replica_alias', return_value='default'):
+            pin_to_primary(user_pin(self.customer))
+        # Another process opens the same file with its own connection
+        other = SharedValues(settings.THROTTLE_DATABASE)
+        self.assertEqual(other.get_many(['primary-pin:' + user_pin(self.customer)]), {'primary-pin:' + user_pin(self.customer): 1})
+        self.assertTrue(is_pinned(user_pin(self.customer)))
+        self.assertFalse(is_pinned(user_pin(self.other)))
+        expired = time.time() + settings.REPLICA_STICKY_SECONDS + 1
+        self.assertEqual(other.get_many(['primary-pin:' + user_pin(self.customer)], now=expired), {})
+
+    def test_unreadable_pins_read_from_the_primary(self):
+        with mock.patch.object(shared_values, 'get_many', side_effect=sqlite3.OperationalError('disk I/O error')), \
+                self.assertLogs('LittleLemonAPI.routers', 'ERROR'):
+            self.assertEqual(self.routed_reads(MenuItem, lambda: self.client.get('/api/menu-items')), {'primary'})
+
+    def test_replicate_copies_the_primary_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = Path(directory) / 'primary.sqlite3', Path(directory) / 'replica.sqlite3'
+            with sqlite3.connect(primary) as db:
+                db.execute('CREATE TABLE dish (title TEXT)')
+                db.execute("INSERT INTO dish VALUES ('Pasta')")
+            replicate(primary, replica)
+            with sqlite3.connect(replica) as db:
+                self.assertEqual(db.execute('SELECT title FROM dish').fetchall(), [('Pasta',)])
+
+
+class SharedThrottleTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'throttle.sqlite3')
+        self.store = BucketStore(self.path)
+
+    def test_bucket_enforces_capacity_and_reports_the_wait(self):
+        results = [self.store.take('user_1', 3, 60, now=1000) for _ in range(4)]
+        self.assertEqual([allowed for allowed, wait in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 20)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(3):
+            self.store.take('user_1', 3, 60, now=1000)
+        self.assertFalse(self.store.take('user_1', 3, 60, now=1010)[0])
+        self.assertTrue(self.store.take('user_1', 3, 60, now=1020)[0])
+        self.assertFalse(self.store.take('user_1', 3, 60, now=1020)[0])
+        self.assertTrue(self.store.take('user_2', 3, 60, now=1020)[0])
+
+    def test_quota_is_shared_between_stores_on_the_same_file(self):
+        # Stands in for two worker processes
+        other = BucketStore(self.path)
+        allowed = [store.take('anon_1', 4, 60, now=1000)[0] for store in (self.store, other) * 3]
+        self.assertEqual(allowed.count(True), 4)
+
+    def test_throttle_denies_past_the_rate_and_fails_open(self):
+        request = mock.Mock(user=mock.Mock(is_authenticated=True, pk=7))
+        with mock.patch.object(SharedUserRateThrottle, 'store', self.store), \
+                mock.patch.object(SharedUserRateThrottle, 'THROTTLE_RATES', {'user': '2/min'}):
+            allowed = [SharedUserRateThrottle().allow_request(request, None) for _ in range(3)]
+            self.assertEqual(allowed, [True, True, False])
+            throttle = SharedUserRateThrottle()
+            with mock.patch.object(self.store, 'take', side_effect=sqlite3.OperationalError('disk I/O error')), \
+                    self.assertLogs('LittleLemonAPI.throttling', 'ERROR'):
+                self.assertTrue(throttle.allow_request(request, None))
+
+
+class RendererTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = User.objects.create_user('customer')
+        category = Category.objects.create(slug='mains', title='Crème brûlée\u2028& "friends"')
+        self.item = MenuItem.objects.create(title='Pâtes 🍝', price=Decimal('12.50'), inventory=4, category=category)
+        order = Order.objects.create(user=self.customer, total=Decimal('25.00'), item_count=2)
+        OrderItem.objects.create(order=order, menu_item=self.item, quantity=2, unit_price=Decimal('12.50'), line_total=Decimal('25.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_fast_json_matches_drf_byte_for_byte(self):
+        for path in ('/api/menu-items', f'/api/menu-items/{self.item.pk}', '/api/orders', '/api/categories'):
+            data = self.client.get(path).data
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), path)
+        errors = {'detail': 'Not found.', 'values': [Decimal('1.10'), None, True, 3.5, {'nested': []}]}
+        self.assertEqual(FastJSONRenderer().render(errors), JSONRenderer().render(errors))
+        context = {'indent': 2}
+        self.assertEqual(FastJSONRenderer().render(errors, renderer_context=context), JSONRenderer().render(errors, renderer_context=context))
+
+    def test_messagepack_responses_carry_the_json_values(self):
+        json_body = self.client.get('/api/orders').json()
+        response = self.client.get('/api/orders', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json_body)
+        self.assertLess(len(response.content), len(json.dumps(json_body, separators=(',', ':'), ensure_ascii=False).encode()))
+        response = self.client.get('/api/menu-items?format=msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['results'][0]['price'], '12.50')
+
+    def test_messagepack_request_bodies(self):
+        body = msgpack.packb({'menu_item_id': self.item.pk, 'quantity': 2})
+        response = self.client.post('/api/cart/menu-items', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(CartMenuItem.objects.get(user=self.customer).quantity, 2)
+        response = self.client.post('/api/cart/menu-items', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+class ValuesSerializerParityTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = User.objects.create_user('customer')
+        self.driver = User.objects.create_user('driver')
+        mains = Category.objects.create(slug='mains', title='Mains')
+        sweets = Category.objects.create(slug='sweets', title='Crème "brûlée" \u2028')
+        prices = ['2.00', '9.5', '1234.99', '12.10']
+        items = [
+            MenuItem.objects.create(title=f'Dish {n} 🍝', price=Decimal(prices[n % 4]), inventory=n, category=(mains, sweets)[n % 2])
+            for n in range(8)
+        ]
+        for n, item in enumerate(items[:5]):
+            CartMenuItem.objects.create(user=self.customer, menu_item=item, quantity=n + 1)
+        for n in range(6):
+            order = Order.objects.create(user=self.customer, delivery_crew=self.driver if n % 2 else None, status=n % 2,
+                                         total=Decimal('10.50') * n, item_count=n)
+            # The last order has no items
+            for item in items[n:n + 3] if n < 5 else []:
+                OrderItem.objects.create(order=order, menu_item=item, quantity=2, unit_price=item.price, line_total=item.price * 2)
+
+    def assertSameJSON(self, serializer_class, values_serializer, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(values_serializer.data(queryset)), expected)
+
+    def test_values_serializers_render_like_the_model_serializers(self):
+        self.assertSameJSON(MenuItemSerializer, menu_item_values, MenuItem.objects.select_related('category').order_by('pk'))
+        self.assertSameJSON(CartMenuItemSerializer, cart_item_values, CartMenuItem.objects.order_by('pk'))
+        self.assertSameJSON(OrderSerializer, order_values, Order.objects.with_items().order_by('-pk'))
+        self.assertSameJSON(OrderSerializer, order_values, Order.objects.none())
+
+    def test_list_endpoints_match_the_model_serializers(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.get('/api/menu-items?ordering=-price&page=2')
+        page = MenuItem.objects.select_related('category').order_by('-price')[3:6]
+        self.assertEqual(response.json()['results'], json.loads(JSONRenderer().render(MenuItemSerializer(page, many=True).data)))
+        response = client.get('/api/orders?page_size=4')
+        expected = OrderSerializer(Order.objects.with_items().order_by('-pk')[:4], many=True).data
+        self.assertEqual(response.json()['results'], json.loads(JSONRenderer().render(expected)))
+        response = client.get('/api/cart/menu-items')
+        self.assertEqual(response.content, JSONRenderer().render(CartMenuItemSerializer(CartMenuItem.objects.order_by('pk'), many=True).data))
+
+    async def test_async_rendering_matches(self):
+        rows = [row async for row in order_values.values(Order.objects.order_by('pk'))]
+        self.assertEqual(await order_values.ato_representation(rows), await sync_to_async(order_values.to_representation)(rows))
+
+    def test_fields_without_a_column_are_rejected(self):
+        class Labelled(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = MenuItem
+                fields = ['id', 'label']
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(Labelled).plan
+
+
+class ConditionalGetTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.customer = User.objects.create_user('customer')
+        self.other = User.objects.create_user('other')
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.item = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def revalidate(self, path, response, **headers):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    def test_menu_is_not_modified_until_the_catalog_changes(self):
+        first = self.client.get('/api/menu-items')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('no-cache', first['Cache-Control'])
+        # Served from the catalog cache after one lookup of the catalog's version row
+        with self.assertNumQueries(1):
+            second = self.revalidate('/api/menu-items', first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.client.get('/api/menu-items', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        self.assertNotEqual(self.client.get('/api/menu-items?format=msgpack')['ETag'], first['ETag'])
+        self.assertNotEqual(self.client.get('/api/menu-items?page=1')['ETag'], first['ETag'])
+
+        self.item.price = 13
+        self.item.save()
+        third = self.revalidate('/api/menu-items', first)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(self.revalidate('/api/categories', self.client.get('/api/categories')).status_code, 304)
+
+    def test_cart_revalidation_skips_the_cart_query(self):
+        first = self.client.get('/api/cart/menu-items')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate('/api/cart/menu-items', first).status_code, 304)
+        self.client.post('/api/cart/menu-items', {'menu_item_id': self.item.pk, 'quantity': 2}, format='json')
+        second = self.revalidate('/api/cart/menu-items', first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()), 1)
+        self.assertIn('private', second['Cache-Control'])
+
+    def test_orders_change_for_the_users_who_can_see_them(self):
+        self.client.post('/api/cart/menu-items', {'menu_item_id': self.item.pk, 'quantity': 1}, format='json')
+        order_id = self.client.post('/api/orders').json()['id']
+        mine = self.client.get('/api/orders')
+        detail = self.client.get(f'/api/orders/{order_id}')
+        self.client.force_authenticate(self.other)
+        theirs = self.client.get('/api/orders')
+
+        self.client.force_authenticate(self.manager)
+        self.assertEqual(self.client.patch(f'/api/orders/{order_id}', {'status': 1}, format='json').status_code, 200)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.revalidate('/api/orders', theirs).status_code, 304)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.revalidate('/api/orders', mine).status_code, 200)
+        self.assertEqual(self.revalidate(f'/api/orders/{order_id}', detail).status_code, 200)
+        # A validator from another path or user never matches
+        self.assertEqual(self.revalidate('/api/orders', detail).status_code, 200)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.revalidate('/api/orders', mine).status_code, 200)
+
+    def test_deleting_a_menu_item_changes_the_carts_and_orders_holding_it(self):
+        courier = User.objects.create_user('courier')
+        order = Order.objects.create(user=self.customer, delivery_crew=courier)
+        OrderItem.objects.create(order=order, menu_item=self.item, quantity=1)
+        CartMenuItem.objects.create(user=self.customer, menu_item=self.item, quantity=2)
+        cart = self.client.get('/api/cart/menu-items')
+        orders = self.client.get('/api/orders')
+        self.client.force_authenticate(self.manager)
+        every_order = self.client.get('/api/orders')
+
+        MenuItem.objects.filter(pk=self.item.pk).delete()
+
+        self.assertEqual(self.revalidate('/api/orders', every_order).status_code, 200)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.revalidate('/api/cart/menu-items', cart).json(), [])
+        self.assertEqual(self.revalidate('/api/orders', orders).status_code, 200)
+
+    def test_order_detail_is_authorized_before_revalidation(self):
+        order = Order.objects.create(user=self.customer)
+        # Both users' order lists have versions, so either could be (wrongly) validated against
+        touch(*order_collections(self.customer.pk), *order_collections(self.other.pk))
+        later = http_date(time.time() + 3600)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/orders/{order.pk}', HTTP_IF_MODIFIED_SINCE=later).status_code, 403)
+        self.assertEqual(self.client.get(f'/api/orders/{order.pk + 1}', HTTP_IF_MODIFIED_SINCE=later).status_code, 404)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get(f'/api/orders/{order.pk}', HTTP_IF_MODIFIED_SINCE=later).status_code, 304)
+
+    async def test_async_order_detail_is_authorized_before_revalidation(self):
+        order = await Order.objects.acreate(user=self.customer)
+        await sync_to_async(touch)(*order_collections(self.customer.pk), *order_collections(self.other.pk))
+        later = http_date(time.time() + 3600)
+
+        async def retrieve(user, pk):
+            request = AsyncRequestFactory().get(f'/api/orders/{pk}', headers={'If-Modified-Since': later})
+            force_authenticate(request, user)
+            return await async_views.OrderAsyncView.as_view()(request, pk=pk)
+
+        self.assertEqual((await retrieve(self.other, order.pk)).status_code, 403)
+        self.assertEqual((await retrieve(self.other, order.pk + 1)).status_code, 404)
+        self.assertEqual((await retrieve(self.customer, order.pk)).status_code, 304)
+
+
+class DispatchTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        crew = Group.objects.create(name='DeliveryCrew')
+        self.couriers = [User.objects.create_user(f'driver{n}') for n in range(3)]
+        for courier in self.couriers:
+            courier.groups.add(crew)
+        self.customer = User.objects.create_user('customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.item = MenuItem.objects.create(title='Pasta', price=12, inventory=100, category=category)
+        # driver0 already has two orders out, driver1 one
+        for courier in (self.couriers[0], self.couriers[0], self.couriers[1]):
+            Order.objects.create(user=self.customer, delivery_crew=courier)
+        Order.objects.create(user=self.customer, delivery_crew=self.couriers[2], status=1)
+        self.client = APIClient()
+
+    def checkout(self):
+        self.client.force_authenticate(self.customer)
+        self.client.post('/api/cart/menu-items', {'menu_item_id': self.item.pk, 'quantity': 1}, format='json')
+        return Order.objects.get(pk=self.client.post('/api/orders').json()['id'])
+
+    def assertMatchesDatabase(self):
+        self.assertEqual(dispatcher.open_orders(), {
+            courier.pk: Order.objects.filter(delivery_crew=courier, status=0).count() for courier in self.couriers
+        })
+
+    def test_least_busy_courier_gets_the_next_order(self):
+        heap = Dispatcher()
+        self.assertEqual([heap.assign() for _ in range(4)], [self.couriers[n].pk for n in (2, 1, 2, 0)])
+        heap.order_changed(self.couriers[0].pk, True, self.couriers[0].pk, False)
+        self.assertEqual(heap.open_orders(), {self.couriers[0].pk: 2, self.couriers[1].pk: 2, self.couriers[2].pk: 2})
+
+    def test_checkout_assigns_and_status_changes_free_couriers(self):
+        orders = [self.checkout() for _ in range(3)]
+        self.assertEqual([order.delivery_crew_id for order in orders], [self.couriers[n].pk for n in (2, 1, 2)])
+        self.assertMatchesDatabase()
+
+        self.client.force_authenticate(self.couriers[0])
+        delivered = Order.objects.filter(delivery_crew=self.couriers[0]).first()
+        self.assertEqual(self.client.patch(f'/api/orders/{delivered.pk}', {'status': 1}, format='json').status_code, 200)
+        self.assertMatchesDatabase()
+        self.assertEqual(self.checkout().delivery_crew_id, self.couriers[0].pk)
+        self.assertMatchesDatabase()
+
+    def test_new_couriers_are_picked_up(self):
+        self.checkout()
+        newcomer = User.objects.create_user('driver3')
+        newcomer.groups.add(Group.objects.get(name='DeliveryCrew'))
+        self.assertEqual(self.checkout().delivery_crew_id, newcomer.pk)
+
+    def test_rolled_back_checkout_leaves_counts_alone(self):
+        self.checkout()
+        with mock.patch('LittleLemonAPI.views.emit', side_effect=RuntimeError('job table unavailable')):
+            with self.assertRaises(RuntimeError):
+                self.checkout()
+        self.assertMatchesDatabase()
+
+    def test_deactivated_couriers_get_no_orders(self):
+        self.checkout()
+        idle = self.couriers[1]
+        idle.is_active = False
+        idle.save()
+        self.assertNotIn(idle.pk, dispatcher.open_orders())
+        self.assertNotEqual(self.checkout().delivery_crew_id, idle.pk)
+
+        idle.is_active = True
+        idle.save(update_fields=['is_active'])
+        self.assertIn(idle.pk, dispatcher.open_orders())
+
+    def test_backlog_is_spread_over_the_crew(self):
+        with override_settings(DISPATCH_AUTO_ASSIGN=False):
+            self.assertIsNone(self.checkout().delivery_crew)
+        for _ in range(4):
+            Order.objects.create(user=self.customer)
+        self.assertEqual(dispatch_unassigned(batch_size=2), 5)
+        self.assertFalse(Order.objects.filter(delivery_crew__isnull=True).exists())
+        self.assertMatchesDatabase()
+        self.assertEqual(sorted(dispatcher.open_orders().values()), [2, 3, 3])
+
+
+@job(max_attempts=2)
+def flaky_job(slug):
+    # Writes, then fails: the write must not survive the failed attempt
+    Category.objects.create(slug=slug, title=slug)
+    raise RuntimeError('downstream unavailable')
+
+
+@job
+def create_category_job(slug):
+    Category.objects.create(slug=slug, title=slug)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('customer')
+        self.courier = User.objects.create_user('courier')
+        self.courier.groups.add(Group.objects.create(name='DeliveryCrew'))
+        category = Category.objects.create(slug='mains', title='Mains')
+        self.item = MenuItem.objects.create(title='Pasta', price=12, inventory=10, category=category)
+        self.client = APIClient()
+
+    def test_checkout_leaves_sales_rollups_to_the_worker(self):
+        CartMenuItem.objects.create(user=self.customer, menu_item=self.item, quantity=2)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.post('/api/orders').status_code, 201)
+
+        [queued] = Job.objects.all()
+        self.assertEqual(queued.payload['order_id'], Order.objects.get().pk)
+        self.assertFalse(DailySales.objects.exists())
+
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(DailySales.objects.get().units, 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_rolled_back_and_retried_with_backoff(self):
+        queued = enqueue(flaky_job, slug='flaky')
+        with self.assertLogs('LittleLemonAPI.jobs', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.QUEUED, 1))
+        self.assertIn('downstream unavailable', queued.last_error)
+        self.assertFalse(Category.objects.filter(slug='flaky').exists())
+        # Not due again until the backoff has passed
+        self.assertEqual(run_pending(), (0, 0))
+
+        Job.objects.update(run_at=queued.created_at)
+        with self.assertLogs('LittleLemonAPI.jobs', 'ERROR'):
+            self.assertEqual(run_pending(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 2))
+        self.assertEqual(run_pending(), (0, 0))
+
+    def test_expired_lock_is_taken_over(self):
+        enqueue(create_category_job, slug='once')
+        [lost] = claim('worker-a', 10)
+        self.assertEqual(claim('worker-b', 10), [])
+        Job.objects.update(locked_at=lost.locked_at - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT + 1))
+        [taken_over] = claim('worker-b', 10)
+
+        self.assertEqual(taken_over.attempts, 2)
+        self.assertTrue(run_job(taken_over))
+        # The first worker finishing late rolls back instead of running the job twice
+        with self.assertLogs('LittleLemonAPI.jobs', 'WARNING'):
+            self.assertFalse(run_job(lost))
+        self.assertEqual(Category.objects.filter(slug='once').count(), 1)
+
+    def test_status_changes_emit_hook(self):
+        seen = []
+        handler = job(lambda **payload: seen.append(payload))
+        order = Order.objects.create(user=self.customer, delivery_crew=self.courier)
+        self.client.force_authenticate(self.courier)
+        with mock.patch.dict(jobs._subscribers, {ORDER_STATUS_CHANGED: [handler]}):
+            self.client.patch(f'/api/orders/{order.pk}', {'status': 0}, format='json')
+            self.assertEqual(Job.objects.count(), 0)
+            self.client.patch(f'/api/orders/{order.pk}', {'status': 1}, format='json')
+        run_pending()
+        self.assertEqual(seen, [{
+            'order_id': order.pk, 'user_id': self.customer.pk, 'courier_id': self.courier.pk,
+            'previous_status': 0, 'status': 1,
+        }])
+
+    def test_rebuild_discards_pending_rollup_jobs(self):
+        CartMenuItem.objects.create(user=self.customer, menu_item=self.item, quantity=3)
+        self.client.force_authenticate(self.customer)
+        self.client.post('/api/orders')
+        rebuild_sales_rollups()
+        self.assertEqual(run_pending(), (0, 0))
+        self.assertEqual(DailySales.objects.get().units, 3)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher', 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher'])
+class PasswordHashingTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+
+    def register(self, username='alice', password='s3cret-pass'):
+        return self.client.post('/api/users', {'username': username, 'email': f'{username}@example.com', 'password': password}, format='json')
+
+    def login(self, username='alice', password='s3cret-pass'):
+        return self.client.post('/token/login', {'username': username, 'password': password}, format='json')
+
+    async def call_async(self, view, path, data):
+        return await view.as_view()(self.factory.post(path, data, content_type='application/json'))
+
+    def test_register_and_login(self):
+        self.assertEqual(self.register().status_code, 201)
+        self.assertTrue(User.objects.get(username='alice').check_password('s3cret-pass'))
+        self.assertEqual(self.register().status_code, 400)
+
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token'], Token.objects.get(user__username='alice').key)
+        self.assertEqual(self.login(password='wrong').status_code, 401)
+        self.assertEqual(self.login(username='nobody').status_code, 401)
+
+    def test_inactive_users_cannot_log_in(self):
+        User.objects.create_user('alice', password='s3cret-pass', is_active=False)
+        self.assertEqual(self.login().status_code, 401)
+
+    def test_failed_logins_are_signalled_like_authenticate(self):
+        User.objects.create_user('alice', password='s3cret-pass')
+        User.objects.create_user('carol', password='s3cret-pass', is_active=False)
+        failures = []
+        receiver = lambda sender, credentials, request, **kwargs: failures.append((sender, credentials, request.path))
+        user_login_failed.connect(receiver)
+        try:
+            self.assertEqual(self.login().status_code, 200)
+            self.login(password='wrong')
+            self.login(username='nobody')
+            self.login(username='carol')
+        finally:
+            user_login_failed.disconnect(receiver)
+        self.assertEqual(failures, [
+            ('django.contrib.auth', {'username': username, 'password': '*' * 20}, '/token/login')
+            for username in ('alice', 'nobody', 'carol')
+        ])
+
+    def test_login_upgrades_outdated_hashes(self):
+        User.objects.create(username='alice', password=make_password('s3cret-pass', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(User.objects.get(username='alice').password.startswith('md5$'))
+
+    def test_saturated_pool_answers_503(self):
+        pool = HashingPool(workers=1, queue_size=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch.object(hashing, 'hashing_pool', pool):
+                for response in (self.register(), self.login()):
+                    self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+        finally:
+            release.set()
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(pool.rejected, 2)
+
+    async def test_async_views_match_sync_views(self):
+        data = {'username': 'bob', 'email': 'bob@example.com', 'password': 's3cret-pass'}
+        response = await self.call_async(async_views.UsersAsyncView, '/api/users', data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((await self.call_async(async_views.UsersAsyncView, '/api/users', data)).status_code, 400)
+
+        response = await self.call_async(async_views.TokensAsyncView, '/token/login', {'username': 'bob', 'password': 's3cret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token'], (await Token.objects.aget(user__username='bob')).key)
+        failures = []
+        receiver = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(receiver)
+        try:
+            response = await self.call_async(async_views.TokensAsyncView, '/token/login', {'username': 'bob', 'password': 'wrong'})
+        finally:
+            user_login_failed.disconnect(receiver)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(failures, ['bob'])
+
+        pool = HashingPool(workers=1, queue_size=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch.object(hashing, 'hashing_pool', pool):
+                response = await self.call_async(async_views.TokensAsyncView, '/token/login', {'username': 'bob', 'password': 's3cret-pass'})
+        finally:
+            release.set()
+        self.assertEqual(response.status_code, 503)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def test_scarce_item_is_never_oversold(self):
+        stock, buyers = 5, 20
+        category = Category.objects.create(slug='specials', title='Specials')
+        item = MenuItem.objects.create(title='Truffle risotto', price=30, inventory=stock, category=category)
+        users = [User.objects.create_user(f'buyer{n}') for n in range(buyers)]
+        CartMenuItem.objects.bulk_create(CartMenuItem(user=user, menu_item=item, quantity=1) for user in users)
+
+        barrier = threading.Barrier(buyers)
+        results = []
+
+        def checkout(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                results.append(client.post('/api/orders').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        item.refresh_from_db()
+        self.assertEqual(item.inventory, 0)
+        self.assertEqual(results.count(201), stock)
+        self.assertEqual(results.count(409), buyers - stock)
+        self.assertEqual(OrderItem.objects.filter(menu_item=item).count(), stock)
+
+
+class OrderWriteRetryTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        shared_values.clear()
+        self.manager = User.objects.create_user('manager')
+        self.manager.groups.add(Group.objects.create(name='Manager'))
+        self.order = Order.objects.create(user=User.objects.create_user('customer'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_retried_update_starts_from_the_committed_order(self):
+        busy = [OperationalError('database is locked')]
+
+        def touch_once_busy(*collections):
+            if busy:
+                raise busy.pop()
+            return touch(*collections)
+
+        with mock.patch('LittleLemonAPI.views.touch', side_effect=touch_once_busy), \
+                mock.patch('LittleLemonAPI.views._emit_status_changes') as emit_changes:
+            response = self.client.patch(f'/api/orders/{self.order.pk}', {'status': 1}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        # The failed attempt's save was rolled back, so the retry still sees the order as open
+        (changes,), _ = emit_changes.call_args
+        self.assertEqual([change[3:] for change in changes], [(0, 1)])
+
+
+class JobWorkerTests(TransactionTestCase):
+    def test_thread_pool_runs_every_job_once(self):
+        for n in range(20):
+            enqueue(create_category_job, slug=f'job-{n}')
+        worker = Worker(concurrency=4, poll_interval=0.01)
+        worker.run(once=True)
+        self.assertEqual((worker.succeeded, worker.failed), (20, 0))
+        self.assertEqual(Category.objects.count(), 20)
+        self.assertFalse(Job.objects.exists())
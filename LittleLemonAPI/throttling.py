@@ -0,0 +1,80 @@
+import logging
+import sqlite3
+import time
+
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .shared_state import HostStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# Token buckets in a small SQLite file that every worker process on the host opens, so a
+# scope's quota is enforced once for the whole server rather than once per process.
+# Each check is a single UPSERT on one row; idle buckets are pruned once they would be full again.
+class BucketStore(HostStore):
+    SCHEMA = '''CREATE TABLE IF NOT EXISTS throttle_buckets (
+        key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, expires REAL NOT NULL
+    ) WITHOUT ROWID'''
+    TABLE = 'throttle_buckets'
+
+    # Refill for the time since the last request, capped at capacity, then take one token.
+    # When the bucket is empty the WHERE clause skips the update and nothing is returned.
+    TAKE = '''
+        INSERT INTO throttle_buckets (key, tokens, updated, expires)
+        VALUES (:key, :capacity - 1, :now, :expires)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + (:now - updated) * :rate) - 1,
+            updated = :now,
+            expires = :expires
+        WHERE min(:capacity, tokens + (:now - updated) * :rate) >= 1
+        RETURNING tokens
+    '''
+
+    # Returns (allowed, seconds until the next token)
+    def take(self, key, capacity, duration, now=None):
+        now = time.time() if now is None else now
+        rate = capacity / duration
+        connection = self._connection()
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now, 'expires': now + duration}
+        # fetchall() finishes the statement, which ends its implicit write transaction
+        if connection.execute(self.TAKE, params).fetchall():
+            self._maybe_prune(connection, now)
+            return True, 0.0
+        row = connection.execute('SELECT tokens, updated FROM throttle_buckets WHERE key = ?', [key]).fetchone()
+        available = min(capacity, row[0] + (now - row[1]) * rate) if row else 0
+        return False, max(0.0, (1 - available) / rate)
+
+
+shared_buckets = BucketStore()
+
+
+# Same scopes, rates and cache keys as DRF's throttles, counted in the shared bucket store
+class SharedRateThrottleMixin:
+    store = shared_buckets
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        try:
+            allowed, self._wait = self.store.take(self.key, self.num_requests, self.duration)
+        except sqlite3.Error:
+            # A broken limiter must not take the API down with it
+            logger.exception('Throttle store unavailable, letting the request through')
+            return True
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    pass
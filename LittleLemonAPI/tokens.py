@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path 
-from . import views 
-  
+from . import views, async_views
+
+# Login hashes passwords; under ASGI the async view waits for the hashing pool without holding a thread
+login = async_views.TokensAsyncView.as_view() if settings.ASYNC_READ_VIEWS else views.tokens
+
 urlpatterns = [
     # User registration and token generation endpoints
-    path('login', views.tokens)
+    path('login', login)
 ]
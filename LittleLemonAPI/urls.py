@@ -1,15 +1,36 @@
+from django.conf import settings
 from django.urls import path 
-from . import views 
-  
+from . import views, async_views
+
+
+menu_items = views.MenuItemsViewSet.as_view({'get':'list', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})
+menu_item = views.MenuItemsViewSet.as_view({'get':'retrieve', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})
+cart = views.CartMenuItemsViewSet.as_view({'get':'list', 'post':'create', 'delete':'destroy'})
+orders = views.OrderViewSet.as_view({'get':'list', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})
+order = views.OrderViewSet.as_view({'get':'retrieve', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})
+users = views.users
+
+# Under ASGI the read paths are served by native async views; writes stay on the sync viewsets
+if settings.ASYNC_READ_VIEWS:
+    menu_items = async_views.read_async(async_views.MenuItemsAsyncView.as_view(), menu_items)
+    menu_item = async_views.read_async(async_views.MenuItemsAsyncView.as_view(), menu_item)
+    cart = async_views.read_async(async_views.CartMenuItemsAsyncView.as_view(), cart)
+    orders = async_views.read_async(async_views.OrderAsyncView.as_view(), orders)
+    order = async_views.read_async(async_views.OrderAsyncView.as_view(), order)
+    # Registration hashes passwords; the async view waits for the hashing pool without holding a thread
+    users = async_views.UsersAsyncView.as_view()
+
 urlpatterns = [
     # User registration and token generation endpoints
-    path('users', views.users),
+    path('users', users),
     path('users/users/me', views.display_user),
     
     # Menu-items endpoints
     path('categories', views.CategoriesView.as_view({'get':'list', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})),
-    path('menu-items', views.MenuItemsViewSet.as_view({'get':'list', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})),
-    path('menu-items/<int:pk>', views.MenuItemsViewSet.as_view({'get':'retrieve', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})),
+    path('menu-items', menu_items),
+    path('menu-items/<int:pk>', menu_item),
+    path('menu-items/import', views.import_menu),
+    path('cache/catalog', views.catalog_cache_stats),
 
     # User group management endpoints
     path('groups/manager/users', views.managers),
@@ -18,9 +39,17 @@ urlpatterns = [
     path('groups/delivery-crew/users/<int:userId>', views.delivery_crew),
 
     # Cart management endpoints
-    path('cart/menu-items', views.CartMenuItemsViewSet.as_view({'get':'list', 'post':'create', 'delete':'destroy'})),
+    path('cart/menu-items', cart),
+    path('cart/menu-items/batch', views.CartMenuItemsViewSet.as_view({'post':'batch'})),
 
     # Order management endpoints
-    path('orders', views.OrderViewSet.as_view({'get':'list', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})),
-    path('orders/<int:pk>', views.OrderViewSet.as_view({'get':'retrieve', 'post':'create', 'put':'update', 'patch':'partial_update', 'delete':'destroy'})),  
+    path('orders', orders),
+    path('orders/events', views.order_events),
+    path('orders/export', views.export_orders),
+    path('orders/bulk', views.OrderViewSet.as_view({'post':'bulk_update', 'patch':'bulk_update'})),
+    path('orders/<int:pk>', order),  
+
+    # Reporting endpoints
+    path('analytics/sales', views.sales_analytics),
+    path('metrics/queries', views.query_metrics_report),
 ]
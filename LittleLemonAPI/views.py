@@ -1,17 +1,54 @@
+import asyncio
+import json
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from rest_framework.decorators import api_view, permission_classes, parser_classes, action
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.filters import OrderingFilter
 from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import APIException
 from .models import MenuItem, Category, CartMenuItem, Order, OrderItem
-from .serializers import MenuItemSerializer, CategorySerializer, CartMenuItemSerializer, OrderSerializer, OrderItemSerializer
+from .serializers import MenuItemSerializer, CategorySerializer, CartMenuItemSerializer, OrderSerializer, OrderItemSerializer, CartBatchOperationSerializer, OrderBulkUpdateSerializer
 from django.contrib.auth.models import User, Group
-from django.contrib.auth import authenticate
+from django.db import transaction
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Case, When, Value, F, IntegerField
 from .permissions import IsManager
-
-
-class CategoriesView(viewsets.ModelViewSet):
+from .roles import is_manager, is_delivery_crew
+from .pagination import OrderCursorPagination
+from .cache import CatalogCacheMixin, catalog_cache
+from .events import get_broker, order_channel, publish_order_change
+from .analytics import order_sales, sales_report, GROUP_BY_CHOICES
+from .exports import aiterate, order_rows, csv_stream, ndjson_stream
+from .menu_import import import_menu_rows, MAX_IMPORT_ROWS
+from .parsers import CSVParser
+from .search import MenuItemSearchFilter
+from .instrumentation import query_metrics
+from .database import retry_on_busy
+from .routers import CATALOG, ReplicaReadMixin, read_from_replica
+from .throttling import SharedAnonRateThrottle, SharedUserRateThrottle
+from .fast_serializers import ValuesListMixin, menu_item_values, cart_item_values, order_values
+from .dispatch import dispatcher, is_open
+from .conditional import (
+    INVENTORY_COLLECTION, add_validators, cart_collection, cart_read_collections, collection_state, conditional_get,
+    customer_orders_collection, evaluate, order_collections, order_read_collections, touch,
+)
+from .jobs import ORDER_DELETED, ORDER_PLACED, ORDER_STATUS_CHANGED, emit
+from .hashing import authenticate_user, hash_password, shed_when_saturated
+
+
+class CategoriesView(ReplicaReadMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    replica_pins = [CATALOG]
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -31,13 +68,17 @@ class CategoriesView(viewsets.ModelViewSet):
 
 # /api/menu-items DONE
 # /api/menu-items/{menuItem} DONE
-class MenuItemsViewSet(viewsets.ModelViewSet):
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
-    queryset = MenuItem.objects.all()
+class MenuItemsViewSet(ReplicaReadMixin, CatalogCacheMixin, ValuesListMixin, viewsets.ModelViewSet):
+    replica_pins = [CATALOG]
+    live_inventory = True
+    throttle_classes = [SharedAnonRateThrottle, SharedUserRateThrottle]
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
+    values_serializer = menu_item_values
     ordering_fields = ['price', 'inventory']
     filterset_fields = ['price', 'inventory']
-    search_fields = ['title']
+    filter_backends = [OrderingFilter, MenuItemSearchFilter]
+    search_fields = ['title', 'category__title']
 
     def get_permissions(self):
         if self.action == 'create':
@@ -59,8 +100,118 @@ class MenuItemsViewSet(viewsets.ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
+# /api/menu-items/import
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsManager])
+@parser_classes([JSONParser, CSVParser, MultiPartParser])
+@retry_on_busy
+def import_menu(request):
+    # JSON list (or {"items": [...]}), a text/csv body, or a CSV file uploaded as "file"
+    data = request.data
+    if 'file' in getattr(request, 'FILES', {}):
+        try:
+            data = CSVParser().parse(request.FILES['file'], parser_context={'encoding': 'utf-8-sig'})
+        except Exception as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    elif isinstance(data, dict):
+        data = data.get('items')
+
+    if not isinstance(data, list) or not data:
+        return Response({"error": "Provide a non-empty list of menu items."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(data) > MAX_IMPORT_ROWS:
+        return Response({"error": f"Imports are limited to {MAX_IMPORT_ROWS} rows."}, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = import_menu_rows(data)
+    return Response(summary, status=status.HTTP_200_OK)
+
+
+# /api/cache/catalog
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsManager])
+def catalog_cache_stats(request):
+    return Response(catalog_cache.stats(), status=status.HTTP_200_OK)
+
+
+# /api/metrics/queries
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsManager])
+def query_metrics_report(request):
+    if request.method == 'DELETE':
+        query_metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(query_metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+# Optional ?start=&end= dates shared by the reporting endpoints
+def _date_range(request):
+    dates = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        if value:
+            try:
+                dates[name] = parse_date(value)
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                return None, Response({"error": f"{name} must be a date (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+    return dates, None
+
+
+# /api/analytics/sales
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsManager])
+@read_from_replica()
+def sales_analytics(request):
+    group_by = request.query_params.get('group_by', 'day')
+    if group_by not in GROUP_BY_CHOICES:
+        return Response({"error": f"group_by must be one of: {', '.join(GROUP_BY_CHOICES)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    dates, error = _date_range(request)
+    if error:
+        return error
+
+    results = sales_report(group_by, **dates)
+    return Response({"group_by": group_by, "results": results}, status=status.HTTP_200_OK)
+
+
+# /api/orders/export
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsManager])
+@read_from_replica()
+def export_orders(request):
+    output = request.query_params.get('output', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return Response({"error": "output must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+    filters = {}
+    for name in ('status', 'delivery_crew'):
+        value = request.query_params.get(name)
+        if value:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                return Response({"error": f"{name} must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    dates, error = _date_range(request)
+    if error:
+        return error
+    filters.update(dates)
+
+    # Rows are pulled from the database as the client reads, so memory stays flat however large the export
+    rows = order_rows(**filters)
+    lines = csv_stream(rows) if output == 'csv' else ndjson_stream(rows)
+    if isinstance(request._request, ASGIRequest):
+        lines = aiterate(lines)
+    if output == 'csv':
+        response = StreamingHttpResponse(lines, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+    else:
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    return response
+
+
 # /api/users DONE
 @api_view(['POST'])
+@shed_when_saturated
 def users(request):
     # Extract user data from the request
     username = request.data.get('username')
@@ -78,8 +229,8 @@ def users(request):
     if User.objects.filter(email=email).exists():
         return Response({"error": "Email already exists."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Create the user
-    user = User.objects.create_user(username=username, email=email, password=password)
+    # Create the user; the password is hashed on the hashing pool
+    user = User(username=User.normalize_username(username), email=User.objects.normalize_email(email), password=hash_password(password))
     user.save()
 
     # Return a success message
@@ -105,6 +256,7 @@ def display_user(request):
 
 # /token/login/ DONE
 @api_view(['POST'])
+@shed_when_saturated
 def tokens(request):
     # Get the username and password from the request data
     username = request.data.get('username')
@@ -114,8 +266,8 @@ def tokens(request):
     if not all([username, password]):
         return Response({"error": "Username, and password are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Authenticate the user
-    user = authenticate(username=username, password=password)
+    # Authenticate the user, checking the password on the hashing pool
+    user = authenticate_user(username, password, request._request)
     if user is not None:
         # Generate or get the existing token for the authenticated user
         token, created = Token.objects.get_or_create(user=user)
@@ -232,15 +384,16 @@ def delivery_crew(request, userId=None):
 class CartMenuItemsViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(cart_read_collections)
     def list(self, request):
         try:
             user = request.user
             cart_items = CartMenuItem.objects.filter(user=user)
-            serializer = CartMenuItemSerializer(cart_items, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(cart_item_values.data(cart_items), status=status.HTTP_200_OK)
         except:
             return Response({"error": "Cart does not yet exist"}, status=status.HTTP_404_NOT_FOUND)
 
+    @retry_on_busy
     def create(self, request):
         user = request.user
 
@@ -250,15 +403,25 @@ class CartMenuItemsViewSet(viewsets.ModelViewSet):
         if not menu_item_id or not quantity:
             return Response({"error": "Menu item id and quantity required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            return Response({"error": "Quantity must be a whole number."}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             menu_item = MenuItem.objects.get(id=menu_item_id)
         except MenuItem.DoesNotExist:
             return Response({"detail": "Menu item does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
-        cart_item, created = CartMenuItem.objects.get_or_create(user=user, menu_item=menu_item, quantity=quantity)
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+        # One row per (user, menu_item): repeated adds increment the existing quantity.
+        # One transaction, so a retry after a lock error can't apply the increment twice.
+        with transaction.atomic():
+            cart_item, created = CartMenuItem.objects.get_or_create(user=user, menu_item=menu_item, defaults={'quantity': quantity})
+            if not created:
+                cart_item.quantity = F('quantity') + quantity
+                cart_item.save(update_fields=['quantity'])
+                cart_item.refresh_from_db(fields=['quantity'])
+            touch(cart_collection(user.pk))
 
         serializer = CartMenuItemSerializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -266,13 +429,67 @@ class CartMenuItemsViewSet(viewsets.ModelViewSet):
     def destroy(self, request, pk=None):
         user = request.user
         CartMenuItem.objects.filter(user=user).delete()
+        touch(cart_collection(user.pk))
         return Response({"detail": "All cart items deleted."}, status=status.HTTP_204_NO_CONTENT)
+
+    # /api/cart/menu-items/batch
+    @action(detail=False, methods=['post'])
+    @retry_on_busy
+    def batch(self, request):
+        user = request.user
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        serializer = CartBatchOperationSerializer(data=operations, many=True)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data
+        if not operations:
+            return Response({"error": "At least one operation is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every menu item up front so a bad id rejects the whole batch
+        menu_item_ids = {operation['menu_item_id'] for operation in operations}
+        existing_ids = set(MenuItem.objects.filter(pk__in=menu_item_ids).values_list('id', flat=True))
+        missing_ids = sorted(menu_item_ids - existing_ids)
+        if missing_ids:
+            return Response({"error": "Menu items do not exist.", "menu_item_ids": missing_ids}, status=status.HTTP_404_NOT_FOUND)
+
+        with transaction.atomic():
+            quantities = dict(
+                CartMenuItem.objects.filter(user=user, menu_item_id__in=menu_item_ids).values_list('menu_item_id', 'quantity')
+            )
+            current = dict(quantities)
+            # Operations apply in order, so the same item may be added and then adjusted in one batch
+            for operation in operations:
+                menu_item_id = operation['menu_item_id']
+                if operation['action'] == CartBatchOperationSerializer.ADD:
+                    quantities[menu_item_id] = quantities.get(menu_item_id, 0) + operation['quantity']
+                elif operation['action'] == CartBatchOperationSerializer.SET:
+                    quantities[menu_item_id] = operation['quantity']
+                else:
+                    quantities[menu_item_id] = 0
+
+            removed = [menu_item_id for menu_item_id, quantity in quantities.items() if quantity == 0 and menu_item_id in current]
+            upserts = [
+                CartMenuItem(user=user, menu_item_id=menu_item_id, quantity=quantity)
+                for menu_item_id, quantity in quantities.items() if quantity > 0 and current.get(menu_item_id) != quantity
+            ]
+            if removed:
+                CartMenuItem.objects.filter(user=user, menu_item_id__in=removed).delete()
+            if upserts:
+                CartMenuItem.objects.bulk_create(
+                    upserts, update_conflicts=True, unique_fields=['user', 'menu_item'], update_fields=['quantity']
+                )
+            if removed or upserts:
+                touch(cart_collection(user.pk))
+
+        cart_items = CartMenuItem.objects.filter(user=user)
+        serializer = CartMenuItemSerializer(cart_items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
     
 
 # /api/orders DONE
 # /api/orders/{orderId} DONE
-class OrderViewSet(viewsets.ViewSet):
+class OrderViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -280,44 +497,100 @@ class OrderViewSet(viewsets.ViewSet):
         if self.action in ['create']:
             return [IsAuthenticated()]
         if self.action in ['update', 'partial_update']:
-            if self.request.user.groups.filter(name='Manager').exists():
+            if is_manager(self.request.user):
                 return [IsAuthenticated()]
-            if self.request.user.groups.filter(name='DeliveryCrew').exists():
+            if is_delivery_crew(self.request.user):
                 return [IsAuthenticated()]
         if self.action in ['destroy']:
-            if self.request.user.groups.filter(name='Manager').exists():
+            if is_manager(self.request.user):
                 return [IsAuthenticated()]
         return super().get_permissions()
 
+    @conditional_get(order_read_collections)
     def list(self, request):
         user = request.user
-        if user.groups.filter(name='Manager').exists():
+        if is_manager(user):
             orders = Order.objects.all()
-        elif user.groups.filter(name='DeliveryCrew').exists():
+        elif is_delivery_crew(user):
             orders = Order.objects.filter(delivery_crew=user)
         else:
             orders = Order.objects.filter(user=user)
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(order_values.values(orders), request, view=self)
+        return paginator.get_paginated_response(order_values.to_representation(page))
+
+    @retry_on_busy
     def create(self, request):
         user = request.user
-        cart_items = CartMenuItem.objects.filter(user=user)
-        if not cart_items.exists():
-            return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
-
-        order = Order.objects.create(user=user)
-        order_items = []
-        for cart_item in cart_items:
-            order_item = OrderItem(
-                order=order,
-                menu_item=cart_item.menu_item,
-                quantity=cart_item.quantity
-            )
-            order_items.append(order_item)
-        OrderItem.objects.bulk_create(order_items)
-        cart_items.delete()
-        
+        courier_id = None
+        try:
+            with transaction.atomic():
+                # Bumping the cart's version is the first statement, so the write lock is taken before the
+                # cart is read: no concurrent cart change or checkout can land between reading it and emptying it.
+                # Starting with a write also spares SQLite upgrading a read lock mid-transaction.
+                touch(cart_collection(user.pk))
+                cart_items = list(CartMenuItem.objects.select_for_update().filter(user=user).select_related('menu_item'))
+                if not cart_items:
+                    transaction.set_rollback(True)
+                    return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+                wanted = defaultdict(int)
+                for cart_item in cart_items:
+                    wanted[cart_item.menu_item_id] += cart_item.quantity
+                CartMenuItem.objects.filter(pk__in=[cart_item.pk for cart_item in cart_items]).delete()
+
+                # One conditional UPDATE for every line; rows without enough stock are left untouched
+                requested = Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in wanted.items()], output_field=IntegerField())
+                updated = MenuItem.objects.filter(pk__in=wanted, inventory__gte=requested).update(inventory=F('inventory') - requested)
+                if updated != len(wanted):
+                    transaction.set_rollback(True)
+                    order = None
+                else:
+                    order_items = [
+                        OrderItem(
+                            menu_item=cart_item.menu_item,
+                            quantity=cart_item.quantity,
+                            unit_price=cart_item.menu_item.price,
+                            line_total=cart_item.menu_item.price * cart_item.quantity,
+                        )
+                        for cart_item in cart_items
+                    ]
+                    # Least busy courier first; None leaves the order for a manager or dispatch_orders
+                    if settings.DISPATCH_AUTO_ASSIGN:
+                        courier_id = dispatcher.assign()
+                    order = Order.objects.create(
+                        user=user,
+                        delivery_crew_id=courier_id,
+                        total=sum(order_item.line_total for order_item in order_items),
+                        item_count=sum(order_item.quantity for order_item in order_items),
+                    )
+                    for order_item in order_items:
+                        order_item.order = order
+                    OrderItem.objects.bulk_create(order_items)
+                    # Sales rollups and other follow-up work run in the job worker, committed with the order
+                    emit(ORDER_PLACED, {
+                        'order_id': order.pk, 'user_id': user.pk, 'courier_id': courier_id,
+                        'sales': order_sales(order, order_items),
+                    })
+                    # Stock changed but nothing else in the catalog: cached menu pages stay, with fresh inventory
+                    touch(INVENTORY_COLLECTION, *order_collections(user.pk, courier_id))
+        except BaseException:
+            # The order never committed, so its courier isn't holding it
+            if courier_id is not None:
+                dispatcher.release(courier_id)
+            raise
+
+        if order is None:
+            available = dict(MenuItem.objects.filter(pk__in=wanted).values_list('id', 'inventory'))
+            shortages = [
+                {'menu_item': pk, 'requested': quantity, 'available': available.get(pk, 0)}
+                for pk, quantity in wanted.items() if available.get(pk, 0) < quantity
+            ]
+            return Response({"error": "Not enough inventory.", "items": shortages}, status=status.HTTP_409_CONFLICT)
+
+        if courier_id is not None:
+            publish_order_change(order.pk, user.pk, courier_id, order.status)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -327,34 +600,46 @@ class OrderViewSet(viewsets.ViewSet):
         except Order.DoesNotExist:
             return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if order.user != request.user and not request.user.groups.filter(name='Manager').exists():
+        if order.user_id != request.user.pk and not is_manager(request.user):
             return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
 
-        serializer = OrderItemSerializer(order.items, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Validators only once the caller may see the order, so a 304 can't confirm someone else's
+        etag, last_modified, response = evaluate(request, *collection_state([customer_orders_collection(order.user_id)]))
+        if response is None:
+            serializer = OrderItemSerializer(order.items, many=True)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
 
+    @retry_on_busy
     def update(self, request, pk=None):
-        try:
-            order = Order.objects.get(pk=pk)
-        except Order.DoesNotExist:
-            return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        if not request.user.groups.filter(name='Manager').exists() and not request.user.groups.filter(name='DeliveryCrew').exists():
-            return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
-
-        data = request.data
-        if 'delivery_crew' in data and request.user.groups.filter(name='Manager').exists():
+        # The order is read inside the transaction, so a retried attempt starts from the committed row
+        with transaction.atomic():
             try:
-                order.delivery_crew = User.objects.get(pk=data['delivery_crew'])
-            except:
-                return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-            
-            if not order.delivery_crew.groups.filter(name='DeliveryCrew').exists():
-                return Response({"error": "User must be in Delivery Crew."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if 'status' in data:
-            order.status = data['status']
-        order.save()
+                order = Order.objects.get(pk=pk)
+            except Order.DoesNotExist:
+                return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            if not is_manager(request.user) and not is_delivery_crew(request.user):
+                return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
+
+            data = request.data
+            previous_crew_id, previous_status = order.delivery_crew_id, int(order.status)
+            if 'delivery_crew' in data and is_manager(request.user):
+                try:
+                    order.delivery_crew = User.objects.get(pk=data['delivery_crew'])
+                except:
+                    return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+                
+                if not is_delivery_crew(order.delivery_crew):
+                    return Response({"error": "User must be in Delivery Crew."}, status=status.HTTP_400_BAD_REQUEST)
+
+            if 'status' in data:
+                order.status = data['status']
+            order.save()
+            touch(*order_collections(order.user_id, order.delivery_crew_id, previous_crew_id))
+            _emit_status_changes([(order.pk, order.user_id, order.delivery_crew_id, previous_status, int(order.status))])
+        dispatcher.order_changed(previous_crew_id, is_open(previous_status), order.delivery_crew_id, is_open(order.status))
+        publish_order_change(order.pk, order.user_id, order.delivery_crew_id, int(order.status), previous_crew_id=previous_crew_id)
 
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -362,30 +647,177 @@ class OrderViewSet(viewsets.ViewSet):
     def partial_update(self, request, pk=None):
         return self.update(request, pk)
 
+    @retry_on_busy
     def destroy(self, request, pk=None):
         try:
             order = Order.objects.get(pk=pk)
         except Order.DoesNotExist:
             return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if not request.user.groups.filter(name='Manager').exists():
+        if not is_manager(request.user):
             return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
 
-        order.delete()
+        order_id = order.pk
+        with transaction.atomic():
+            emit(ORDER_DELETED, {
+                'order_id': order_id, 'user_id': order.user_id,
+                'sales': order_sales(order, order.items.select_related('menu_item')),
+            })
+            order.delete()
+            touch(*order_collections(order.user_id, order.delivery_crew_id))
+        dispatcher.order_changed(order.delivery_crew_id, is_open(order.status), None, False)
+        publish_order_change(order_id, order.user_id, order.delivery_crew_id, order.status, deleted=True)
         return Response({"detail": "Order deleted."}, status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['patch'], permission_classes=[IsAuthenticated])
     def update_status(self, request, pk=None):
-        try:
-            order = Order.objects.get(pk=pk)
-        except Order.DoesNotExist:
-            return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            try:
+                order = Order.objects.get(pk=pk)
+            except Order.DoesNotExist:
+                return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            if not is_delivery_crew(request.user):
+                return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
 
-        if request.user.groups.filter(name='DeliveryCrew').exists():
+            previous_status = int(order.status)
             order.status = request.data.get('status', order.status)
             order.save()
-            serializer = OrderSerializer(order)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
+            touch(*order_collections(order.user_id, order.delivery_crew_id))
+            _emit_status_changes([(order.pk, order.user_id, order.delivery_crew_id, previous_status, int(order.status))])
+        dispatcher.order_changed(order.delivery_crew_id, is_open(previous_status), order.delivery_crew_id, is_open(order.status))
+        publish_order_change(order.pk, order.user_id, order.delivery_crew_id, int(order.status))
+        serializer = OrderSerializer(order)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    # /api/orders/bulk
+    @action(detail=False, methods=['post', 'patch'])
+    @retry_on_busy
+    def bulk_update(self, request):
+        user = request.user
+        manager = is_manager(user)
+        crew = is_delivery_crew(user)
+        if not manager and not crew:
             return Response({"error": "You do not have permission for this action."}, status=status.HTTP_403_FORBIDDEN)
-        
\ No newline at end of file
+
+        serializer = OrderBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        changes = {}
+        if 'delivery_crew' in data:
+            if not manager:
+                return Response({"error": "Only managers can assign delivery crew."}, status=status.HTTP_403_FORBIDDEN)
+            delivery_crew = User.objects.filter(pk=data['delivery_crew']).first()
+            if delivery_crew is None:
+                return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+            if not is_delivery_crew(delivery_crew):
+                return Response({"error": "User must be in Delivery Crew."}, status=status.HTTP_400_BAD_REQUEST)
+            changes['delivery_crew'] = delivery_crew
+        if 'status' in data:
+            changes['status'] = data['status']
+
+        with transaction.atomic():
+            # Resolve every target in one query; crew members may only touch orders assigned to them
+            requested = list(dict.fromkeys(data['orders']))
+            targets = {
+                order['id']: order
+                for order in Order.objects.filter(pk__in=requested).values('id', 'user_id', 'delivery_crew_id', 'status')
+            }
+            results = []
+            allowed = []
+            for order_id in requested:
+                if order_id not in targets:
+                    results.append({'id': order_id, 'result': 'not_found'})
+                elif not manager and targets[order_id]['delivery_crew_id'] != user.pk:
+                    results.append({'id': order_id, 'result': 'forbidden'})
+                else:
+                    results.append({'id': order_id, 'result': 'updated'})
+                    allowed.append(order_id)
+
+            if allowed:
+                Order.objects.filter(pk__in=allowed).update(**changes)
+                touch(*[
+                    collection for order_id in allowed
+                    for collection in order_collections(
+                        targets[order_id]['user_id'], targets[order_id]['delivery_crew_id'],
+                        changes['delivery_crew'].pk if 'delivery_crew' in changes else None,
+                    )
+                ])
+                _emit_status_changes([
+                    (order_id, targets[order_id]['user_id'],
+                     changes['delivery_crew'].pk if 'delivery_crew' in changes else targets[order_id]['delivery_crew_id'],
+                     targets[order_id]['status'], int(changes.get('status', targets[order_id]['status'])))
+                    for order_id in allowed
+                ])
+
+        for order_id in allowed:
+            order = targets[order_id]
+            dispatcher.order_changed(
+                order['delivery_crew_id'], is_open(order['status']),
+                changes['delivery_crew'].pk if 'delivery_crew' in changes else order['delivery_crew_id'],
+                is_open(changes.get('status', order['status'])),
+            )
+            publish_order_change(
+                order_id, order['user_id'],
+                changes['delivery_crew'].pk if 'delivery_crew' in changes else order['delivery_crew_id'],
+                changes.get('status', order['status']),
+                previous_crew_id=order['delivery_crew_id'],
+            )
+
+        return Response({"updated": len(allowed), "results": results}, status=status.HTTP_200_OK)
+
+
+# Queue the ORDER_STATUS_CHANGED hook for (order, customer, courier, old status, new status) rows that changed status
+def _emit_status_changes(changes):
+    emit(ORDER_STATUS_CHANGED, *[
+        {'order_id': order_id, 'user_id': user_id, 'courier_id': courier_id, 'previous_status': previous, 'status': current}
+        for order_id, user_id, courier_id, previous, current in changes if previous != current
+    ])
+
+
+def _authenticate(request):
+    # Run the configured DRF authenticators against a plain Django request
+    return Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]).user
+
+
+# /api/orders/events
+# Server-Sent Events stream of status and delivery-crew changes for the caller's orders
+# (or, for delivery crew, the orders assigned to them). Under ASGI every client is a
+# coroutine parked on a queue, so idle connections cost no thread.
+async def order_events(request):
+    if request.method != 'GET':
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would have to buffer the endless stream
+        return JsonResponse({"detail": "Order events are only served over ASGI."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except APIException as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    keepalive = getattr(settings, 'ORDER_EVENTS_KEEPALIVE', 15)
+    channel = order_channel(user.pk)
+
+    async def stream():
+        broker = get_broker()
+        subscription = broker.subscribe(channel)
+        queue = subscription[1]
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: order\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(channel, subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response